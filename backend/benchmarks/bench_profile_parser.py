@@ -0,0 +1,54 @@
+"""
+Micro-benchmark do parser de perfis.
+
+Compara o tempo por perfil do caminho rápido (tokenizador dedicado) com a
+extração original via BeautifulSoup, usando as páginas salvas em samples/.
+
+Uso (a partir do diretório backend):
+    python benchmarks/bench_profile_parser.py [--repeat 200]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+# Adiciona o diretório backend ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.profile_parser import extract_fields_fast, extract_fields_soup, parse_profile
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+def load_samples(pattern: str = "characterprofile_*.html"):
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(SAMPLES_DIR, pattern))):
+        with open(path, encoding="utf-8") as f:
+            samples[os.path.basename(path)] = f.read()
+    return samples
+
+def bench(func, html_content: str, repeat: int) -> float:
+    """Retorna o tempo médio por chamada em microssegundos"""
+    return timeit.timeit(lambda: func(html_content), number=repeat) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    samples = load_samples()
+    if not samples:
+        print(f"Nenhuma página encontrada em {SAMPLES_DIR}")
+        return
+
+    print(f"{'página':40} {'soup (us)':>12} {'rápido (us)':>12} {'ganho':>8}")
+    for name, html_content in samples.items():
+        # Os dois caminhos devem produzir os mesmos campos
+        assert extract_fields_fast(html_content) == extract_fields_soup(html_content), name
+        soup_time = bench(extract_fields_soup, html_content, args.repeat)
+        fast_time = bench(extract_fields_fast, html_content, args.repeat)
+        print(f"{name:40} {soup_time:12.1f} {fast_time:12.1f} {soup_time / fast_time:7.1f}x")
+        print(f"  -> {parse_profile(html_content)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Servidor falso do Taleon para benchmarks e testes de carga offline.
+
+Serve characterprofile.php, highscores.php, online.php e guildprofile.php no
+mesmo formato do site, gerados a partir das páginas salvas em samples/ e de
+uma lista determinística de jogadores (Bench 0001, Bench 0002...). A latência,
+a variação e a taxa de erros (503) são configuráveis, para medir o
+comportamento da aplicação com o Taleon lento ou instável.
+
+Para apontar a aplicação para ele, defina TALEON_BASE_URL antes de iniciá-la.
+
+Uso (a partir do diretório backend):
+    python benchmarks/fake_taleon.py [--port 8081] [--latency 0.05] [--error-rate 0.01]
+"""
+from aiohttp import web
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import html
+import os
+import random
+import re
+import zlib
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+PROFILE_TEMPLATE = os.path.join(SAMPLES_DIR, "characterprofile_active.html")
+
+HIGHSCORES_PAGE_SIZE = 50
+VOCATIONS = ["Elite Knight", "Royal Paladin", "Master Sorcerer", "Elder Druid"]
+GUILDS = ["Bench Alpha", "Bench Beta", "Bench Gamma", ""]
+
+@dataclass
+class FakeTaleonConfig:
+    latency: float = 0.0  # segundos por resposta
+    jitter: float = 0.0  # variação máxima, para mais ou para menos
+    error_rate: float = 0.0  # fração das respostas com 503
+    players: int = 1000  # jogadores no ranking
+    online_ratio: float = 0.2  # fração dos jogadores na lista de online
+    advance: bool = False  # cada perfil servido ganha experiência (força gravação)
+    etag: bool = True  # responde 304 quando o If-None-Match confere
+    seed: int = 0
+
+def player_name(index: int) -> str:
+    return f"Bench {index:04d}"
+
+def _format_number(value: int) -> str:
+    # O site usa ponto como separador de milhar
+    return f"{value:,}".replace(",", ".")
+
+def _level_for(experience: int) -> int:
+    # Aproximação da tabela de experiência do Tibia: exp ~ 50/3 * level^3
+    return max(1, int((experience * 3 / 50) ** (1 / 3)))
+
+def _row(*cells: str, header: bool = False) -> str:
+    tag = "th" if header else "td"
+    return "<tr>" + "".join(f"<{tag}>{cell}</{tag}>" for cell in cells) + "</tr>"
+
+def _page(title: str, rows: List[str]) -> str:
+    return (
+        f"<html><head><title>{title}</title></head><body>"
+        f"<table class=\"table table-striped table-hover\">{''.join(rows)}</table>"
+        "</body></html>"
+    )
+
+def _link(name: str) -> str:
+    return f"<a href=\"characterprofile.php?name={html.escape(name)}\">{html.escape(name)}</a>"
+
+class FakeTaleon:
+    """Estado do servidor falso: jogadores, experiência atual e contadores"""
+
+    def __init__(self, config: FakeTaleonConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        with open(PROFILE_TEMPLATE, encoding="utf-8") as f:
+            self.profile_template = f.read()
+        self.experience: Dict[str, int] = {}
+        # Ranking determinístico: o primeiro jogador tem mais experiência
+        for index in range(1, config.players + 1):
+            self.experience[player_name(index).lower()] = 5_000_000_000 - index * 1_000_000
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+
+    def _player(self, name: str) -> Tuple[str, int]:
+        key = name.lower()
+        if key not in self.experience:
+            # Nomes fora do ranking também existem, com experiência derivada do nome
+            self.experience[key] = 1_000_000 + zlib.crc32(key.encode()) % 1_000_000_000
+        if self.config.advance:
+            self.experience[key] += 1000
+        return name, self.experience[key]
+
+    def _vocation(self, name: str) -> str:
+        return VOCATIONS[zlib.crc32(name.lower().encode()) % len(VOCATIONS)]
+
+    def _guild(self, name: str) -> str:
+        return GUILDS[zlib.crc32(name.lower().encode()) % len(GUILDS)]
+
+    def profile_page(self, name: str) -> Optional[str]:
+        if not name:
+            return None
+        name, experience = self._player(name)
+        content = self.profile_template
+        content = re.sub(r"(alt=\"img\">)[^<]*(</td>)", rf"\g<1> {html.escape(name)}\g<2>", content, count=1)
+        content = re.sub(r"(Level:</td><td>)[^<]*", rf"\g<1>{_format_number(_level_for(experience))}", content, count=1)
+        content = re.sub(r"(Vocation:</td><td>)[^<]*", rf"\g<1>{self._vocation(name)}", content, count=1)
+        content = re.sub(r"(Experience:</td><td>)[^<]*", rf"\g<1>{_format_number(experience)}", content, count=1)
+        return content
+
+    def highscores_page(self, page: int) -> str:
+        ranking = sorted(self.experience.items(), key=lambda item: item[1], reverse=True)[:self.config.players]
+        start = (max(page, 1) - 1) * HIGHSCORES_PAGE_SIZE
+        rows = [_row("Rank", "Name", "Vocation", "Level", "Experience", header=True)]
+        for position, (key, experience) in enumerate(ranking[start:start + HIGHSCORES_PAGE_SIZE], start=start + 1):
+            name = key.title()
+            rows.append(_row(
+                str(position), _link(name), self._vocation(name),
+                _format_number(_level_for(experience)), _format_number(experience),
+            ))
+        return _page("Highscores", rows)
+
+    def online_page(self) -> str:
+        count = int(self.config.players * self.config.online_ratio)
+        indexes = sorted(self.random.sample(range(1, self.config.players + 1), count)) if count else []
+        rows = [_row("Name", "Level", "Vocation", "Guild", header=True)]
+        for index in indexes:
+            name = player_name(index)
+            rows.append(_row(
+                _link(name), str(_level_for(self.experience[name.lower()])), self._vocation(name), self._guild(name),
+            ))
+        return _page("Who is online", rows)
+
+    def guild_page(self, guild: str) -> str:
+        rows = [_row("Rank", "Name", "Vocation", "Level", "Status", header=True)]
+        for index in range(1, self.config.players + 1):
+            name = player_name(index)
+            if self._guild(name).lower() == guild.lower():
+                rows.append(_row(
+                    "Member", _link(name), self._vocation(name),
+                    str(_level_for(self.experience[name.lower()])), "Offline",
+                ))
+        return _page(guild, rows)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        page = request.match_info["page"]
+        self.requests[page] = self.requests.get(page, 0) + 1
+
+        delay = self.config.latency + self.random.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.config.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        query = request.query
+        if page == "characterprofile.php":
+            content = self.profile_page(query.get("name", ""))
+        elif page == "highscores.php":
+            content = self.highscores_page(int(query.get("page", "1") or 1))
+        elif page == "online.php":
+            content = self.online_page()
+        elif page == "guildprofile.php":
+            content = self.guild_page(query.get("name", ""))
+        else:
+            content = None
+        if content is None:
+            return web.Response(status=404, text="Not Found")
+
+        headers = {}
+        if self.config.etag:
+            etag = '"' + hashlib.md5(content.encode()).hexdigest() + '"'
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+            headers["ETag"] = etag
+        return web.Response(text=content, content_type="text/html", charset="utf-8", headers=headers)
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "errors": self.errors}
+
+def create_app(config: FakeTaleonConfig) -> web.Application:
+    server = FakeTaleon(config)
+    app = web.Application()
+    app["server"] = server
+    app.router.add_get("/{page}", server.handle)
+    return app
+
+async def start_fake_taleon(config: FakeTaleonConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[web.AppRunner, str]:
+    """
+    Inicia o servidor no loop atual e retorna o runner e a URL base.
+
+    Com `port` 0 o sistema escolhe uma porta livre. Encerre com `await runner.cleanup()`.
+    """
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+def config_arguments(parser: argparse.ArgumentParser):
+    """Opções do servidor falso, compartilhadas com o runner dos benchmarks"""
+    parser.add_argument("--latency", type=float, default=0.0, help="latência por resposta, em segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variação máxima da latência, em segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração das respostas com 503")
+    parser.add_argument("--players", type=int, default=1000, help="jogadores no ranking")
+    parser.add_argument("--seed", type=int, default=0)
+
+def config_from_args(args: argparse.Namespace, **overrides) -> FakeTaleonConfig:
+    values = dict(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        players=args.players, seed=args.seed,
+    )
+    values.update(overrides)
+    return FakeTaleonConfig(**values)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--advance", action="store_true", help="cada perfil servido ganha experiência")
+    parser.add_argument("--no-etag", action="store_true", help="não responde 304")
+    config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args, advance=args.advance, etag=not args.no_etag)
+    print(f"Servidor falso do Taleon em http://{args.host}:{args.port}")
+    web.run_app(create_app(config), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Suíte de benchmarks offline, contra o servidor falso do Taleon (fake_taleon.py).
+
+Cenários:
+    parse    extração de perfis (parse_profile) sobre páginas geradas pelo servidor falso
+    proxy    latência do proxy de páginas com cache frio (nomes inéditos) e quente (nomes repetidos)
+    refresh  atualização completa de N personagens (refresh_characters), primeira coleta e recoleta sem mudanças
+    list     latência de GET /api/characters/ com históricos de tamanhos crescentes
+
+proxy e refresh usam o Redis configurado (REDIS_URL); refresh e list usam o
+PostgreSQL configurado, criam personagens próprios (mundo "Bench") e os
+removem ao final. Os resultados são gravados em JSON, para comparação entre
+versões com --compare.
+
+Uso (a partir do diretório backend):
+    python benchmarks/run.py [--scenarios parse,proxy] [--latency 0.05] [--output results.json]
+    python benchmarks/run.py --compare antes.json depois.json
+"""
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+# Adiciona o diretório backend ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_taleon import FakeTaleon, config_arguments, config_from_args, player_name, start_fake_taleon
+
+SCENARIOS = ["parse", "proxy", "refresh", "list"]
+BENCH_WORLD = "Bench"  # mundo dos personagens criados pelos cenários com banco
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies: List[float], wall_time: float, errors: int = 0) -> dict:
+    """Estatísticas de latência (em ms) e vazão de um cenário"""
+    ordered = sorted(latencies)
+    result = {"count": len(ordered), "errors": errors, "wall_time": round(wall_time, 4)}
+    if ordered:
+        result.update({
+            "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        })
+    result["throughput"] = round(len(ordered) / wall_time, 2) if wall_time > 0 else 0.0
+    return result
+
+async def run_load(calls: List[Callable[[], Awaitable[bool]]], concurrency: int) -> dict:
+    """Executa as chamadas com até `concurrency` simultâneas; cada uma retorna se teve sucesso"""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(calls)
+
+    async def worker():
+        nonlocal errors
+        for call in pending:
+            started = time.perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def bench_parse(args, server: FakeTaleon) -> Dict[str, dict]:
+    from services.profile_parser import parse_profile
+
+    pages = [(player_name(i), server.profile_page(player_name(i))) for i in range(1, args.characters + 1)]
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for name, html_content in pages:
+            page_started = time.perf_counter()
+            if parse_profile(html_content, name) is None:
+                raise RuntimeError(f"Perfil não reconhecido: {name}")
+            latencies.append(time.perf_counter() - page_started)
+    result = summarize(latencies, time.perf_counter() - started)
+    result["bytes_per_page"] = round(statistics.mean(len(html_content) for _, html_content in pages))
+    return {"parse": result}
+
+def _api_client():
+    import httpx
+    from main import app
+    return httpx.AsyncClient(app=app, base_url="http://bench")
+
+async def bench_proxy(args, server: FakeTaleon) -> Dict[str, dict]:
+    run_id = uuid.uuid4().hex[:8]
+    results = {}
+    async with _api_client() as client:
+        async def get_profile(name: str) -> bool:
+            response = await client.get("/api/proxy/taleon/characterprofile.php", params={"name": name})
+            return response.status_code == 200
+
+        # Frio: cada requisição é um nome inédito, então sempre busca no servidor
+        cold = [lambda i=i: get_profile(f"Cold {run_id} {i}") for i in range(args.requests)]
+        results["proxy_cold"] = await run_load(cold, args.concurrency)
+
+        # Quente: poucos nomes, já em cache antes da medição
+        hot_names = [f"Warm {run_id} {i}" for i in range(min(args.characters, 20))]
+        for name in hot_names:
+            await get_profile(name)
+        warm = [lambda i=i: get_profile(hot_names[i % len(hot_names)]) for i in range(args.requests)]
+        results["proxy_warm"] = await run_load(warm, args.concurrency)
+    return results
+
+async def _create_bench_characters(db, names: List[str]) -> List[int]:
+    from sqlalchemy import insert, select
+    from models.character import Character
+
+    existing = (await db.execute(select(Character.name).where(Character.name.in_(names)))).scalars().all()
+    if existing:
+        raise RuntimeError(f"Personagens de benchmark já cadastrados ({existing[0]}...): remova-os antes")
+    now = datetime.utcnow()
+    result = await db.execute(
+        insert(Character).returning(Character.id),
+        [{"name": name, "world": BENCH_WORLD, "created_at": now, "updated_at": now} for name in names],
+    )
+    ids = list(result.scalars().all())
+    await db.commit()
+    return ids
+
+async def _delete_bench_characters(db, ids: List[int]):
+    from sqlalchemy import delete
+    from models.character import Character
+    from models.character_history import CharacterHistory
+
+    # O histórico não tem exclusão em cascata no banco; eventos e resumos diários têm
+    await db.execute(delete(CharacterHistory).where(CharacterHistory.character_id.in_(ids)))
+    await db.execute(delete(Character).where(Character.id.in_(ids)))
+    await db.commit()
+
+async def bench_refresh(args, server: FakeTaleon) -> Dict[str, dict]:
+    from database import AsyncSessionLocal
+    from services.refresh import refresh_characters
+
+    names = [player_name(i) for i in range(1, args.characters + 1)]
+    results = {}
+    async with AsyncSessionLocal() as db:
+        ids = await _create_bench_characters(db, names)
+        try:
+            # Primeira coleta grava todos; a segunda recebe 304 (ETag) ou conteúdo igual
+            for label in ("refresh_full", "refresh_unchanged"):
+                summary = await refresh_characters(
+                    names, db, concurrency=args.concurrency, rate=1e6, burst=len(names), max_retries=1,
+                )
+                result = summary.as_dict()
+                result.pop("failed_names")
+                result["throughput"] = round(summary.total / summary.wall_time, 2) if summary.wall_time else 0.0
+                results[label] = result
+        finally:
+            await _delete_bench_characters(db, ids)
+    return results
+
+async def _seed_history(db, ids: List[int], start: int, end: int):
+    """Completa o histórico de cada personagem com os registros de `start` a `end` (exclusivo)"""
+    from sqlalchemy import insert
+    from models.character_history import CharacterHistory
+    from services.partitions import ensure_partitions
+
+    now = datetime.utcnow()
+    oldest = now - timedelta(minutes=end)
+    await db.run_sync(lambda session: ensure_partitions(session.connection(), since=oldest.date()))
+    rows = []
+    for character_id in ids:
+        for index in range(start, end):
+            rows.append({
+                "character_id": character_id,
+                "level": 100 + index,
+                "experience": float(1_000_000 + index * 1000),
+                "deaths": 0,
+                "timestamp": now - timedelta(minutes=index),
+            })
+            if len(rows) >= 10000:
+                await db.execute(insert(CharacterHistory), rows)
+                rows = []
+    if rows:
+        await db.execute(insert(CharacterHistory), rows)
+    await db.commit()
+
+async def bench_list(args, server: FakeTaleon) -> Dict[str, dict]:
+    from database import AsyncSessionLocal
+
+    names = [f"{player_name(i)} List" for i in range(1, args.characters + 1)]
+    sizes = sorted(int(size) for size in args.history_sizes.split(","))
+    results = {}
+    async with AsyncSessionLocal() as db, _api_client() as client:
+        ids = await _create_bench_characters(db, names)
+        try:
+            async def list_page() -> bool:
+                response = await client.get("/api/characters/", params={"world": BENCH_WORLD, "limit": 50})
+                return response.status_code == 200
+
+            seeded = 0
+            for size in sizes:
+                await _seed_history(db, ids, seeded, size)
+                seeded = size
+                await list_page()  # aquece o pool de conexões e o plano da consulta
+                results[f"list_history_{size}"] = await run_load(
+                    [list_page for _ in range(args.requests)], args.concurrency,
+                )
+        finally:
+            await _delete_bench_characters(db, ids)
+    return results
+
+RUNNERS = {
+    "parse": bench_parse,
+    "proxy": bench_proxy,
+    "refresh": bench_refresh,
+    "list": bench_list,
+}
+
+async def run(args) -> dict:
+    from services.http_client import close_http_client, start_http_client
+    from services.redis_client import close_redis
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(RUNNERS)
+    if unknown:
+        raise SystemExit(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    runner, base_url = await start_fake_taleon(config_from_args(args), port=args.port)
+    server = runner.app["server"]
+    await start_http_client()
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "taleon_base_url": base_url,
+        },
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": {},
+    }
+    try:
+        for name in scenarios:
+            print(f"Executando {name}...", file=sys.stderr)
+            outcome = RUNNERS[name](args, server)
+            if asyncio.iscoroutine(outcome):
+                outcome = await outcome
+            report["results"].update(outcome)
+    finally:
+        report["fake_taleon"] = server.stats()
+        await close_http_client()
+        await close_redis()
+        await runner.cleanup()
+        if {"refresh", "list"} & set(scenarios):
+            from database import async_engine
+            await async_engine.dispose()
+    return report
+
+COMPARED_METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput"]
+
+def compare(base_path: str, new_path: str):
+    """Mostra a variação das métricas de cada cenário presente nos dois arquivos"""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    print(f"{'cenário':24} {'métrica':12} {'antes':>12} {'depois':>12} {'variação':>10}")
+    for scenario in sorted(set(base) & set(new)):
+        for metric in COMPARED_METRICS:
+            before, after = base[scenario].get(metric), new[scenario].get(metric)
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before * 100:+9.1f}%" if before else f"{'-':>10}"
+            print(f"{scenario:24} {metric:12} {before:12.3f} {after:12.3f} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="parse,proxy", help=f"separados por vírgula: {','.join(SCENARIOS)}")
+    parser.add_argument("--characters", type=int, default=200, help="personagens por cenário")
+    parser.add_argument("--requests", type=int, default=500, help="requisições por medição")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5, help="repetições do cenário parse")
+    parser.add_argument("--history-sizes", default="10,100,1000", help="registros de histórico por personagem")
+    parser.add_argument("--port", type=int, default=0, help="porta do servidor falso (0: livre)")
+    parser.add_argument("--output", help="arquivo JSON de resultados (padrão: saída padrão)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois arquivos de resultados")
+    config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # A URL do Taleon é lida na importação dos serviços, então precisa ser definida antes
+    args.port = args.port or _free_port()
+    os.environ["TALEON_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    # Os logs por requisição distorceriam as medições
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
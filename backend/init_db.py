@@ -1,69 +1,38 @@
-import sys
-import os
+"""
+Cria ou atualiza o esquema do banco aplicando as migrações pendentes.
 
-# Adiciona o diretório atual ao PYTHONPATH
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+Uso (a partir do diretório backend):
+    python3 init_db.py            aplica as migrações pendentes
+    python3 init_db.py --status   mostra a versão atual e as pendentes
+"""
+import argparse
+import logging
 
-from database import engine, Base
-from backend.models.character import Character
-from backend.models.character_history import CharacterHistory
-from sqlalchemy import text
+from database import engine
+from migrations import applied_versions, available_migrations, run_migrations
+from services.partitions import ensure_history_partitions
 
 def init_db():
-    # Primeiro, vamos verificar se a tabela characters existe
-    with engine.connect() as conn:
-        result = conn.execute(text("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'characters')"))
-        table_exists = result.scalar()
-
-        if table_exists:
-            # Se a tabela existe, vamos verificar se precisamos adicionar as novas colunas
-            result = conn.execute(text("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'characters'
-            """))
-            existing_columns = [row[0] for row in result]
-
-            # Adicionar colunas que não existem
-            if 'level' not in existing_columns:
-                conn.execute(text("ALTER TABLE characters ADD COLUMN level INTEGER"))
-            if 'vocation' not in existing_columns:
-                conn.execute(text("ALTER TABLE characters ADD COLUMN vocation VARCHAR"))
-            if 'world' not in existing_columns:
-                conn.execute(text("ALTER TABLE characters ADD COLUMN world VARCHAR"))
-            if 'last_updated' not in existing_columns:
-                conn.execute(text("ALTER TABLE characters ADD COLUMN last_updated TIMESTAMP"))
-
-            # Verificar se a tabela character_history existe
-            result = conn.execute(text("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'character_history')"))
-            history_exists = result.scalar()
+    run_migrations(engine)
 
-            if history_exists:
-                # Verificar se as colunas existem
-                result = conn.execute(text("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'character_history'
-                """))
-                history_columns = [row[0] for row in result]
+    # Partições mensais do histórico: do mês atual até alguns meses à frente
+    with engine.begin() as conn:
+        ensure_history_partitions(conn)
 
-                # Adicionar coluna deaths se não existir
-                if 'deaths' not in history_columns:
-                    conn.execute(text("ALTER TABLE character_history ADD COLUMN deaths INTEGER DEFAULT 0"))
-                    # Atualizar registros existentes
-                    conn.execute(text("UPDATE character_history SET deaths = 0 WHERE deaths IS NULL"))
-                
-                # Adicionar coluna daily_experience se não existir
-                if 'daily_experience' not in history_columns:
-                    conn.execute(text("ALTER TABLE character_history ADD COLUMN daily_experience FLOAT DEFAULT 0"))
-                    # Atualizar registros existentes
-                    conn.execute(text("UPDATE character_history SET daily_experience = 0 WHERE daily_experience IS NULL"))
-
-            conn.commit()
-
-    # Criar todas as tabelas
-    Base.metadata.create_all(bind=engine)
+def print_status():
+    with engine.connect() as conn:
+        applied = set(applied_versions(conn))
+    for migration in available_migrations():
+        state = "aplicada" if migration.version in applied else "pendente"
+        print(f"{migration.version:04d} {migration.name}: {state}")
 
 if __name__ == "__main__":
-    init_db()
-    print("Banco de dados inicializado com sucesso!")
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="apenas mostra o estado das migrações")
+    args = parser.parse_args()
+    if args.status:
+        print_status()
+    else:
+        init_db()
+        print("Banco de dados inicializado com sucesso!")
@@ -1,16 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routers import characters, auth, proxy
+from routers import characters, auth, events, jobs, proxy, rankings, updates
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from database import async_engine
+from migrations import current_version, latest_version
+from services.http_client import start_http_client, close_http_client
+from services.jobs import queue_depth
+from services.logging_config import CorrelationIdMiddleware, configure_logging
+from services.metrics import CONTENT_TYPE_LATEST, QUEUE_DEPTH, MetricsMiddleware, render_metrics
+from services.redis_client import get_redis, close_redis
+from services.scheduler import (
+    schedule_highscores_refresh, schedule_online_probe, schedule_refreshes, schedule_retention,
+)
+from services.updates import broadcaster
 import logging
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
+# Configuração de logging (gravação em segundo plano, com id de correlação)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+scheduler = AsyncIOScheduler()
 
 # Configuração do CORS
 app.add_middleware(
@@ -20,22 +32,55 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(CorrelationIdMiddleware)
 
 # Inicialização do cache
 @app.on_event("startup")
 async def startup():
     try:
-        redis = aioredis.from_url("redis://localhost", encoding="utf8", decode_responses=True)
+        redis = get_redis()
         FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
         logger.info("Cache inicializado com sucesso")
     except Exception as e:
         logger.error(f"Erro ao inicializar cache: {str(e)}")
         raise
 
+    # O esquema é atualizado pelo init_db; aqui só se confere a versão, numa única consulta
+    try:
+        async with async_engine.connect() as conn:
+            version = await conn.run_sync(current_version)
+        if version != latest_version():
+            logger.warning(f"Banco de dados na versão {version}, esperada {latest_version()}: execute python3 init_db.py")
+    except Exception as e:
+        logger.error(f"Erro ao verificar a versão do banco de dados: {str(e)}")
+
+    # Cliente HTTP compartilhado por todas as chamadas ao Taleon
+    await start_http_client()
+
+    # Agendamentos: apenas enfileiram jobs, o scraping roda nos workers
+    schedule_refreshes(scheduler)
+    schedule_highscores_refresh(scheduler)
+    schedule_online_probe(scheduler)
+    schedule_retention(scheduler)
+    scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    scheduler.shutdown(wait=False)
+    await broadcaster.close()
+    await close_http_client()
+    await close_redis()
+    await async_engine.dispose()
+
 # Incluir routers
 app.include_router(characters.router, prefix="/api/characters", tags=["characters"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(proxy.router, prefix="/api/proxy", tags=["proxy"])
+app.include_router(rankings.router, prefix="/api/rankings", tags=["rankings"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(updates.router, prefix="/api/updates", tags=["updates"])
 
 @app.get("/")
 async def root():
@@ -45,3 +90,13 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
+
+# Métricas no formato do Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    try:
+        QUEUE_DEPTH.set(await queue_depth())
+    except Exception as e:
+        logger.warning(f"Erro ao ler o tamanho da fila: {str(e)}")
+    # O tipo já traz o charset; media_type faria o Starlette acrescentar outro
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
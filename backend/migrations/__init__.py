@@ -0,0 +1,100 @@
+"""
+Migrações versionadas do banco de dados.
+
+Cada migração é um módulo `vNNNN_descricao.py` neste pacote, com uma
+função `upgrade(conn)` que recebe uma conexão síncrona do SQLAlchemy. As
+versões aplicadas ficam na tabela schema_migrations; cada migração roda na
+própria transação, junto com o registro da versão, e um advisory lock impede
+que dois processos migrem ao mesmo tempo.
+
+As migrações usam SQL explícito, e não os modelos, para que continuem
+produzindo o mesmo esquema mesmo depois que os modelos mudarem.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import importlib
+import logging
+import pkgutil
+import re
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+# Chave arbitrária do advisory lock que serializa as migrações
+MIGRATIONS_LOCK_KEY = 72_041_018
+
+_MODULE_RE = re.compile(r"^v(\d{4})_(\w+)$")
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable
+
+def available_migrations() -> List[Migration]:
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        match = _MODULE_RE.match(module.name)
+        if not match:
+            continue
+        loaded = importlib.import_module(f"{__name__}.{module.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), loaded.upgrade))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+def _ensure_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """))
+
+def applied_versions(conn) -> List[int]:
+    exists = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": MIGRATIONS_TABLE}).scalar()
+    if not exists:
+        return []
+    return [row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version"))]
+
+def current_version(conn) -> Optional[int]:
+    versions = applied_versions(conn)
+    return versions[-1] if versions else None
+
+def latest_version() -> Optional[int]:
+    migrations = available_migrations()
+    return migrations[-1].version if migrations else None
+
+def pending_migrations(conn) -> List[Migration]:
+    applied = set(applied_versions(conn))
+    return [migration for migration in available_migrations() if migration.version not in applied]
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Aplica as migrações pendentes, em ordem, e retorna as versões aplicadas"""
+    applied = []
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            with engine.begin() as conn:
+                _ensure_table(conn)
+            # Relido depois do lock: outro processo pode ter acabado de migrar
+            with engine.connect() as conn:
+                pending = pending_migrations(conn)
+
+            for migration in pending:
+                logger.info(f"Aplicando migração {migration.version:04d} ({migration.name})")
+                with engine.begin() as conn:
+                    migration.upgrade(conn)
+                    conn.execute(
+                        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)"),
+                        {"version": migration.version, "name": migration.name},
+                    )
+                applied.append(migration.version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+            lock_conn.commit()
+
+    if not applied:
+        logger.info("Banco de dados já está na versão mais recente")
+    return applied
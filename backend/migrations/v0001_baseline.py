@@ -0,0 +1,84 @@
+"""
+Esquema base: o mesmo que o init_db criava até aqui.
+
+Idempotente, para que bancos criados pelo init_db antigo (com qualquer
+subconjunto das colunas adicionadas ao longo do tempo) sejam trazidos ao
+mesmo ponto que um banco novo.
+"""
+from sqlalchemy import text
+
+from services.partitions import ensure_partitions, migrate_legacy_history, prepare_partitioned_migration
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS characters (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR,
+            level INTEGER,
+            vocation VARCHAR,
+            world VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """))
+    for column, type_ in (
+        ("level", "INTEGER"),
+        ("vocation", "VARCHAR"),
+        ("world", "VARCHAR"),
+        ("created_at", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("updated_at", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("content_hash", "VARCHAR(64)"),
+        ("etag", "VARCHAR"),
+        ("last_modified", "VARCHAR"),
+        ("last_checked", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("refresh_interval", "INTEGER"),
+        ("next_refresh_at", "TIMESTAMP WITHOUT TIME ZONE"),
+    ):
+        conn.execute(text(f"ALTER TABLE characters ADD COLUMN IF NOT EXISTS {column} {type_}"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_characters_name ON characters (name)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_id ON characters (id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_next_refresh_at ON characters (next_refresh_at)"))
+
+    # Bancos antigos têm o histórico numa tabela comum, sem as colunas mais novas
+    if conn.execute(text("SELECT to_regclass('character_history') IS NOT NULL")).scalar():
+        conn.execute(text("ALTER TABLE character_history ADD COLUMN IF NOT EXISTS deaths INTEGER DEFAULT 0"))
+        conn.execute(text("ALTER TABLE character_history ADD COLUMN IF NOT EXISTS daily_experience FLOAT DEFAULT 0"))
+        conn.execute(text("UPDATE character_history SET deaths = 0 WHERE deaths IS NULL"))
+        conn.execute(text("UPDATE character_history SET daily_experience = 0 WHERE daily_experience IS NULL"))
+    prepare_partitioned_migration(conn)
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS character_history (
+            id SERIAL NOT NULL,
+            character_id INTEGER REFERENCES characters (id),
+            level INTEGER,
+            experience FLOAT,
+            daily_experience FLOAT,
+            deaths INTEGER,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_character_history_id ON character_history (id)"))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_character_history_character_timestamp
+        ON character_history (character_id, timestamp)
+    """))
+    migrate_legacy_history(conn)
+    ensure_partitions(conn)
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS character_daily_stats (
+            character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            level INTEGER,
+            experience FLOAT,
+            deaths_total INTEGER,
+            experience_gained FLOAT,
+            levels_gained INTEGER,
+            deaths INTEGER,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (character_id, day)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_character_daily_stats_day ON character_daily_stats (day)"))
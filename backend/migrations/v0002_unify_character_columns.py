@@ -0,0 +1,38 @@
+"""
+Unifica as duas definições do modelo Character.
+
+O modelo antigo (backend/models.py) tinha outfit, experience, deaths e
+last_updated, que o modelo em uso não tinha. As três primeiras passam a
+existir na tabela; last_updated é absorvida por last_checked, que tem o
+mesmo significado.
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE characters ADD COLUMN IF NOT EXISTS outfit VARCHAR"))
+    # experience passa de 2^31 nos níveis altos
+    conn.execute(text("ALTER TABLE characters ADD COLUMN IF NOT EXISTS experience BIGINT"))
+    conn.execute(text("ALTER TABLE characters ALTER COLUMN experience TYPE BIGINT"))
+    conn.execute(text("ALTER TABLE characters ADD COLUMN IF NOT EXISTS deaths INTEGER DEFAULT 0"))
+
+    has_last_updated = conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'characters' AND column_name = 'last_updated'
+        )
+    """)).scalar()
+    if has_last_updated:
+        conn.execute(text("UPDATE characters SET last_checked = last_updated WHERE last_checked IS NULL"))
+        conn.execute(text("ALTER TABLE characters DROP COLUMN last_updated"))
+
+    # Valores atuais a partir do último registro de histórico de cada personagem
+    conn.execute(text("""
+        UPDATE characters c
+        SET experience = h.experience, deaths = h.deaths
+        FROM (
+            SELECT DISTINCT ON (character_id) character_id, experience, deaths
+            FROM character_history
+            ORDER BY character_id, timestamp DESC
+        ) h
+        WHERE h.character_id = c.id AND c.experience IS NULL
+    """))
@@ -0,0 +1,19 @@
+"""
+Índices das consultas mais frequentes.
+
+A listagem filtra personagens por mundo e vocação e ordena por level ou
+updated_at, com o id como desempate da paginação por cursor. O índice do histórico por
+personagem e data já vem do esquema base, mas é garantido aqui para bancos
+em que a tabela não foi recriada.
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_world ON characters (world)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_vocation ON characters (vocation)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_level_id ON characters (level, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_updated_at_id ON characters (updated_at, id)"))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_character_history_character_timestamp
+        ON character_history (character_id, timestamp)
+    """))
@@ -0,0 +1,25 @@
+"""
+Tabela de eventos dos personagens (level up/down, mortes, saltos de experiência).
+
+Os eventos são calculados na gravação de cada coleta; o feed pagina por id,
+então cada página custa o mesmo independentemente do tamanho do histórico.
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS character_events (
+            id BIGSERIAL PRIMARY KEY,
+            character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+            world VARCHAR,
+            type VARCHAR NOT NULL,
+            old_value BIGINT,
+            new_value BIGINT,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_character_events_character_id_id
+        ON character_events (character_id, id)
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_character_events_world_id ON character_events (world, id)"))
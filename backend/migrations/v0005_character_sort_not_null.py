@@ -0,0 +1,21 @@
+"""
+level e updated_at não nulos.
+
+A listagem pagina por (level, id) e (updated_at, id); numa comparação de
+tupla, um valor nulo torna o resultado nulo e o restante da listagem era
+descartado sem aviso. Registros antigos sem esses valores recebem level 0
+e, como updated_at, a data de cadastro.
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("UPDATE characters SET level = 0 WHERE level IS NULL"))
+    conn.execute(text("""
+        UPDATE characters
+        SET updated_at = COALESCE(created_at, now() AT TIME ZONE 'utc')
+        WHERE updated_at IS NULL
+    """))
+    conn.execute(text("ALTER TABLE characters ALTER COLUMN level SET DEFAULT 0"))
+    conn.execute(text("ALTER TABLE characters ALTER COLUMN level SET NOT NULL"))
+    conn.execute(text("ALTER TABLE characters ALTER COLUMN updated_at SET DEFAULT (now() AT TIME ZONE 'utc')"))
+    conn.execute(text("ALTER TABLE characters ALTER COLUMN updated_at SET NOT NULL"))
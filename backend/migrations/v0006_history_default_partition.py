@@ -0,0 +1,11 @@
+"""
+Partição DEFAULT do histórico.
+
+Sem ela, um registro com timestamp num mês sem partição (ex.: quando a
+criação antecipada das partições falhou) fazia a gravação inteira falhar.
+"""
+from services.partitions import ensure_default_partition, is_partitioned
+
+def upgrade(conn):
+    if is_partitioned(conn):
+        ensure_default_partition(conn)
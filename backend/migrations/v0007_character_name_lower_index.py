@@ -0,0 +1,11 @@
+"""
+Índice de lower(name).
+
+O cadastro em lote, a sonda de jogadores online e o feed de eventos buscam
+personagens por lower(name) IN (...), sem diferenciar maiúsculas; sem um
+índice da expressão cada busca percorria a tabela inteira.
+"""
+from sqlalchemy import text
+
+def upgrade(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_characters_name_lower ON characters (lower(name))"))
@@ -1,35 +0,0 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
-from sqlalchemy.orm import relationship
-from datetime import datetime
-from database import Base
-
-class Character(Base):
-    __tablename__ = "characters"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
-    level = Column(Integer)
-    vocation = Column(String)
-    world = Column(String)
-    outfit = Column(String)  # URL da imagem do outfit
-    experience = Column(Integer)
-    deaths = Column(Integer)
-    last_updated = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relacionamento com o histórico
-    history = relationship("CharacterHistory", back_populates="character")
-
-class CharacterHistory(Base):
-    __tablename__ = "character_history"
-
-    id = Column(Integer, primary_key=True, index=True)
-    character_id = Column(Integer, ForeignKey("characters.id"))
-    level = Column(Integer)
-    experience = Column(Float)
-    deaths = Column(Integer, default=0)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    
-    # Relacionamento com o personagem
-    character = relationship("Character", back_populates="history") 
\ No newline at end of file
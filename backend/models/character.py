@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -6,13 +6,36 @@ from .character_history import CharacterHistory
 
 class Character(Base):
     __tablename__ = "characters"
+    # O esquema é mantido pelas migrações (ver migrations/); os índices aqui as espelham
+    __table_args__ = (
+        # Listagem filtra por mundo/vocação e pagina por (coluna de ordenação, id)
+        Index("ix_characters_world", "world"),
+        Index("ix_characters_vocation", "vocation"),
+        Index("ix_characters_level_id", "level", "id"),
+        Index("ix_characters_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
-    level = Column(Integer, default=0)
+    # Não nulos: a listagem pagina por (level, id) e (updated_at, id)
+    level = Column(Integer, default=0, nullable=False)
     vocation = Column(String, default='')
     world = Column(String, default='')
+    outfit = Column(String)  # URL da imagem do outfit
+    experience = Column(BigInteger)
+    deaths = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Controle de mudanças do perfil: impressão digital dos campos extraídos e validadores HTTP
+    content_hash = Column(String(64))
+    etag = Column(String)
+    last_modified = Column(String)
+    last_checked = Column(DateTime)
+    # Agendamento adaptativo: intervalo entre coletas (segundos) e próxima coleta prevista
+    refresh_interval = Column(Integer)
+    next_refresh_at = Column(DateTime, index=True)
     
     history = relationship("CharacterHistory", back_populates="character", cascade="all, delete-orphan")
+
+# Buscas por nome sem diferenciar maiúsculas (cadastro em lote, sonda online, eventos)
+Index("ix_characters_name_lower", func.lower(Character.name))
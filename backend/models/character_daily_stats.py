@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Float, Index
+from database import Base
+from datetime import datetime
+
+class CharacterDailyStats(Base):
+    """Resumo diário (UTC) da evolução do personagem, calculado a partir do histórico"""
+    __tablename__ = "character_daily_stats"
+    __table_args__ = (
+        # Rankings filtram por intervalo de dias
+        Index("ix_character_daily_stats_day", "day"),
+    )
+
+    character_id = Column(Integer, ForeignKey("characters.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    # Valores do último registro do dia
+    level = Column(Integer)
+    experience = Column(Float)
+    deaths_total = Column(Integer, default=0)
+    # Variação em relação ao fim do dia anterior
+    experience_gained = Column(Float, default=0)
+    levels_gained = Column(Integer, default=0)
+    deaths = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Index
+from database import Base
+from datetime import datetime
+
+class CharacterEvent(Base):
+    """Evento detectado na gravação de uma coleta (level up, morte...)"""
+    __tablename__ = "character_events"
+    __table_args__ = (
+        # O feed pagina por id decrescente, filtrado por personagem ou por mundo
+        Index("ix_character_events_character_id_id", "character_id", "id"),
+        Index("ix_character_events_world_id", "world", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    character_id = Column(Integer, ForeignKey("characters.id", ondelete="CASCADE"), nullable=False)
+    world = Column(String, default='')
+    type = Column(String, nullable=False)
+    # Valor antes e depois da coleta (level, total de mortes ou experiência)
+    old_value = Column(BigInteger)
+    new_value = Column(BigInteger)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
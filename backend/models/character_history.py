@@ -1,16 +1,24 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from database import Base
+from datetime import datetime
 
 class CharacterHistory(Base):
     __tablename__ = "character_history"
+    __table_args__ = (
+        # Consultas de histórico sempre filtram por personagem e intervalo de tempo
+        Index("ix_character_history_character_timestamp", "character_id", "timestamp"),
+        # Particionada por mês (ver services/partitions.py); as partições são criadas pelas migrações
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Em tabelas particionadas a chave primária precisa incluir a coluna de partição
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     character_id = Column(Integer, ForeignKey("characters.id"))
     level = Column(Integer)
     experience = Column(Float)
     daily_experience = Column(Float, default=0)
     deaths = Column(Integer, default=0)
-    timestamp = Column(DateTime)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
     
-    character = relationship("Character", back_populates="history") 
\ No newline at end of file
+    character = relationship("Character", back_populates="history")
@@ -1,20 +1,82 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import datetime, timedelta
+from database import get_async_db
 from models.character import Character
-from schemas.character import CharacterCreate, CharacterResponse
-from services.scraper import scrape_character_data
+from models.character_history import CharacterHistory
+from schemas.character import (
+    BulkResult, CharacterBulkCreate, CharacterBulkRefresh, CharacterCreate, CharacterCreated,
+    CharacterHistorySeries, CharacterPage, CharacterResponse, CharacterSnapshot, CharacterSummary,
+    GuildImport, HighscoresRefreshResult, HistoryPoint, RefreshQueued, RefreshSchedule, ScheduleBucket,
+    ScheduledRefresh,
+)
+from services.bulk import BULK_MAX_NAMES, add_characters, refresh_characters_by_id
+from services.highscores_refresh import HIGHSCORES_MAX_PAGES, refresh_from_highscores
+from services.jobs import QUEUED, enqueue_refresh, get_job
+from services.refresh_schedule import tier_for_interval
+from services.taleon_pages import get_guild_members
+from collections import Counter
+import base64
+import json
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/", response_model=CharacterResponse)
-async def create_character(character: CharacterCreate, db: Session = Depends(get_db)):
+# Colunas aceitas para ordenação da listagem
+SORT_COLUMNS = {
+    "name": Character.name,
+    "level": Character.level,
+    "updated_at": Character.updated_at,
+}
+MAX_PAGE_SIZE = 200
+
+# Resoluções do histórico e a unidade correspondente do date_trunc
+HISTORY_RESOLUTIONS = {
+    "daily": "day",
+    "weekly": "week",
+    "monthly": "month",
+}
+MAX_HISTORY_POINTS = 5000
+
+def encode_cursor(value, character_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, character_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        value, character_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Cursores antigos podiam terminar num valor nulo, que não pode ser comparado
+        if value is None:
+            raise ValueError("cursor sem valor")
+        if sort == "updated_at":
+            value = datetime.fromisoformat(value)
+        return value, int(character_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+async def load_character(db: AsyncSession, character_id: int) -> Optional[Character]:
+    """Carrega o personagem com o histórico já populado (sem lazy load na sessão assíncrona)"""
+    result = await db.execute(
+        select(Character)
+        .options(selectinload(Character.history))
+        .where(Character.id == character_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+@router.post("/", response_model=CharacterCreated)
+async def create_character(character: CharacterCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verifica se o personagem já existe
-        existing_character = db.query(Character).filter(Character.name == character.name).first()
+        result = await db.execute(select(Character.id).where(Character.name == character.name))
+        existing_character = result.first()
         if existing_character:
             raise HTTPException(status_code=400, detail="Personagem já existe")
 
@@ -26,50 +88,319 @@ async def create_character(character: CharacterCreate, db: Session = Depends(get
             world=""  # Será atualizado pelo scraper
         )
         db.add(db_character)
-        db.commit()
-        db.refresh(db_character)
+        await db.commit()
 
-        # Tenta obter os dados do personagem
+        # Enfileira a coleta dos dados; a resposta não espera o scraping
+        job_id = None
         try:
-            await scrape_character_data(character.name, db)
+            job_id, _ = await enqueue_refresh(character.name)
         except Exception as e:
-            # Se falhar ao obter os dados, pelo menos o personagem foi criado
-            logger.error(f"Erro ao obter dados do personagem: {str(e)}")
+            # Se falhar ao enfileirar, pelo menos o personagem foi criado
+            logger.error(f"Erro ao enfileirar coleta do personagem: {str(e)}")
 
-        return db_character
+        created = CharacterCreated.model_validate(await load_character(db, db_character.id))
+        created.job_id = job_id
+        return created
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro ao criar personagem: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=List[CharacterResponse])
-async def list_characters(db: Session = Depends(get_db)):
-    return db.query(Character).all()
+def bulk_result(results: List[dict]) -> BulkResult:
+    return BulkResult(
+        total=len(results),
+        counts=dict(Counter(result["status"] for result in results)),
+        results=results,
+    )
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_characters_bulk(request: CharacterBulkCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cadastra vários personagens numa só requisição.
+
+    Cada nome recebe um status: created, exists, duplicate ou invalid. A
+    coleta dos novos (e dos existentes, com refresh_existing) é enfileirada.
+    """
+    if len(request.names) > BULK_MAX_NAMES:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BULK_MAX_NAMES} nomes por requisição")
+    try:
+        return bulk_result(await add_characters(db, request.names, request.refresh_existing))
+    except Exception as e:
+        logger.error(f"Erro ao cadastrar personagens em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/import/guild", response_model=BulkResult)
+async def import_guild(request: GuildImport, db: AsyncSession = Depends(get_async_db)):
+    """Cadastra todos os membros de uma guild a partir da página guildprofile.php"""
+    try:
+        members, _ = await get_guild_members(request.name)
+    except Exception as e:
+        logger.error(f"Erro ao buscar a guild {request.name}: {str(e)}")
+        raise HTTPException(status_code=502, detail="Erro ao acessar o servidor Taleon")
+    if not members:
+        raise HTTPException(status_code=404, detail="Guild não encontrada")
+
+    try:
+        results = await add_characters(db, [member.name for member in members], request.refresh_existing)
+    except Exception as e:
+        logger.error(f"Erro ao importar a guild {request.name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    logger.info(f"Guild {request.name} importada: {len(members)} membros")
+    return bulk_result(results)
+
+@router.post("/refresh", response_model=BulkResult, status_code=202)
+async def refresh_characters_bulk(request: CharacterBulkRefresh, db: AsyncSession = Depends(get_async_db)):
+    """Enfileira a atualização de vários personagens (ou de todos, sem character_ids)"""
+    try:
+        return bulk_result(await refresh_characters_by_id(db, request.character_ids))
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar atualização em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/refresh/highscores", response_model=HighscoresRefreshResult)
+async def refresh_characters_from_highscores(
+    max_pages: int = Query(HIGHSCORES_MAX_PAGES, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Atualiza level e experiência pelo ranking do Taleon, poucas páginas para
+    muitos personagens; os perfis são enfileirados só quando necessário.
+    """
+    try:
+        report = await refresh_from_highscores(db, max_pages)
+    except Exception as e:
+        logger.error(f"Erro na atualização pelo ranking: {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
+    return HighscoresRefreshResult(**report.as_dict())
+
+@router.get("/", response_model=CharacterPage)
+async def list_characters(
+    world: Optional[str] = None,
+    vocation: Optional[str] = None,
+    min_level: Optional[int] = None,
+    max_level: Optional[int] = None,
+    sort: str = Query("name", pattern="^(name|level|updated_at)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Lista os personagens com paginação por cursor (keyset).
+
+    Cada item traz apenas o último registro de histórico; o histórico
+    completo fica no detalhe do personagem.
+    """
+    sort_column = SORT_COLUMNS[sort]
+    query = select(Character)
+    if world:
+        query = query.where(Character.world == world)
+    if vocation:
+        query = query.where(Character.vocation == vocation)
+    if min_level is not None:
+        query = query.where(Character.level >= min_level)
+    if max_level is not None:
+        query = query.where(Character.level <= max_level)
+
+    # O id desempata valores iguais da coluna de ordenação
+    key = tuple_(sort_column, Character.id)
+    if cursor:
+        value, character_id = decode_cursor(cursor, sort)
+        bound = tuple_(value, character_id)
+        query = query.where(key > bound if order == "asc" else key < bound)
+    if order == "asc":
+        query = query.order_by(sort_column.asc(), Character.id.asc())
+    else:
+        query = query.order_by(sort_column.desc(), Character.id.desc())
+
+    # Busca um item a mais para saber se existe próxima página
+    characters = (await db.execute(query.limit(limit + 1))).scalars().all()
+    has_more = len(characters) > limit
+    characters = characters[:limit]
+
+    # Último registro de histórico de cada personagem da página, numa só consulta
+    latest = {}
+    if characters:
+        result = await db.execute(
+            select(CharacterHistory)
+            .where(CharacterHistory.character_id.in_([c.id for c in characters]))
+            .distinct(CharacterHistory.character_id)
+            .order_by(CharacterHistory.character_id, CharacterHistory.timestamp.desc())
+        )
+        latest = {h.character_id: h for h in result.scalars().all()}
+
+    items = []
+    for character in characters:
+        summary = CharacterSummary.model_validate(character)
+        history = latest.get(character.id)
+        summary.latest = CharacterSnapshot.model_validate(history) if history else None
+        items.append(summary)
+
+    next_cursor = None
+    if has_more:
+        last = characters[-1]
+        next_cursor = encode_cursor(getattr(last, sort), last.id)
+    return CharacterPage(items=items, next_cursor=next_cursor)
+
+@router.get("/schedule", response_model=RefreshSchedule)
+async def get_refresh_schedule(
+    window_hours: int = Query(24, ge=1, le=24 * 14),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Agenda de coletas planejada pelo agendamento adaptativo.
+
+    Traz quantos personagens há em cada nível de atividade, quantas coletas
+    estão previstas em cada hora da janela e os próximos personagens da fila.
+    """
+    now = datetime.utcnow()
+    intervals = await db.execute(
+        select(Character.refresh_interval, func.count()).group_by(Character.refresh_interval)
+    )
+    tiers = Counter()
+    for interval, count in intervals.all():
+        tiers[tier_for_interval(interval)] += count
+
+    due = await db.scalar(
+        select(func.count()).select_from(Character).where(Character.next_refresh_at <= now)
+    )
+
+    hour = func.date_trunc("hour", Character.next_refresh_at).label("hour")
+    buckets = await db.execute(
+        select(hour, func.count())
+        .where(Character.next_refresh_at > now, Character.next_refresh_at <= now + timedelta(hours=window_hours))
+        .group_by("hour")
+        .order_by("hour")
+    )
+
+    upcoming = await db.execute(
+        select(Character.id, Character.name, Character.refresh_interval, Character.next_refresh_at, Character.last_checked)
+        .where(Character.next_refresh_at.isnot(None))
+        .order_by(Character.next_refresh_at)
+        .limit(limit)
+    )
+    return RefreshSchedule(
+        generated_at=now,
+        due=due or 0,
+        tiers=dict(tiers),
+        per_hour=[ScheduleBucket(start=start, count=count) for start, count in buckets.all()],
+        upcoming=[
+            ScheduledRefresh(
+                character_id=row.id,
+                name=row.name,
+                tier=tier_for_interval(row.refresh_interval),
+                refresh_interval=row.refresh_interval,
+                next_refresh_at=row.next_refresh_at,
+                last_checked=row.last_checked,
+            )
+            for row in upcoming.all()
+        ],
+    )
 
 @router.get("/{character_id}", response_model=CharacterResponse)
-async def get_character(character_id: int, db: Session = Depends(get_db)):
-    character = db.query(Character).filter(Character.id == character_id).first()
+async def get_character(character_id: int, db: AsyncSession = Depends(get_async_db)):
+    character = await load_character(db, character_id)
     if not character:
         raise HTTPException(status_code=404, detail="Personagem não encontrado")
     return character
 
-@router.post("/{character_id}/update", response_model=CharacterResponse)
-async def update_character(character_id: int, db: Session = Depends(get_db)):
+@router.get("/{character_id}/history", response_model=CharacterHistorySeries)
+async def get_character_history(
+    character_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = Query("raw", pattern="^(raw|daily|weekly|monthly)$"),
+    limit: int = Query(500, ge=1, le=MAX_HISTORY_POINTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Histórico do personagem no intervalo [from, to), em ordem cronológica.
+
+    Com resolução diferente de "raw" os registros são agregados no banco por
+    dia, semana ou mês. Quando há mais pontos que `limit`, retorna os mais recentes.
+    """
+    if not await db.get(Character, character_id):
+        raise HTTPException(status_code=404, detail="Personagem não encontrado")
+
+    conditions = [CharacterHistory.character_id == character_id]
+    if start:
+        conditions.append(CharacterHistory.timestamp >= start)
+    if end:
+        conditions.append(CharacterHistory.timestamp < end)
+
+    if resolution == "raw":
+        result = await db.execute(
+            select(CharacterHistory)
+            .where(*conditions)
+            .order_by(CharacterHistory.timestamp.desc())
+            .limit(limit)
+        )
+        points = [
+            HistoryPoint(
+                timestamp=h.timestamp,
+                level=h.level,
+                experience=h.experience,
+                daily_experience=h.daily_experience or 0,
+                deaths=h.deaths,
+            )
+            for h in result.scalars().all()
+        ]
+    else:
+        unit = HISTORY_RESOLUTIONS[resolution]
+        buckets = (
+            select(
+                func.date_trunc(unit, CharacterHistory.timestamp).label("bucket"),
+                func.array_agg(aggregate_order_by(CharacterHistory.level, CharacterHistory.timestamp.desc()))[1].label("level"),
+                func.max(CharacterHistory.experience).label("experience"),
+                func.coalesce(func.sum(CharacterHistory.daily_experience), 0).label("daily_experience"),
+                func.array_agg(aggregate_order_by(CharacterHistory.deaths, CharacterHistory.timestamp.desc()))[1].label("last_deaths"),
+                func.array_agg(aggregate_order_by(CharacterHistory.deaths, CharacterHistory.timestamp.asc()))[1].label("first_deaths"),
+                func.count().label("samples"),
+            )
+            .where(*conditions)
+            .group_by("bucket")
+            .subquery()
+        )
+        # Mortes no período: diferença para o último valor do período anterior
+        previous_deaths = func.lag(buckets.c.last_deaths).over(order_by=buckets.c.bucket)
+        deaths_delta = func.greatest(buckets.c.last_deaths - func.coalesce(previous_deaths, buckets.c.first_deaths), 0)
+        result = await db.execute(
+            select(buckets, deaths_delta.label("deaths_delta"))
+            .order_by(buckets.c.bucket.desc())
+            .limit(limit)
+        )
+        points = [
+            HistoryPoint(
+                timestamp=row.bucket,
+                level=row.level,
+                experience=row.experience,
+                daily_experience=row.daily_experience,
+                deaths_delta=row.deaths_delta,
+                samples=row.samples,
+            )
+            for row in result.all()
+        ]
+
+    points.reverse()
+    return CharacterHistorySeries(character_id=character_id, resolution=resolution, points=points)
+
+@router.post("/{character_id}/update", response_model=RefreshQueued, status_code=202)
+async def update_character(character_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Enfileira a atualização do personagem; o andamento é consultado em /api/jobs/{job_id}"""
     try:
-        character = db.query(Character).filter(Character.id == character_id).first()
+        character = await db.get(Character, character_id)
         if not character:
             raise HTTPException(status_code=404, detail="Personagem não encontrado")
         
         logger.info(f"Atualizando personagem: {character.name}")
+        job_id, created = await enqueue_refresh(character.name)
+        if not created:
+            logger.info(f"Já existe coleta pendente para {character.name} (job {job_id})")
         
-        if not await scrape_character_data(character.name, db):
-            logger.error(f"Falha ao atualizar dados do personagem {character.name}")
-            raise HTTPException(status_code=500, detail="Erro ao atualizar dados do personagem")
-        
-        db.refresh(character)
-        logger.info(f"Personagem {character.name} atualizado com sucesso")
-        return character
+        job = await get_job(job_id)
+        return RefreshQueued(character_id=character_id, job_id=job_id, status=job["status"] if job else QUEUED)
     except HTTPException:
         raise
     except Exception as e:
@@ -77,15 +408,15 @@ async def update_character(character_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{character_id}")
-async def delete_character(character_id: int, db: Session = Depends(get_db)):
+async def delete_character(character_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        character = db.query(Character).filter(Character.id == character_id).first()
+        character = await db.get(Character, character_id)
         if not character:
             raise HTTPException(status_code=404, detail="Personagem não encontrado")
         
         logger.info(f"Excluindo personagem: {character.name}")
-        db.delete(character)
-        db.commit()
+        await db.delete(character)
+        await db.commit()
         logger.info(f"Personagem {character.name} excluído com sucesso")
         return {"message": "Personagem excluído com sucesso"}
     except HTTPException:
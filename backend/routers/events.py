@@ -0,0 +1,97 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_async_db
+from models.character import Character
+from models.character_event import CharacterEvent
+from schemas.event import CharacterEvent as CharacterEventSchema, EventPage
+from services.events import EVENT_TYPES
+from services.taleon_pages import get_guild_members
+import base64
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(event_id: int) -> str:
+    return base64.urlsafe_b64encode(str(event_id).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+async def guild_character_ids(db: AsyncSession, guild: str) -> List[int]:
+    """Ids dos personagens cadastrados que são membros da guilda (lista da guilda em cache)"""
+    try:
+        members, _ = await get_guild_members(guild)
+    except Exception as e:
+        logger.error(f"Erro ao buscar a guilda {guild}: {str(e)}")
+        raise HTTPException(status_code=502, detail="Erro ao buscar a guilda no Taleon")
+    names = [member.name.lower() for member in members]
+    if not names:
+        return []
+    result = await db.execute(select(Character.id).where(func.lower(Character.name).in_(names)))
+    return list(result.scalars().all())
+
+@router.get("/", response_model=EventPage)
+async def list_events(
+    character_id: Optional[int] = None,
+    world: Optional[str] = None,
+    guild: Optional[str] = None,
+    type: List[str] = Query([]),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Feed de eventos (level up/down, mortes, saltos de experiência), do mais novo para o mais antigo.
+
+    Paginado por cursor sobre o id do evento: com os índices por personagem e
+    por mundo, cada página lê apenas os seus itens, qualquer que seja o
+    tamanho do histórico.
+    """
+    invalid = [value for value in type if value not in EVENT_TYPES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tipo de evento inválido: {', '.join(invalid)}")
+
+    query = (
+        select(CharacterEvent, Character.name)
+        .join(Character, Character.id == CharacterEvent.character_id)
+    )
+    if character_id is not None:
+        query = query.where(CharacterEvent.character_id == character_id)
+    if world:
+        query = query.where(CharacterEvent.world == world)
+    if guild:
+        member_ids = await guild_character_ids(db, guild)
+        if not member_ids:
+            return EventPage(items=[])
+        query = query.where(CharacterEvent.character_id.in_(member_ids))
+    if type:
+        query = query.where(CharacterEvent.type.in_(type))
+    if cursor:
+        query = query.where(CharacterEvent.id < decode_cursor(cursor))
+
+    # Busca um item a mais para saber se existe próxima página
+    rows = (await db.execute(query.order_by(CharacterEvent.id.desc()).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    items = [
+        CharacterEventSchema(
+            id=event.id,
+            character_id=event.character_id,
+            name=name,
+            world=event.world or "",
+            type=event.type,
+            old_value=event.old_value,
+            new_value=event.new_value,
+            timestamp=event.timestamp,
+        )
+        for event, name in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1].id) if has_more else None
+    return EventPage(items=items, next_cursor=next_cursor)
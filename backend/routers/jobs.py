@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+from schemas.job import JobStatus
+from services.jobs import get_job
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return JobStatus(
+        id=job["id"],
+        type=job.get("type", "refresh"),
+        character=job["character"],
+        status=job["status"],
+        attempts=int(job.get("attempts", 0)),
+        result=job.get("result") or None,
+        error=job.get("error") or None,
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )
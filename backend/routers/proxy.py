@@ -1,30 +1,40 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from fastapi.responses import HTMLResponse
+from dataclasses import asdict
+from typing import Optional
 import aiohttp
+import asyncio
 import logging
-from urllib.parse import urlparse
-from fastapi_cache import FastAPICache
-from fastapi_cache.decorator import cache
+from services.page_parsers import filter_by_level, filter_by_vocation
+from services.singleflight import CoalescedFetchError
+from services.taleon_pages import (
+    TALEON_BASE_URL, TaleonPageError, cache_stats, get_guild_members, get_highscores,
+    get_online_players, get_page, ttl_for,
+)
+from schemas.taleon import GuildProfile, HighscorePage, OnlinePage
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Configurações
-TALEON_BASE_URL = "https://san.taleon.online"
-TIMEOUT = 10  # segundos
 ALLOWED_PATHS = [
     "characterprofile.php",
     "guildprofile.php",
     "highscores.php",
     "online.php"
 ]
+MAX_PAGE_SIZE = 500
 
 def is_valid_path(path: str) -> bool:
     """Verifica se o path está na lista de paths permitidos"""
     return any(allowed in path for allowed in ALLOWED_PATHS)
 
+@router.get("/cache/stats")
+async def proxy_cache_stats():
+    """Contadores de acertos e falhas dos caches do proxy neste processo"""
+    return cache_stats()
+
 @router.get("/taleon/{path:path}")
-@cache(expire=300)  # Cache por 5 minutos
 async def proxy_taleon(path: str, request: Request):
     """
     Proxy para a API do Taleon
@@ -40,42 +50,127 @@ async def proxy_taleon(path: str, request: Request):
         # Obtém os parâmetros da query
         query_params = dict(request.query_params)
         
-        # Log da requisição
-        logger.info(f"Proxy request: {full_url} with params: {query_params}")
+        # Em DEBUG: a rota é chamada a cada página e o log formatado custaria em todas
+        logger.debug("Proxy request: %s with params: %s", full_url, query_params)
+        
+        # Serve do cache; em caso de falha, requisições simultâneas para a
+        # mesma página aguardam uma única busca
+        html_content, cache_status = await get_page(path, query_params)
+        ttl = ttl_for(path)
         
-        # Faz a requisição com timeout
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                full_url,
-                params=query_params,
-                timeout=TIMEOUT,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-            ) as response:
-                # Log do status da resposta
-                logger.info(f"Proxy response status: {response.status}")
-                
-                # Verifica o status da resposta
-                if response.status != 200:
-                    raise HTTPException(status_code=response.status, detail="Erro ao acessar o servidor Taleon")
-                
-                # Obtém o conteúdo HTML
-                html_content = await response.text()
-                logger.info(f"Proxy response content length: {len(html_content)}")
-                
-                # Retorna o conteúdo HTML
-                return HTMLResponse(
-                    content=html_content,
-                    headers={
-                        "Content-Type": "text/html; charset=utf-8",
-                        "Cache-Control": "public, max-age=300"
-                    }
-                )
+        # Retorna o conteúdo HTML
+        return HTMLResponse(
+            content=html_content,
+            headers={
+                "Content-Type": "text/html; charset=utf-8",
+                "Cache-Control": f"public, max-age={ttl}",
+                "X-Cache": cache_status
+            }
+        )
         
-    except aiohttp.ClientError as e:
+    except HTTPException:
+        raise
+    except (TaleonPageError, CoalescedFetchError) as e:
+        raise HTTPException(status_code=e.status or 500, detail="Erro ao acessar o servidor Taleon")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         logger.error(f"Erro ao acessar o servidor Taleon: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao acessar o servidor Taleon")
     except Exception as e:
         logger.error(f"Erro inesperado: {str(e)}")
-        raise HTTPException(status_code=500, detail="Erro interno do servidor") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Erro interno do servidor") 
+
+async def load_parsed(load, *args):
+    """Executa a busca dos registros convertendo falhas do Taleon em erros HTTP"""
+    try:
+        items, cache_status = await load(*args)
+    except (TaleonPageError, CoalescedFetchError) as e:
+        raise HTTPException(status_code=e.status or 500, detail="Erro ao acessar o servidor Taleon")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Erro ao acessar o servidor Taleon: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao acessar o servidor Taleon")
+    return items, cache_status
+
+def set_cache_headers(response: Response, path: str, cache_status: str):
+    response.headers["Cache-Control"] = f"public, max-age={ttl_for(path)}"
+    response.headers["X-Cache"] = cache_status
+
+@router.get("/highscores", response_model=HighscorePage)
+async def list_highscores(
+    response: Response,
+    type: str = Query("experience", description="Categoria do ranking no Taleon"),
+    page: int = Query(1, ge=1, description="Página do ranking no Taleon"),
+    vocation: Optional[str] = None,
+    min_level: Optional[int] = Query(None, ge=1),
+    max_level: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Ranking do Taleon já extraído, com filtros por vocação e level"""
+    entries, cache_status = await load_parsed(get_highscores, type, page)
+    set_cache_headers(response, "highscores.php", cache_status)
+    entries = filter_by_level(filter_by_vocation(entries, vocation), min_level, max_level)
+    return HighscorePage(
+        type=type,
+        total=len(entries),
+        offset=offset,
+        limit=limit,
+        entries=[asdict(entry) for entry in entries[offset:offset + limit]],
+    )
+
+@router.get("/online", response_model=OnlinePage)
+async def list_online(
+    response: Response,
+    vocation: Optional[str] = None,
+    guild: Optional[str] = None,
+    min_level: Optional[int] = Query(None, ge=1),
+    max_level: Optional[int] = Query(None, ge=1),
+    sort: str = Query("level", pattern="^(level|name)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Jogadores online no Taleon, com filtros por vocação, guild e level"""
+    players, cache_status = await load_parsed(get_online_players)
+    set_cache_headers(response, "online.php", cache_status)
+    players = filter_by_level(filter_by_vocation(players, vocation), min_level, max_level)
+    if guild:
+        players = [player for player in players if player.guild.lower() == guild.strip().lower()]
+    if sort == "name":
+        players = sorted(players, key=lambda player: player.name.lower(), reverse=order == "desc")
+    else:
+        players = sorted(players, key=lambda player: player.level, reverse=order == "desc")
+    return OnlinePage(
+        total=len(players),
+        offset=offset,
+        limit=limit,
+        players=[asdict(player) for player in players[offset:offset + limit]],
+    )
+
+@router.get("/guilds/{name}", response_model=GuildProfile)
+async def get_guild(
+    name: str,
+    response: Response,
+    vocation: Optional[str] = None,
+    online_only: bool = False,
+    min_level: Optional[int] = Query(None, ge=1),
+    max_level: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Membros de uma guild do Taleon"""
+    members, cache_status = await load_parsed(get_guild_members, name)
+    set_cache_headers(response, "guildprofile.php", cache_status)
+    if not members:
+        raise HTTPException(status_code=404, detail="Guild não encontrada")
+    online = sum(1 for member in members if member.online)
+    members = filter_by_level(filter_by_vocation(members, vocation), min_level, max_level)
+    if online_only:
+        members = [member for member in members if member.online]
+    return GuildProfile(
+        name=name,
+        total=len(members),
+        online=online,
+        offset=offset,
+        limit=limit,
+        members=[asdict(member) for member in members[offset:offset + limit]],
+    )
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import Optional
+from database import get_async_db
+from models.character import Character
+from models.character_daily_stats import CharacterDailyStats
+from schemas.ranking import RankingEntry, RankingResponse
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Quantidade de dias de cada período, terminando no dia de referência
+PERIOD_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+}
+
+@router.get("/top-gainers", response_model=RankingResponse)
+async def top_gainers(
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    metric: str = Query("experience", pattern="^(experience|levels)$"),
+    world: Optional[str] = None,
+    vocation: Optional[str] = None,
+    end: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Personagens que mais evoluíram no período, lidos do resumo diário.
+
+    O custo depende apenas do número de dias do período, não do tamanho do histórico.
+    """
+    end = end or datetime.utcnow().date()
+    start = end - timedelta(days=PERIOD_DAYS[period] - 1)
+
+    experience_gained = func.sum(CharacterDailyStats.experience_gained).label("experience_gained")
+    levels_gained = func.sum(CharacterDailyStats.levels_gained).label("levels_gained")
+    deaths = func.sum(CharacterDailyStats.deaths).label("deaths")
+    score = experience_gained if metric == "experience" else levels_gained
+
+    query = (
+        select(Character, experience_gained, levels_gained, deaths)
+        .join(CharacterDailyStats, CharacterDailyStats.character_id == Character.id)
+        .where(CharacterDailyStats.day >= start, CharacterDailyStats.day <= end)
+        .group_by(Character.id)
+        .order_by(score.desc(), Character.id)
+        .limit(limit)
+    )
+    if world:
+        query = query.where(Character.world == world)
+    if vocation:
+        query = query.where(Character.vocation == vocation)
+
+    result = await db.execute(query)
+    entries = [
+        RankingEntry(
+            rank=position,
+            character_id=character.id,
+            name=character.name,
+            world=character.world or "",
+            vocation=character.vocation or "",
+            level=character.level or 0,
+            experience_gained=row_experience or 0,
+            levels_gained=row_levels or 0,
+            deaths=row_deaths or 0,
+        )
+        for position, (character, row_experience, row_levels, row_deaths) in enumerate(result.all(), start=1)
+    ]
+    return RankingResponse(period=period, start=start, end=end, entries=entries)
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List
+import asyncio
+import json
+import logging
+import os
+
+from services.updates import broadcaster
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+UPDATES_HEARTBEAT = float(os.getenv("UPDATES_HEARTBEAT", "15"))  # segundos entre keep-alives
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.get("/stream")
+async def stream_updates(
+    request: Request,
+    character_id: List[int] = Query([]),
+    world: List[str] = Query([]),
+):
+    """
+    Server-Sent Events com as mudanças de cada coleta gravada.
+
+    Cada evento `update` traz uma lista de mudanças (id, level, experiência,
+    mortes e horário). Sem filtros o cliente recebe todos os personagens;
+    com `character_id` e/ou `world` (repetíveis), apenas os escolhidos.
+    """
+    subscription = broadcaster.subscribe(character_id, world)
+
+    async def events():
+        try:
+            yield sse_event("subscribed", {"character_ids": character_id, "worlds": world})
+            while not await request.is_disconnected():
+                try:
+                    updates = await asyncio.wait_for(subscription.queue.get(), UPDATES_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão aberta em proxies e permite detectar desconexão
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("update", updates)
+        finally:
+            broadcaster.unsubscribe(subscription)
+            if subscription.dropped:
+                logger.warning(f"Cliente de atualizações perdeu {subscription.dropped} mensagens por lentidão")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,12 +1,13 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class CharacterHistoryBase(BaseModel):
-    level: int
-    experience: float
-    daily_experience: float = 0
-    deaths: int
+    # Registros antigos podem ter level, experiência e mortes nulos
+    level: Optional[int] = None
+    experience: Optional[float] = None
+    daily_experience: Optional[float] = 0
+    deaths: Optional[int] = None
     timestamp: datetime
 
 class CharacterHistoryCreate(CharacterHistoryBase):
@@ -36,3 +37,114 @@ class CharacterResponse(CharacterBase):
 
     class Config:
         from_attributes = True
+
+class CharacterCreated(CharacterResponse):
+    """Personagem recém-criado; a coleta dos dados roda na fila (job_id)"""
+    job_id: Optional[str] = None
+
+class RefreshQueued(BaseModel):
+    character_id: int
+    job_id: str
+    status: str
+
+class CharacterSnapshot(BaseModel):
+    """Último registro de histórico; os valores podem ser nulos em registros antigos"""
+    level: Optional[int] = None
+    experience: Optional[float] = None
+    daily_experience: Optional[float] = 0
+    deaths: Optional[int] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+class CharacterSummary(CharacterBase):
+    """Personagem sem o histórico completo, apenas com o último registro"""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    last_checked: Optional[datetime] = None
+    refresh_interval: Optional[int] = None
+    next_refresh_at: Optional[datetime] = None
+    latest: Optional[CharacterSnapshot] = None
+
+    class Config:
+        from_attributes = True
+
+class CharacterPage(BaseModel):
+    items: List[CharacterSummary]
+    next_cursor: Optional[str] = None
+
+class HistoryPoint(BaseModel):
+    """
+    Ponto da série de histórico.
+
+    Na resolução "raw" cada ponto é um registro e `deaths` é o valor lido do
+    perfil. Nas resoluções agregadas `timestamp` é o início do período,
+    `level` o último nível, `experience` a maior experiência,
+    `daily_experience` a soma e `deaths_delta` as mortes no período.
+    `level` e `experience` podem ser nulos em registros antigos.
+    """
+    timestamp: datetime
+    level: Optional[int] = None
+    experience: Optional[float] = None
+    daily_experience: float = 0
+    deaths: Optional[int] = None
+    deaths_delta: Optional[int] = None
+    samples: int = 1
+
+class CharacterHistorySeries(BaseModel):
+    character_id: int
+    resolution: str
+    points: List[HistoryPoint]
+
+class CharacterBulkCreate(BaseModel):
+    names: List[str]
+    refresh_existing: bool = False
+
+class GuildImport(BaseModel):
+    name: str
+    refresh_existing: bool = False
+
+class CharacterBulkRefresh(BaseModel):
+    """Ids dos personagens a atualizar; sem ids, atualiza todos"""
+    character_ids: Optional[List[int]] = None
+
+class BulkItemResult(BaseModel):
+    name: str
+    status: str
+    character_id: Optional[int] = None
+    job_id: Optional[str] = None
+
+class BulkResult(BaseModel):
+    total: int
+    counts: Dict[str, int]
+    results: List[BulkItemResult]
+
+class HighscoresRefreshResult(BaseModel):
+    """Resultado de uma varredura do ranking"""
+    pages: int
+    matched: int
+    updated: int
+    postponed: int
+    profile_refreshes: int
+
+class ScheduledRefresh(BaseModel):
+    character_id: int
+    name: str
+    tier: str
+    refresh_interval: Optional[int] = None
+    next_refresh_at: Optional[datetime] = None
+    last_checked: Optional[datetime] = None
+
+class ScheduleBucket(BaseModel):
+    start: datetime
+    count: int
+
+class RefreshSchedule(BaseModel):
+    """Coletas planejadas: totais por nível de atividade, distribuição por hora e próximas da fila"""
+    generated_at: datetime
+    due: int
+    tiers: Dict[str, int]
+    per_hour: List[ScheduleBucket]
+    upcoming: List[ScheduledRefresh]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+class CharacterEvent(BaseModel):
+    id: int
+    character_id: int
+    name: str
+    world: str = ""
+    type: str
+    old_value: Optional[int] = None
+    new_value: Optional[int] = None
+    timestamp: datetime
+
+class EventPage(BaseModel):
+    items: List[CharacterEvent]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class JobStatus(BaseModel):
+    id: str
+    type: str
+    character: str
+    status: str
+    attempts: int = 0
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List
+
+class RankingEntry(BaseModel):
+    rank: int
+    character_id: int
+    name: str
+    world: str = ""
+    vocation: str = ""
+    level: int = 0
+    experience_gained: float = 0
+    levels_gained: int = 0
+    deaths: int = 0
+
+class RankingResponse(BaseModel):
+    period: str
+    start: date
+    end: date
+    entries: List[RankingEntry]
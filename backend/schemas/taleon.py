@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import List
+
+class HighscoreEntry(BaseModel):
+    position: int
+    name: str
+    vocation: str = ""
+    level: int = 0
+    value: int = 0
+
+class HighscorePage(BaseModel):
+    type: str
+    total: int
+    offset: int
+    limit: int
+    entries: List[HighscoreEntry]
+
+class OnlinePlayer(BaseModel):
+    name: str
+    level: int = 0
+    vocation: str = ""
+    guild: str = ""
+
+class OnlinePage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    players: List[OnlinePlayer]
+
+class GuildMember(BaseModel):
+    name: str
+    rank: str = ""
+    level: int = 0
+    vocation: str = ""
+    online: bool = False
+
+class GuildProfile(BaseModel):
+    name: str
+    total: int
+    online: int
+    offset: int
+    limit: int
+    members: List[GuildMember]
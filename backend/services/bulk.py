@@ -0,0 +1,143 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import re
+
+from models.character import Character
+from services.jobs import enqueue_refreshes
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_NAMES = int(os.getenv("BULK_MAX_NAMES", "500"))
+
+# Resultado de cada nome no cadastro em lote
+CREATED = "created"  # personagem cadastrado agora
+EXISTS = "exists"  # já estava cadastrado
+DUPLICATE = "duplicate"  # repetido na própria requisição
+INVALID = "invalid"  # nome vazio ou fora do formato aceito
+NOT_FOUND = "not_found"  # personagem não cadastrado (atualização em lote)
+QUEUED = "queued"  # coleta enfileirada agora (atualização em lote)
+PENDING = "pending"  # já havia coleta pendente para o personagem (atualização em lote)
+
+_SPACES_RE = re.compile(r"\s+")
+_NAME_RE = re.compile(r"^[^\W\d_][\w' .-]{1,49}$", re.UNICODE)
+
+def normalize_name(name: str) -> str:
+    return _SPACES_RE.sub(" ", name or "").strip()
+
+def _result(name: str, status: str, character_id: Optional[int] = None, job_id: Optional[str] = None) -> dict:
+    return {"name": name, "status": status, "character_id": character_id, "job_id": job_id}
+
+async def add_characters(db: AsyncSession, names: Iterable[str], refresh_existing: bool = False) -> List[dict]:
+    """
+    Cadastra vários personagens de uma vez e enfileira a coleta dos novos.
+
+    Repetições na requisição e nomes já cadastrados (sem diferenciar
+    maiúsculas) são resolvidos numa única consulta; os novos entram com um só
+    INSERT de várias linhas. A coleta é enfileirada em lote, e os workers a
+    executam pelo motor de atualização concorrente. Retorna o resultado de
+    cada nome, na ordem recebida.
+    """
+    results: List[dict] = []
+    wanted: Dict[str, str] = {}  # nome em minúsculas -> nome como recebido
+    for raw in names:
+        name = normalize_name(raw)
+        if not _NAME_RE.match(name):
+            results.append(_result(name, INVALID))
+            continue
+        if name.lower() in wanted:
+            results.append(_result(name, DUPLICATE))
+            continue
+        wanted[name.lower()] = name
+        results.append(_result(name, CREATED))
+
+    if not wanted:
+        return results
+
+    existing = await db.execute(
+        select(Character.id, Character.name).where(func.lower(Character.name).in_(list(wanted)))
+    )
+    # Nome em minúsculas -> (id, nome como está cadastrado)
+    stored: Dict[str, Tuple[int, str]] = {}
+    existing_keys = set()
+    for row in existing.all():
+        stored[row.name.lower()] = (row.id, row.name)
+        existing_keys.add(row.name.lower())
+
+    now = datetime.utcnow()
+    new_rows = [
+        {"name": name, "level": 0, "vocation": "", "world": "", "created_at": now, "updated_at": now}
+        for key, name in wanted.items()
+        if key not in existing_keys
+    ]
+    if new_rows:
+        # Cadastros simultâneos do mesmo nome viram "exists" em vez de erro
+        inserted = await db.execute(
+            insert(Character)
+            .values(new_rows)
+            .on_conflict_do_nothing(index_elements=[Character.name])
+            .returning(Character.id, Character.name)
+        )
+        created_keys = set()
+        for row in inserted.all():
+            stored[row.name.lower()] = (row.id, row.name)
+            created_keys.add(row.name.lower())
+        await db.commit()
+
+        missing = [row["name"] for row in new_rows if row["name"].lower() not in created_keys]
+        if missing:
+            raced = await db.execute(select(Character.id, Character.name).where(Character.name.in_(missing)))
+            for row in raced.all():
+                stored[row.name.lower()] = (row.id, row.name)
+                existing_keys.add(row.name.lower())
+
+    # A coleta usa o nome como está cadastrado, que é o usado na gravação
+    to_refresh = [
+        stored[key][1] for key in wanted
+        if key in stored and (key not in existing_keys or refresh_existing)
+    ]
+    jobs = {}
+    if to_refresh:
+        try:
+            jobs = await enqueue_refreshes(to_refresh)
+        except Exception as e:
+            # Se falhar ao enfileirar, pelo menos os personagens foram criados
+            logger.error(f"Erro ao enfileirar coleta de {len(to_refresh)} personagens: {str(e)}")
+
+    for result in results:
+        if result["status"] != CREATED:
+            continue
+        key = result["name"].lower()
+        if key in existing_keys:
+            result["status"] = EXISTS
+        if key in stored:
+            character_id, stored_name = stored[key]
+            result["character_id"] = character_id
+            if stored_name in jobs:
+                result["job_id"] = jobs[stored_name][0]
+
+    created = sum(1 for result in results if result["status"] == CREATED)
+    logger.info(f"Cadastro em lote: {created} criados de {len(results)} nomes")
+    return results
+
+async def refresh_characters_by_id(db: AsyncSession, character_ids: Optional[List[int]] = None) -> List[dict]:
+    """Enfileira a coleta dos personagens informados (ou de todos) numa única operação"""
+    query = select(Character.id, Character.name)
+    if character_ids is not None:
+        query = query.where(Character.id.in_(character_ids))
+    rows = (await db.execute(query)).all()
+    found = {row.id: row.name for row in rows}
+
+    jobs = await enqueue_refreshes(found.values()) if found else {}
+    results = []
+    for character_id, name in found.items():
+        job_id, created = jobs[name]
+        results.append(_result(name, QUEUED if created else PENDING, character_id, job_id))
+    for character_id in dict.fromkeys(character_ids or []):
+        if character_id not in found:
+            results.append(_result("", NOT_FOUND, character_id))
+    return results
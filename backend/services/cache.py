@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import struct
+import time
+import weakref
+import zlib
+
+from services.redis_client import get_binary_redis
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cache de páginas
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "512"))  # páginas mantidas em memória por processo
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "600"))  # segundos em que uma página expirada ainda pode ser servida
+CACHE_COMPRESS_MIN = int(os.getenv("CACHE_COMPRESS_MIN", "1024"))  # bytes a partir dos quais o conteúdo é comprimido
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", "6"))
+
+# Estado da resposta, também devolvido ao cliente no cabeçalho X-Cache
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+# Cabeçalho do valor guardado no Redis: validade (epoch) e se o corpo está comprimido
+_HEADER = struct.Struct("!d?")
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+def _identity(value):
+    return value
+
+def _encode(entry: CacheEntry, dumps: Callable[[Any], str]) -> bytes:
+    body = dumps(entry.value).encode("utf-8")
+    compressed = len(body) >= CACHE_COMPRESS_MIN
+    if compressed:
+        body = zlib.compress(body, CACHE_COMPRESS_LEVEL)
+    return _HEADER.pack(entry.fresh_until, compressed) + body
+
+def _decode(raw: bytes, stale_ttl: int, loads: Callable[[str], Any]) -> CacheEntry:
+    fresh_until, compressed = _HEADER.unpack_from(raw)
+    body = raw[_HEADER.size:]
+    if compressed:
+        body = zlib.decompress(body)
+    return CacheEntry(loads(body.decode("utf-8")), fresh_until, fresh_until + stale_ttl)
+
+class TwoTierCache:
+    """
+    Cache de páginas em dois níveis: um LRU limitado em memória na frente do Redis.
+
+    Entradas expiradas continuam sendo servidas por até `stale_ttl` segundos
+    enquanto uma nova cópia é buscada em segundo plano (stale-while-revalidate).
+    No Redis o conteúdo é guardado comprimido e compartilhado entre processos;
+    se o Redis estiver indisponível o cache funciona apenas em memória. Uma
+    cópia em memória expirada só é revalidada se o Redis também não tiver uma
+    mais nova, gravada por outro processo.
+
+    Por padrão os valores são textos (HTML); `dumps`/`loads` permitem guardar
+    estruturas já processadas, que ficam em memória como objetos e no Redis
+    serializadas.
+    """
+
+    # Caches existentes no processo, lidos pelas métricas
+    instances: "weakref.WeakSet[TwoTierCache]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        namespace: str,
+        max_items: int = CACHE_MEMORY_ITEMS,
+        stale_ttl: int = CACHE_STALE_TTL,
+        dumps: Callable[[Any], str] = _identity,
+        loads: Callable[[str], Any] = _identity,
+    ):
+        self.namespace = namespace
+        self.dumps = dumps
+        self.loads = loads
+        self.max_items = max_items
+        self.stale_ttl = stale_ttl
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "redis_errors": 0,
+        }
+        TwoTierCache.instances.add(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"taleon:cache:{self.namespace}:{key}"
+
+    def _remember(self, key: str, entry: CacheEntry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    async def _load(self, key: str, now: float) -> Optional[CacheEntry]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry.is_fresh(now):
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry
+            if not entry.is_usable(now):
+                del self._memory[key]
+                entry = None
+
+        # Cópia local expirada: outro processo pode já ter gravado uma mais nova no Redis
+        stored = await self._load_redis(key, now)
+        if stored is not None and (entry is None or stored.fresh_until > entry.fresh_until):
+            self.counters["redis_hits"] += 1
+            self._remember(key, stored)
+            return stored
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+        return entry
+
+    async def _load_redis(self, key: str, now: float) -> Optional[CacheEntry]:
+        try:
+            raw = await get_binary_redis().get(self._redis_key(key))
+        except Exception as e:
+            self.counters["redis_errors"] += 1
+            logger.warning(f"Erro ao ler cache {key} do Redis: {str(e)}")
+            return None
+        if raw is None:
+            return None
+
+        entry = _decode(raw, self.stale_ttl, self.loads)
+        return entry if entry.is_usable(now) else None
+
+    async def set(self, key: str, value: Any, ttl: int) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(value, now + ttl, now + ttl + self.stale_ttl)
+        self._remember(key, entry)
+        try:
+            await get_binary_redis().set(self._redis_key(key), _encode(entry, self.dumps), ex=ttl + self.stale_ttl)
+        except Exception as e:
+            self.counters["redis_errors"] += 1
+            logger.warning(f"Erro ao gravar cache {key} no Redis: {str(e)}")
+        return entry
+
+    async def get_or_fetch(self, key: str, ttl: int, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        Retorna o conteúdo da chave e o estado do cache (HIT, STALE ou MISS).
+
+        Em caso de MISS, `fetch` é aguardado e o resultado gravado nos dois
+        níveis; em caso de STALE, a cópia expirada é devolvida imediatamente e
+        `fetch` roda em segundo plano. Erros de `fetch` só são propagados
+        quando não há cópia alguma para servir.
+        """
+        now = time.time()
+        entry = await self._load(key, now)
+        if entry is not None:
+            if entry.is_fresh(now):
+                return entry.value, HIT
+            self.counters["stale_hits"] += 1
+            self._revalidate(key, ttl, fetch)
+            return entry.value, STALE
+
+        self.counters["misses"] += 1
+        value = await fetch()
+        await self.set(key, value, ttl)
+        return value, MISS
+
+    def _revalidate(self, key: str, ttl: int, fetch: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, ttl, fetch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: str, ttl: int, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            await self.set(key, await fetch(), ttl)
+            self.counters["refreshes"] += 1
+        except Exception as e:
+            self.counters["refresh_errors"] += 1
+            logger.warning(f"Erro ao revalidar cache {key}: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["redis_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_items": len(self._memory),
+            "memory_capacity": self.max_items,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import List, Optional
+import logging
+import os
+
+from services.profile_parser import CharacterProfile
+
+logger = logging.getLogger(__name__)
+
+# Experiência ganha entre duas coletas a partir da qual se registra um salto
+EVENTS_EXPERIENCE_JUMP = int(os.getenv("EVENTS_EXPERIENCE_JUMP", "10000000"))
+
+# Tipos de evento
+LEVEL_UP = "level_up"
+LEVEL_DOWN = "level_down"
+DEATH = "death"
+EXPERIENCE_JUMP = "experience_jump"
+EVENT_TYPES = (LEVEL_UP, LEVEL_DOWN, DEATH, EXPERIENCE_JUMP)
+
+def _event(character_id: int, world: str, type: str, old_value, new_value, timestamp: datetime) -> dict:
+    return {
+        "character_id": character_id,
+        "world": world,
+        "type": type,
+        "old_value": int(old_value),
+        "new_value": int(new_value),
+        "timestamp": timestamp,
+    }
+
+def detect_events(
+    character_id: int,
+    level: Optional[int],
+    experience: Optional[int],
+    deaths: Optional[int],
+    profile: CharacterProfile,
+    timestamp: datetime,
+) -> List[dict]:
+    """
+    Compara o perfil recém-coletado com os valores anteriores do personagem.
+
+    `level`, `experience` e `deaths` são os valores gravados na coleta
+    anterior (já carregados junto com o personagem), então nenhuma consulta ao
+    histórico é necessária. Valores anteriores ausentes não geram eventos.
+    """
+    events = []
+    world = profile.residence
+    if level is not None:
+        if profile.level > level:
+            events.append(_event(character_id, world, LEVEL_UP, level, profile.level, timestamp))
+        elif profile.level < level:
+            events.append(_event(character_id, world, LEVEL_DOWN, level, profile.level, timestamp))
+    if deaths is not None and profile.deaths > deaths:
+        events.append(_event(character_id, world, DEATH, deaths, profile.deaths, timestamp))
+    if experience is not None and profile.experience - experience >= EVENTS_EXPERIENCE_JUMP:
+        events.append(_event(character_id, world, EXPERIENCE_JUMP, experience, profile.experience, timestamp))
+    return events
@@ -0,0 +1,179 @@
+"""
+Atualização em lote dos personagens a partir do ranking (highscores.php).
+
+Cada página do ranking traz level e experiência de dezenas de jogadores, então
+percorrê-la substitui uma requisição de perfil por personagem. As linhas são
+cruzadas com os personagens cadastrados por um índice de nomes em memória,
+carregado numa única consulta; os personagens encontrados recebem um registro
+de histórico e têm a coleta do perfil adiada. O perfil é enfileirado para quem
+não aparece no ranking e já tem coleta prevista (next_refresh_at vencido), para
+quem perdeu experiência (provável morte, que só o perfil informa) e para quem
+está há mais de HIGHSCORES_PROFILE_MAX_AGE sem coleta do perfil (outfit,
+mortes...).
+"""
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+import logging
+import os
+
+from models.character import Character
+from models.character_event import CharacterEvent
+from models.character_history import CharacterHistory
+from services.events import detect_events
+from services.jobs import enqueue_refreshes
+from services.metrics import DB_WRITE_SECONDS, timed
+from services.page_parsers import HighscoreRow
+from services.profile_parser import CharacterProfile
+from services.refresh_schedule import next_refresh_time, refresh_interval_for
+from services.rollup import update_daily_rollup
+from services.taleon_pages import get_highscores
+from services.updates import character_update, publish_updates
+
+logger = logging.getLogger(__name__)
+
+# Configurações da atualização pelo ranking
+HIGHSCORES_REFRESH_INTERVAL = int(os.getenv("HIGHSCORES_REFRESH_INTERVAL", "3600"))  # segundos entre varreduras; 0 desativa
+HIGHSCORES_MAX_PAGES = int(os.getenv("HIGHSCORES_MAX_PAGES", "20"))
+HIGHSCORES_PROFILE_MAX_AGE = int(os.getenv("HIGHSCORES_PROFILE_MAX_AGE", "604800"))  # segundos
+
+@dataclass
+class HighscoresRefreshReport:
+    pages: int = 0
+    matched: int = 0
+    updated: int = 0  # level ou experiência mudaram: histórico registrado
+    postponed: int = 0  # coleta do perfil adiada
+    profile_refreshes: int = 0  # perfis enfileirados (possível morte, perfil antigo ou fora do ranking)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+async def crawl_highscores(tracked: Dict[str, object], max_pages: int = HIGHSCORES_MAX_PAGES) -> Tuple[Dict[str, HighscoreRow], int]:
+    """
+    Percorre as páginas do ranking de experiência até encontrar todos os cadastrados.
+
+    Para antes do limite de páginas quando todos os personagens procurados já
+    foram encontrados, quando a página vem vazia ou repetida (o site ignorou
+    a paginação) ou quando o ranking já passou do level de todos os que
+    faltam. Retorna as linhas encontradas, indexadas pelo nome em minúsculas,
+    e o número de páginas lidas.
+    """
+    found: Dict[str, HighscoreRow] = {}
+    # Quem nunca foi coletado não tem level para comparar: será coletado pelo perfil
+    missing = {key: row.level for key, row in tracked.items() if row.level}
+    previous_first = None
+    pages = 0
+    for page in range(1, max_pages + 1):
+        entries, _ = await get_highscores("experience", page)
+        pages += 1
+        if not entries or entries[0].name == previous_first:
+            break
+        previous_first = entries[0].name
+        for entry in entries:
+            key = entry.name.lower()
+            if key in tracked:
+                found[key] = entry
+                missing.pop(key, None)
+        lowest = min(entry.level for entry in entries)
+        if not missing or all(level > lowest for level in missing.values()):
+            break
+    logger.info("Ranking: %d páginas lidas, %d personagens cadastrados encontrados", pages, len(found))
+    return found, pages
+
+async def refresh_from_highscores(db: AsyncSession, max_pages: int = HIGHSCORES_MAX_PAGES) -> HighscoresRefreshReport:
+    """Atualiza level e experiência de todos os cadastrados presentes no ranking"""
+    result = await db.execute(
+        select(
+            Character.id, Character.name, Character.level, Character.experience, Character.deaths,
+            Character.world, Character.updated_at, Character.last_checked, Character.next_refresh_at,
+        )
+    )
+    tracked = {row.name.lower(): row for row in result.all()}
+    report = HighscoresRefreshReport()
+    if not tracked:
+        return report
+
+    found, report.pages = await crawl_highscores(tracked, max_pages)
+    report.matched = len(found)
+
+    now = datetime.utcnow()
+    max_age = timedelta(seconds=HIGHSCORES_PROFILE_MAX_AGE)
+    character_updates = []
+    history_rows = []
+    events = []
+    updates = []
+    profile_names = []
+    for key, entry in found.items():
+        row = tracked[key]
+        if row.experience is not None and entry.value < row.experience:
+            # Perda de experiência: provável morte, que só aparece no perfil
+            profile_names.append(row.name)
+            continue
+        if row.last_checked is None or now - row.last_checked > max_age:
+            profile_names.append(row.name)
+            continue
+
+        changed = entry.level != row.level or entry.value != row.experience
+        interval = refresh_interval_for(now if changed else row.updated_at, now)
+        values = {
+            "id": row.id,
+            "updated_at": now if changed else row.updated_at,
+            "refresh_interval": interval,
+            # A próxima varredura do ranking deve chegar antes da coleta do perfil
+            "next_refresh_at": next_refresh_time(max(interval, HIGHSCORES_REFRESH_INTERVAL), now),
+        }
+        report.postponed += 1
+        if changed:
+            values.update({"level": entry.level, "experience": entry.value})
+            # O ranking não traz mortes nem residência: mantém os valores do perfil
+            profile = CharacterProfile(
+                name=row.name, level=entry.level, experience=entry.value,
+                deaths=row.deaths or 0, residence=row.world or "",
+            )
+            history_rows.append({
+                "character_id": row.id,
+                "level": entry.level,
+                "experience": entry.value,
+                "deaths": row.deaths or 0,
+                "timestamp": now,
+            })
+            events.extend(detect_events(row.id, row.level, row.experience, row.deaths, profile, now))
+            updates.append(character_update(row.id, profile, now))
+        character_updates.append(values)
+
+    # Fora do ranking (level baixo ou páginas não lidas): segue pela coleta do
+    # perfil, mas só quando ela já está prevista, como no agendamento normal
+    for key in tracked.keys() - found.keys():
+        row = tracked[key]
+        if row.next_refresh_at is None or row.next_refresh_at <= now:
+            profile_names.append(row.name)
+
+    if character_updates:
+        with timed(DB_WRITE_SECONDS, operation="highscores_refresh"):
+            await db.execute(update(Character), character_updates)
+            if history_rows:
+                await db.execute(insert(CharacterHistory), history_rows)
+            if events:
+                await db.execute(insert(CharacterEvent), events)
+            await db.commit()
+    report.updated = len(history_rows)
+
+    await publish_updates(updates)
+    if history_rows:
+        try:
+            await update_daily_rollup(db, [row["character_id"] for row in history_rows], now.date())
+        except Exception as e:
+            logger.error("Erro ao atualizar resumo diário: %s", e)
+            await db.rollback()
+
+    if profile_names:
+        jobs = await enqueue_refreshes(profile_names)
+        report.profile_refreshes = sum(1 for _, created in jobs.values() if created)
+
+    logger.info(
+        "Atualização pelo ranking: %d encontrados em %d páginas, %d atualizados, %d perfis enfileirados",
+        report.matched, report.pages, report.updated, report.profile_refreshes,
+    )
+    return report
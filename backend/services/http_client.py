@@ -0,0 +1,59 @@
+import aiohttp
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cliente HTTP compartilhado
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "100"))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # segundos
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # segundos
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # segundos
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # segundos
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_SIZE,
+        limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+async def start_http_client():
+    """Cria o cliente HTTP compartilhado (chamado no startup da aplicação)"""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info("Cliente HTTP compartilhado inicializado")
+
+async def close_http_client():
+    """Fecha o cliente HTTP compartilhado (chamado no shutdown da aplicação)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Cliente HTTP compartilhado encerrado")
+    _session = None
+
+def get_http_client() -> aiohttp.ClientSession:
+    """
+    Retorna o cliente HTTP compartilhado.
+
+    Fora da aplicação (scripts, jobs avulsos) o cliente é criado sob demanda no
+    primeiro uso; nesse caso quem o iniciou deve chamar close_http_client().
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
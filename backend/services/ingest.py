@@ -0,0 +1,191 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from models.character import Character
+from models.character_event import CharacterEvent
+from models.character_history import CharacterHistory
+from services.events import detect_events
+from services.metrics import DB_WRITE_SECONDS, timed
+from services.profile_parser import CharacterProfile, profile_fingerprint
+from services.refresh_schedule import next_refresh_time, refresh_interval_for
+from services.rollup import update_daily_rollup
+from services.updates import CharacterUpdate, character_update, publish_updates
+
+logger = logging.getLogger(__name__)
+
+# Resultado da gravação de cada perfil
+SAVED = "saved"  # perfil mudou: personagem atualizado e histórico registrado
+UNCHANGED = "unchanged"  # nada mudou: apenas last_checked foi atualizado
+NOT_FOUND = "not_found"  # personagem não está cadastrado
+ERROR = "error"  # falha ao gravar o perfil
+
+# ETag e Last-Modified recebidos na última coleta
+Validators = Tuple[Optional[str], Optional[str]]
+
+async def load_validators(db: AsyncSession, names: Iterable[str]) -> Dict[str, Validators]:
+    """Validadores HTTP guardados para os personagens, para requisições condicionais"""
+    result = await db.execute(
+        select(Character.name, Character.etag, Character.last_modified)
+        .where(Character.name.in_(list(names)))
+    )
+    return {row.name: (row.etag, row.last_modified) for row in result.all()}
+
+@dataclass
+class _ProfileWrite:
+    """Tudo o que a gravação de um perfil escreve no banco e publica"""
+    values: dict
+    history: Optional[dict] = None
+    events: List[dict] = field(default_factory=list)
+    update: Optional[CharacterUpdate] = None
+
+async def _write(db: AsyncSession, writes: List[_ProfileWrite]):
+    """Grava os perfis numa única transação: UPDATE em lote e INSERTs de várias linhas"""
+    history_rows = [write.history for write in writes if write.history]
+    events = [event for write in writes for event in write.events]
+    await db.execute(update(Character), [write.values for write in writes])
+    if history_rows:
+        await db.execute(insert(CharacterHistory), history_rows)
+    if events:
+        await db.execute(insert(CharacterEvent), events)
+    await db.commit()
+
+async def _write_one_by_one(db: AsyncSession, writes: Dict[str, _ProfileWrite], results: Dict[str, str]) -> Dict[str, _ProfileWrite]:
+    """
+    Grava os perfis de um lote que falhou, cada um na sua transação, para que
+    só os perfis com problema (ex.: nome que colide com outro personagem)
+    fiquem com ERROR. Retorna os que foram gravados.
+    """
+    written = {}
+    for name, write in writes.items():
+        try:
+            await _write(db, [write])
+            written[name] = write
+        except Exception as e:
+            logger.error("Erro ao gravar o personagem %s: %s", name, e)
+            await db.rollback()
+            results[name] = ERROR
+    return written
+
+async def persist_profiles(
+    db: AsyncSession,
+    profiles: Dict[str, Optional[CharacterProfile]],
+    validators: Optional[Dict[str, Validators]] = None,
+) -> Dict[str, str]:
+    """
+    Grava um lote de perfis extraídos numa única transação.
+
+    `profiles` é indexado pelo nome usado na busca; um perfil None indica que
+    o servidor respondeu 304. Os personagens são carregados numa só consulta,
+    atualizados com um UPDATE em lote e o histórico é inserido com um INSERT
+    de várias linhas. Perfis cuja impressão digital não mudou não geram
+    histórico, apenas atualizam last_checked. Eventos (level up, mortes...)
+    são calculados comparando com os valores anteriores do personagem, já
+    carregados. O intervalo até a próxima coleta é recalculado a partir da
+    última mudança do perfil, e as mudanças são publicadas para os clientes
+    conectados (ver services/updates.py). Se o lote falhar, os perfis são
+    gravados um a um e só os que falharem de novo ficam com ERROR. Retorna o
+    status de cada nome.
+    """
+    results = {name: NOT_FOUND for name in profiles}
+    if not profiles:
+        return results
+    validators = validators or {}
+
+    result = await db.execute(
+        select(
+            Character.id, Character.name, Character.content_hash, Character.updated_at,
+            Character.level, Character.experience, Character.deaths,
+        )
+        .where(Character.name.in_(list(profiles)))
+    )
+    rows = {row.name: row for row in result.all()}
+
+    now = datetime.utcnow()
+    writes: Dict[str, _ProfileWrite] = {}
+    for name, profile in profiles.items():
+        row = rows.get(name)
+        if row is None:
+            logger.error("Personagem %s não encontrado no banco de dados", name)
+            continue
+
+        values = {"id": row.id, "last_checked": now}
+        if name in validators:
+            values["etag"], values["last_modified"] = validators[name]
+        fingerprint = profile_fingerprint(profile) if profile else None
+        unchanged = profile is None or fingerprint == row.content_hash
+        interval = refresh_interval_for(row.updated_at if unchanged else now, now)
+        values["refresh_interval"] = interval
+        values["next_refresh_at"] = next_refresh_time(interval, now)
+        if unchanged:
+            results[name] = UNCHANGED
+            # updated_at marca a última mudança do perfil; sem isso o onupdate da coluna o sobrescreveria
+            values["updated_at"] = row.updated_at
+            writes[name] = _ProfileWrite(values)
+            continue
+
+        results[name] = SAVED
+        values.update({
+            "name": profile.name,  # Atualiza o nome formatado
+            "level": profile.level,
+            "vocation": profile.vocation,
+            "world": profile.residence,  # Usando residence como world
+            "outfit": profile.outfit,
+            "experience": int(profile.experience),
+            "deaths": profile.deaths,
+            "content_hash": fingerprint,
+            "updated_at": now,
+        })
+        # Personagem nunca coletado não tem valores anteriores com que comparar
+        events = []
+        if row.content_hash is not None:
+            events = detect_events(row.id, row.level, row.experience, row.deaths, profile, now)
+        writes[name] = _ProfileWrite(
+            values,
+            history={
+                "character_id": row.id,
+                "level": profile.level,
+                "experience": profile.experience,
+                "daily_experience": profile.daily_experience,
+                "deaths": profile.deaths,
+                "timestamp": now,
+            },
+            events=events,
+            update=character_update(row.id, profile, now),
+        )
+
+    if not writes:
+        return results
+
+    try:
+        with timed(DB_WRITE_SECONDS, operation="persist_profiles"):
+            await _write(db, list(writes.values()))
+    except Exception as e:
+        # Um perfil com problema não pode derrubar o lote inteiro
+        logger.error("Erro ao gravar lote de %d personagens, gravando um a um: %s", len(writes), e)
+        await db.rollback()
+        with timed(DB_WRITE_SECONDS, operation="persist_profiles_single"):
+            writes = await _write_one_by_one(db, writes, results)
+
+    history_rows = [write.history for write in writes.values() if write.history]
+    logger.info(
+        "Lote gravado: %d personagens, %d registros de histórico, %d sem alteração, %d eventos",
+        len(writes), len(history_rows), len(writes) - len(history_rows),
+        sum(len(write.events) for write in writes.values()),
+    )
+
+    # Notifica os clientes conectados só depois do commit
+    await publish_updates([write.update for write in writes.values() if write.update])
+
+    # Atualiza o resumo diário; uma falha aqui não invalida o lote já gravado
+    if history_rows:
+        try:
+            with timed(DB_WRITE_SECONDS, operation="daily_rollup"):
+                await update_daily_rollup(db, [row["character_id"] for row in history_rows], now.date())
+        except Exception as e:
+            logger.error("Erro ao atualizar resumo diário: %s", e)
+            await db.rollback()
+    return results
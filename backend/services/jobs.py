@@ -0,0 +1,203 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+import logging
+import os
+import time
+
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Configurações da fila de coleta
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "30"))  # segundos
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "3600"))  # segundos
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "600"))  # segundos
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "86400"))  # segundos
+
+# Chaves no Redis
+QUEUE_KEY = "taleon:jobs:queue"  # lista de jobs prontos
+PROCESSING_KEY = "taleon:jobs:processing"  # jobs retirados por algum worker
+DELAYED_KEY = "taleon:jobs:delayed"  # sorted set de jobs aguardando nova tentativa
+JOB_KEY = "taleon:job:{}"
+DEDUPE_KEY = "taleon:jobs:dedupe:{}"
+
+# Status dos jobs
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Move atomicamente os jobs cuja espera terminou para a fila
+_PROMOTE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('RPUSH', KEYS[2], id)
+end
+return #ids
+"""
+
+# Marca como em execução os jobs retirados da fila e devolve os ids marcados.
+# Jobs cujo registro já expirou só saem da lista de processamento: um HSET
+# neles recriaria o registro sem prazo de expiração.
+_CLAIM_SCRIPT = """
+local claimed = {}
+for i = 2, #KEYS do
+    local id = ARGV[i + 2]
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('HSET', KEYS[i], 'status', ARGV[1], 'claimed_at', ARGV[2], 'updated_at', ARGV[3])
+        redis.call('HINCRBY', KEYS[i], 'attempts', 1)
+        table.insert(claimed, id)
+    else
+        redis.call('LREM', KEYS[1], 1, id)
+    end
+end
+return claimed
+"""
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+async def enqueue_refreshes(names: Iterable[str]) -> Dict[str, Tuple[str, bool]]:
+    """
+    Enfileira a coleta dos personagens, sem duplicar jobs pendentes.
+
+    Retorna, para cada nome, o id do job e se ele foi criado agora (False
+    quando já havia um job na fila ou em execução para o personagem).
+    """
+    redis = get_redis()
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    candidates = {name: uuid4().hex for name in names}
+    pipe = redis.pipeline(transaction=False)
+    for name, job_id in candidates.items():
+        pipe.set(DEDUPE_KEY.format(name), job_id, nx=True, ex=JOB_RESULT_TTL)
+    acquired = await pipe.execute()
+
+    results: Dict[str, Tuple[str, bool]] = {}
+    pipe = redis.pipeline(transaction=True)
+    created = 0
+    for (name, job_id), ok in zip(candidates.items(), acquired):
+        if not ok:
+            existing = await redis.get(DEDUPE_KEY.format(name))
+            if existing and await redis.exists(JOB_KEY.format(existing)):
+                results[name] = (existing, False)
+                continue
+            # Chave órfã (job expirado): assume a deduplicação
+            await redis.set(DEDUPE_KEY.format(name), job_id, ex=JOB_RESULT_TTL)
+
+        pipe.hset(JOB_KEY.format(job_id), mapping={
+            "id": job_id,
+            "type": "refresh",
+            "character": name,
+            "status": QUEUED,
+            "attempts": 0,
+            "created_at": _now(),
+            "updated_at": _now(),
+        })
+        pipe.rpush(QUEUE_KEY, job_id)
+        results[name] = (job_id, True)
+        created += 1
+
+    if created:
+        await pipe.execute()
+        logger.info("%d jobs de coleta enfileirados", created)
+    return results
+
+async def enqueue_refresh(name: str) -> Tuple[str, bool]:
+    return (await enqueue_refreshes([name]))[name]
+
+async def get_job(job_id: str) -> Optional[dict]:
+    job = await get_redis().hgetall(JOB_KEY.format(job_id))
+    return job or None
+
+async def promote_delayed(limit: int = 1000) -> int:
+    redis = get_redis()
+    return await redis.eval(_PROMOTE_SCRIPT, 2, DELAYED_KEY, QUEUE_KEY, time.time(), limit)
+
+async def claim_jobs(max_jobs: int, timeout: int = 5) -> List[dict]:
+    """
+    Retira até `max_jobs` jobs da fila, esperando até `timeout` segundos pelo primeiro.
+
+    Os jobs ficam na lista de processamento até serem concluídos, de modo que
+    um worker que morra no meio não perde o trabalho (ver requeue_stale_jobs).
+    """
+    redis = get_redis()
+    await promote_delayed()
+
+    first = await redis.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, "LEFT", "RIGHT")
+    if not first:
+        return []
+    job_ids = [first]
+    while len(job_ids) < max_jobs:
+        job_id = await redis.lmove(QUEUE_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+        if not job_id:
+            break
+        job_ids.append(job_id)
+
+    keys = [PROCESSING_KEY] + [JOB_KEY.format(job_id) for job_id in job_ids]
+    claimed = await redis.eval(_CLAIM_SCRIPT, len(keys), *keys, RUNNING, time.time(), _now(), *job_ids)
+    pipe = redis.pipeline(transaction=False)
+    for job_id in claimed:
+        pipe.hgetall(JOB_KEY.format(job_id))
+    jobs = await pipe.execute() if claimed else []
+    return [job for job in jobs if job.get("character")]
+
+async def finish_job(job: dict, status: str, result: Optional[str] = None, error: Optional[str] = None):
+    redis = get_redis()
+    key = JOB_KEY.format(job["id"])
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(key, mapping={"status": status, "result": result or "", "error": error or "", "updated_at": _now()})
+    pipe.expire(key, JOB_RESULT_TTL)
+    pipe.lrem(PROCESSING_KEY, 1, job["id"])
+    # Libera a deduplicação para que uma nova coleta possa ser enfileirada
+    pipe.delete(DEDUPE_KEY.format(job["character"]))
+    await pipe.execute()
+
+async def retry_job(job: dict, error: str):
+    """Agenda nova tentativa com backoff exponencial, ou marca o job como falho"""
+    attempts = int(job.get("attempts", 1))
+    if attempts >= JOB_MAX_ATTEMPTS:
+        logger.error("Job %s (%s) falhou após %d tentativas: %s", job["id"], job["character"], attempts, error)
+        await finish_job(job, FAILED, error=error)
+        return
+
+    delay = min(JOB_RETRY_BACKOFF_MAX, JOB_RETRY_BACKOFF * 2 ** (attempts - 1))
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(JOB_KEY.format(job["id"]), mapping={"status": RETRYING, "error": error, "updated_at": _now()})
+    pipe.zadd(DELAYED_KEY, {job["id"]: time.time() + delay})
+    pipe.lrem(PROCESSING_KEY, 1, job["id"])
+    await pipe.execute()
+    logger.warning("Job %s (%s) será repetido em %.0fs: %s", job["id"], job["character"], delay, error)
+
+async def requeue_stale_jobs() -> int:
+    """Devolve à fila jobs retirados há mais de JOB_VISIBILITY_TIMEOUT segundos"""
+    redis = get_redis()
+    requeued = 0
+    for job_id in await redis.lrange(PROCESSING_KEY, 0, -1):
+        key = JOB_KEY.format(job_id)
+        claimed_at = await redis.hget(key, "claimed_at")
+        if not await redis.exists(key):
+            await redis.lrem(PROCESSING_KEY, 1, job_id)
+            continue
+        if claimed_at is None or time.time() - float(claimed_at) < JOB_VISIBILITY_TIMEOUT:
+            continue
+        # Só quem conseguir remover da lista de processamento reenfileira o job
+        if await redis.lrem(PROCESSING_KEY, 1, job_id):
+            await redis.hset(key, mapping={"status": QUEUED, "updated_at": _now()})
+            await redis.rpush(QUEUE_KEY, job_id)
+            requeued += 1
+    if requeued:
+        logger.warning("%d jobs abandonados devolvidos à fila", requeued)
+    return requeued
+
+async def queue_depth() -> int:
+    """Jobs prontos mais jobs aguardando nova tentativa"""
+    redis = get_redis()
+    return await redis.llen(QUEUE_KEY) + await redis.zcard(DELAYED_KEY)
@@ -0,0 +1,167 @@
+"""
+Configuração de logging da API e dos workers.
+
+Os registros são enfileirados pelo QueueHandler e gravados numa thread
+separada (QueueListener), então a escrita em disco ou no terminal não bloqueia
+o loop de eventos. Cada registro leva o id de correlação da requisição (ou do
+lote do worker) em que foi emitido, e o formato pode ser texto ou JSON (uma
+linha por registro).
+
+Conteúdos volumosos (cabeçalhos, trechos de HTML) só são registrados em DEBUG
+e numa amostra das requisições, definida por LOG_PAYLOAD_SAMPLE_RATE.
+"""
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import uuid
+
+# Configurações de log
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text ou json
+LOG_FILE = os.getenv("LOG_FILE", "")  # vazio: saída de erro padrão
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))  # fração das requisições com conteúdo registrado
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+_listener: Optional[QueueListener] = None
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def bind_correlation_id(value: Optional[str] = None) -> str:
+    """Define o id de correlação do contexto atual (requisição, lote...) e o retorna"""
+    value = value or new_correlation_id()
+    correlation_id.set(value)
+    return value
+
+def payload_logging_enabled(logger: logging.Logger) -> bool:
+    """Registrar o conteúdo desta requisição? Só em DEBUG e para uma amostra"""
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+class CorrelationIdFilter(logging.Filter):
+    """Anexa o id de correlação ao registro; roda na thread que emitiu o log"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = correlation_id.get()
+        return True
+
+class ExceptionPreservingQueueHandler(QueueHandler):
+    """
+    QueueHandler que não junta o traceback à mensagem.
+
+    O prepare padrão formata o registro inteiro em `msg`; aqui só os
+    argumentos são aplicados, e a exceção vai já formatada em `exc_text`
+    (o traceback em si não atravessa a fila), para que o formatador do
+    destino decida onde colocá-la.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.message = record.msg
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, log_file: str = LOG_FILE):
+    """
+    Substitui os handlers do logger raiz por um QueueHandler, com a gravação
+    feita por um QueueListener em segundo plano. Pode ser chamada mais de uma vez.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler()
+    file_error = None
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            output = logging.FileHandler(log_file, encoding="utf-8")
+        except OSError as e:
+            # Sem permissão no diretório de log: segue na saída de erro padrão
+            file_error = e
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = ExceptionPreservingQueueHandler(log_queue)
+    handler.addFilter(CorrelationIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    if file_error is not None:
+        logging.getLogger(__name__).warning(f"Não foi possível abrir {log_file}, usando a saída padrão: {str(file_error)}")
+
+def stop_logging():
+    """Grava os registros pendentes e encerra a thread de log"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+
+class CorrelationIdMiddleware:
+    """
+    Middleware ASGI que define o id de correlação de cada requisição.
+
+    Usa o cabeçalho X-Request-ID recebido (ex.: do proxy reverso) ou gera um
+    novo, e o devolve na resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        received = dict(scope.get("headers", [])).get(REQUEST_ID_HEADER.lower().encode())
+        # Limita o tamanho do id recebido: ele vai para todos os registros da requisição
+        request_id = bind_correlation_id(received.decode("latin-1")[:64] if received else None)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER.lower().encode(), request_id.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
@@ -0,0 +1,152 @@
+"""
+Métricas no formato do Prometheus.
+
+Os histogramas e contadores são atualizados nos pontos quentes (requisições
+ao Taleon, extração do HTML, gravação no banco, rotas da API). Valores que já
+existem em outro lugar (contadores dos caches, pool de conexões) são lidos só
+no momento da coleta, sem custo no caminho das requisições.
+
+A API expõe as métricas em /metrics; o worker, se METRICS_PORT estiver
+definido, num servidor HTTP próprio. Instâncias do serviço de workers
+(WORKER_INSTANCE, preenchido pelo systemd) usam METRICS_PORT + instância.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from contextlib import contextmanager
+import logging
+import os
+import time
+
+from database import async_engine
+from services.cache import TwoTierCache
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # porta das métricas do worker; 0 desativa
+WORKER_INSTANCE = os.getenv("WORKER_INSTANCE", "")  # número da instância (taleontracker-worker@N)
+
+def worker_metrics_port(instance: str = WORKER_INSTANCE) -> int:
+    """Porta das métricas deste worker; 0 quando desativadas"""
+    if not METRICS_PORT or not instance:
+        return METRICS_PORT
+    if not instance.isdigit():
+        raise ValueError(f"WORKER_INSTANCE deve ser numérico para definir a porta das métricas: {instance!r}")
+    return METRICS_PORT + int(instance)
+
+# Limites dos histogramas, em segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+UPSTREAM_FETCH_SECONDS = Histogram(
+    "taleon_upstream_fetch_seconds", "Duração das requisições ao Taleon",
+    ["page", "status"], buckets=LATENCY_BUCKETS,
+)
+PARSE_SECONDS = Histogram(
+    "taleon_parse_seconds", "Tempo de extração dos dados do HTML",
+    ["page"], buckets=LATENCY_BUCKETS,
+)
+DB_WRITE_SECONDS = Histogram(
+    "taleon_db_write_seconds", "Duração das gravações em lote no banco",
+    ["operation"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "taleon_http_request_duration_seconds", "Duração das requisições à API, por rota",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+SCRAPES = Counter("taleon_scrapes_total", "Coletas de perfil por resultado", ["result"])
+QUEUE_DEPTH = Gauge("taleon_refresh_queue_depth", "Jobs de coleta aguardando na fila")
+
+def page_label(path: str) -> str:
+    """Nome da página sem extensão nem parâmetros (ex.: characterprofile)"""
+    return path.split("?")[0].rsplit("/", 1)[-1].split(".")[0] or "index"
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+class _StateCollector:
+    """Lê, no momento da coleta, os contadores dos caches e o uso do pool do banco"""
+
+    def collect(self):
+        cache_events = CounterMetricFamily(
+            "taleon_cache_events", "Eventos dos caches de páginas (hits, misses...)", labels=["cache", "event"],
+        )
+        cache_items = GaugeMetricFamily("taleon_cache_memory_items", "Itens no cache em memória", labels=["cache"])
+        for cache in TwoTierCache.instances:
+            stats = cache.stats()
+            for event in cache.counters:
+                cache_events.add_metric([cache.namespace, event], stats[event])
+            cache_items.add_metric([cache.namespace], stats["memory_items"])
+        yield cache_events
+        yield cache_items
+
+        pool = async_engine.sync_engine.pool
+        db_pool = GaugeMetricFamily("taleon_db_pool_connections", "Conexões do pool do banco", labels=["state"])
+        try:
+            db_pool.add_metric(["checked_out"], pool.checkedout())
+            db_pool.add_metric(["checked_in"], pool.checkedin())
+            db_pool.add_metric(["overflow"], max(pool.overflow(), 0))
+            db_pool.add_metric(["size"], pool.size())
+        except AttributeError:
+            # Pools sem contagem (ex.: NullPool) não têm essas informações
+            pass
+        yield db_pool
+
+REGISTRY.register(_StateCollector())
+
+# Função da rota -> caminho com parâmetros (ex.: /api/characters/{character_id}), por aplicação
+_route_paths = {}
+
+def _route_label(scope) -> str:
+    app = scope.get("app")
+    if app not in _route_paths:
+        _route_paths[app] = {
+            route.endpoint: route.path for route in getattr(app, "routes", []) if hasattr(route, "endpoint")
+        }
+    # O caminho da rota, e não o da requisição, mantém o número de séries limitado
+    return _route_paths[app].get(scope.get("endpoint"), "unmatched")
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a duração de cada requisição, rotulada pela rota.
+
+    Respostas em fluxo contínuo (text/event-stream) não são medidas: a duração
+    delas é a da conexão, não a do processamento.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not streaming:
+                REQUEST_SECONDS.labels(
+                    method=scope["method"], route=_route_label(scope), status=status,
+                ).observe(time.perf_counter() - started)
+
+def render_metrics() -> bytes:
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,121 @@
+"""
+Sonda de atividade pela lista de jogadores online (online.php).
+
+Uma única página por ciclo informa quem está jogando. Os personagens
+cadastrados vistos online ficam num sorted set do Redis (id -> último horário
+visto), e o agendamento usa essa informação para coletar o perfil só de quem
+esteve online desde a última coleta: quem não entrou no jogo não mudou.
+Enquanto a sonda estiver parada (Taleon fora do ar, Redis indisponível...),
+o agendamento volta a coletar todos os vencidos normalmente.
+"""
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Iterable, Set
+import logging
+import os
+import time
+
+from models.character import Character
+from services.redis_client import get_redis
+from services.taleon_pages import get_online_players
+
+logger = logging.getLogger(__name__)
+
+# Configurações da sonda de atividade
+ONLINE_PROBE_INTERVAL = int(os.getenv("ONLINE_PROBE_INTERVAL", "60"))  # segundos entre leituras; 0 desativa
+ONLINE_SEEN_TTL = int(os.getenv("ONLINE_SEEN_TTL", "172800"))  # segundos que um personagem visto fica no conjunto
+ONLINE_REFRESH_INTERVAL = int(os.getenv("ONLINE_REFRESH_INTERVAL", "3600"))  # intervalo máximo entre coletas de quem está online
+ONLINE_MAX_SKIP = int(os.getenv("ONLINE_MAX_SKIP", "604800"))  # tempo máximo sem coleta para quem não foi visto
+
+# Chaves no Redis
+SEEN_KEY = "taleon:online:seen"  # sorted set: id do personagem -> último horário visto online
+PROBE_KEY = "taleon:online:probed_at"  # horário da última leitura bem-sucedida
+
+async def probe_online(db: AsyncSession) -> int:
+    """
+    Lê a lista de online e registra os personagens cadastrados presentes nela.
+
+    Quem está online tem a próxima coleta antecipada para no máximo
+    ONLINE_REFRESH_INTERVAL após a última. Retorna quantos cadastrados estavam online.
+    """
+    players, _ = await get_online_players()
+    names = list({player.name.lower() for player in players if player.name})
+    now = datetime.utcnow()
+    online = []
+    if names:
+        result = await db.execute(
+            select(Character.id, Character.updated_at, Character.last_checked, Character.next_refresh_at)
+            .where(func.lower(Character.name).in_(names))
+        )
+        online = result.all()
+
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    if online:
+        pipe.zadd(SEEN_KEY, {str(row.id): time.time() for row in online})
+    pipe.zremrangebyscore(SEEN_KEY, "-inf", time.time() - ONLINE_SEEN_TTL)
+    pipe.set(PROBE_KEY, time.time())
+    await pipe.execute()
+
+    updates = []
+    for row in online:
+        target = max(now, (row.last_checked or now) + timedelta(seconds=ONLINE_REFRESH_INTERVAL))
+        if row.next_refresh_at is None or row.next_refresh_at > target:
+            # updated_at marca a última mudança do perfil; sem isso o onupdate da coluna o sobrescreveria
+            updates.append({"id": row.id, "updated_at": row.updated_at, "next_refresh_at": target})
+    if updates:
+        await db.execute(update(Character), updates)
+        await db.commit()
+
+    logger.info(
+        "Sonda online: %d jogadores online, %d cadastrados, %d coletas antecipadas",
+        len(players), len(online), len(updates),
+    )
+    return len(online)
+
+async def probe_is_fresh() -> bool:
+    """A sonda leu a lista recentemente? Sem isso o agendamento não deve filtrar ninguém"""
+    if ONLINE_PROBE_INTERVAL <= 0:
+        return False
+    probed_at = await get_redis().get(PROBE_KEY)
+    return probed_at is not None and time.time() - float(probed_at) < 3 * ONLINE_PROBE_INTERVAL
+
+async def seen_online_since(rows: Iterable) -> Set[int]:
+    """
+    Ids dos personagens vistos online depois da última coleta.
+
+    `rows` precisam ter `id` e `last_checked`; quem nunca foi coletado conta
+    como visto.
+    """
+    rows = list(rows)
+    if not rows:
+        return set()
+    scores = await get_redis().zmscore(SEEN_KEY, [str(row.id) for row in rows])
+    seen = set()
+    for row, score in zip(rows, scores):
+        if row.last_checked is None:
+            seen.add(row.id)
+        elif score is not None and datetime.utcfromtimestamp(score) >= row.last_checked:
+            seen.add(row.id)
+    return seen
+
+async def skippable_offline(rows: Iterable, now: datetime) -> Set[int]:
+    """
+    Ids dos personagens vencidos cuja coleta pode ser dispensada: não foram
+    vistos online desde a última coleta, e a última coleta tem menos de
+    ONLINE_MAX_SKIP. Vazio se a sonda não estiver funcionando.
+    """
+    rows = list(rows)
+    try:
+        if not rows or not await probe_is_fresh():
+            return set()
+        seen = await seen_online_since(rows)
+    except Exception as e:
+        logger.error("Erro ao consultar a sonda online: %s", e)
+        return set()
+    max_skip = timedelta(seconds=ONLINE_MAX_SKIP)
+    return {
+        row.id for row in rows
+        if row.id not in seen and row.last_checked is not None and now - row.last_checked < max_skip
+    }
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import re
+
+from services.profile_parser import ANY_TABLE_RE, TableTokenizer, cell_text
+
+_NON_DIGITS_RE = re.compile(r"[^\d]")
+
+# Cabeçalhos aceitos para cada coluna, já normalizados
+NAME_HEADERS = {"name", "player", "character", "nome"}
+POSITION_HEADERS = {"#", "rank", "position", "pos"}
+LEVEL_HEADERS = {"level", "lvl", "nível"}
+VOCATION_HEADERS = {"vocation", "voc", "vocação"}
+VALUE_HEADERS = {"experience", "exp", "points", "value", "skill", "score"}
+GUILD_HEADERS = {"guild"}
+STATUS_HEADERS = {"status", "online"}
+
+@dataclass
+class HighscoreRow:
+    position: int
+    name: str
+    vocation: str = ""
+    level: int = 0
+    value: int = 0
+
+@dataclass
+class OnlinePlayerRow:
+    name: str
+    level: int = 0
+    vocation: str = ""
+    guild: str = ""
+
+@dataclass
+class GuildMemberRow:
+    name: str
+    rank: str = ""
+    level: int = 0
+    vocation: str = ""
+    online: bool = False
+
+def _to_int(text: str) -> int:
+    digits = _NON_DIGITS_RE.sub("", text or "")
+    return int(digits) if digits else 0
+
+def _header_key(text: str) -> str:
+    return text.strip().lower().rstrip(":").strip()
+
+def _pick(record: Dict[str, str], headers) -> str:
+    for header in headers:
+        if header in record:
+            return record[header]
+    return ""
+
+def parse_records(html_content: str) -> List[Dict[str, str]]:
+    """
+    Extrai as linhas da primeira tabela que tenha uma coluna de nome.
+
+    As colunas são identificadas pelo texto do cabeçalho (td ou th), não pela
+    posição, de modo que variações de layout entre páginas não quebram a
+    extração. Cada registro é um dicionário cabeçalho -> texto; o link da
+    célula de nome, se houver, fica em "_link".
+    """
+    for match in ANY_TABLE_RE.finditer(html_content):
+        rows = TableTokenizer(cell_tags=("td", "th")).parse(html_content, match.start())
+
+        header = None
+        records: List[Dict[str, str]] = []
+        for row in rows:
+            texts = [cell_text(cell, strip_parts=True) for cell in row]
+            keys = [_header_key(text) for text in texts]
+            if header is None:
+                if NAME_HEADERS.intersection(keys):
+                    header = keys
+                continue
+            if len(row) != len(header):
+                continue
+
+            record = dict(zip(header, texts))
+            for key, cell in zip(header, row):
+                if key in NAME_HEADERS and cell["links"]:
+                    record["_link"] = cell["links"][0]
+            if _pick(record, NAME_HEADERS) or "_link" in record:
+                records.append(record)
+
+        if records:
+            return records
+    return []
+
+def _name_of(record: Dict[str, str]) -> str:
+    # O link (characterprofile.php?name=...) tem precedência: alguns layouts
+    # colocam o nome só nele, e a página da guild junta o apelido ao texto
+    if record.get("_link"):
+        linked = parse_qs(urlparse(record["_link"]).query).get("name")
+        if linked and linked[0].strip():
+            return linked[0].strip()
+    return _pick(record, NAME_HEADERS)
+
+def parse_highscores(html_content: str) -> List[HighscoreRow]:
+    """Extrai o ranking da página highscores.php"""
+    entries = []
+    for index, record in enumerate(parse_records(html_content), start=1):
+        position = _to_int(_pick(record, POSITION_HEADERS)) or index
+        entries.append(HighscoreRow(
+            position=position,
+            name=_name_of(record),
+            vocation=_pick(record, VOCATION_HEADERS),
+            level=_to_int(_pick(record, LEVEL_HEADERS)),
+            value=_to_int(_pick(record, VALUE_HEADERS) or _pick(record, LEVEL_HEADERS)),
+        ))
+    return entries
+
+def parse_online(html_content: str) -> List[OnlinePlayerRow]:
+    """Extrai a lista de jogadores da página online.php"""
+    return [
+        OnlinePlayerRow(
+            name=_name_of(record),
+            level=_to_int(_pick(record, LEVEL_HEADERS)),
+            vocation=_pick(record, VOCATION_HEADERS),
+            guild=_pick(record, GUILD_HEADERS),
+        )
+        for record in parse_records(html_content)
+    ]
+
+def parse_guild_members(html_content: str) -> List[GuildMemberRow]:
+    """Extrai os membros da página guildprofile.php"""
+    members = []
+    last_rank = ""
+    for record in parse_records(html_content):
+        # O título do rank costuma aparecer só na primeira linha de cada grupo
+        rank = _pick(record, {"rank", "ranking"}) or last_rank
+        last_rank = rank
+        status = _pick(record, STATUS_HEADERS).lower()
+        members.append(GuildMemberRow(
+            name=_name_of(record),
+            rank=rank,
+            level=_to_int(_pick(record, LEVEL_HEADERS)),
+            vocation=_pick(record, VOCATION_HEADERS),
+            online="online" in status and "offline" not in status,
+        ))
+    return members
+
+def filter_by_level(items: list, min_level: Optional[int] = None, max_level: Optional[int] = None) -> list:
+    if min_level is not None:
+        items = [item for item in items if item.level >= min_level]
+    if max_level is not None:
+        items = [item for item in items if item.level <= max_level]
+    return items
+
+def filter_by_vocation(items: list, vocation: Optional[str]) -> list:
+    """Filtra pela vocação; promoções (ex.: Elite Knight) contam como a vocação base"""
+    if not vocation:
+        return items
+    wanted = vocation.strip().lower()
+    return [item for item in items if wanted in item.vocation.lower()]
@@ -0,0 +1,221 @@
+"""
+Particionamento mensal da tabela character_history.
+
+Cada mês fica numa partição própria (character_history_AAAA_MM), de modo
+que consultas por intervalo de tempo leem apenas as partições do intervalo
+e a retenção pode descartar meses inteiros com um DROP em vez de DELETEs.
+Registros fora dos meses criados (ex.: um mês que ainda não tem partição)
+caem na partição DEFAULT (character_history_default) em vez de falhar; ao
+criar a partição do mês, esses registros são movidos para ela.
+
+As funções recebem uma conexão síncrona do SQLAlchemy; no código assíncrono
+use `await conn.run_sync(...)`. Este módulo não importa os modelos para
+poder ser usado pelas migrações.
+"""
+from sqlalchemy import text
+from datetime import date, datetime
+from typing import Callable, List, Optional, Tuple
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "character_history"
+LEGACY_TABLE = "character_history_legacy"
+DEFAULT_PARTITION = f"{HISTORY_TABLE}_default"
+HISTORY_PARTITIONS_AHEAD = int(os.getenv("HISTORY_PARTITIONS_AHEAD", "3"))  # meses criados antecipadamente
+HISTORY_MAX_MONTHS = int(os.getenv("HISTORY_MAX_MONTHS", "0"))  # meses mantidos; 0 mantém tudo
+# Chave arbitrária do advisory lock que serializa a criação de partições
+PARTITIONS_LOCK_KEY = 72_041_019
+
+_PARTITION_RE = re.compile(rf"^{HISTORY_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{HISTORY_TABLE}_{month:%Y_%m}"
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = :table
+        )
+    """), {"table": HISTORY_TABLE}).scalar())
+
+def list_partitions(conn) -> List[Tuple[str, date]]:
+    """Partições mensais existentes, da mais antiga para a mais nova"""
+    result = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {"table": HISTORY_TABLE})
+    partitions = []
+    for (name,) in result:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def ensure_default_partition(conn):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {HISTORY_TABLE} DEFAULT"))
+
+def _create_partition(conn, name: str, month: date, has_default: bool):
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    moving = has_default and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end)"
+    ), {"start": start, "end": end}).scalar()
+    if not moving:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        return
+
+    # O PostgreSQL não cria a partição se a DEFAULT já tem linhas do intervalo:
+    # a tabela é criada à parte, recebe as linhas e só então é anexada
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {HISTORY_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end}).rowcount
+    conn.execute(text(f"ALTER TABLE {HISTORY_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    logger.info(f"{moved} registros movidos da partição padrão para {name}")
+
+def ensure_partitions(
+    conn,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    months_ahead: int = HISTORY_PARTITIONS_AHEAD,
+) -> List[str]:
+    """Cria as partições de `since` (padrão: mês atual) até `months_ahead` meses à frente (ou até `until`)"""
+    current = month_start(datetime.utcnow())
+    month = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+    if until and month_start(until) > last:
+        last = month_start(until)
+    created = []
+    existing = {name for name, _ in list_partitions(conn)}
+    has_default = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": DEFAULT_PARTITION}).scalar()
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            _create_partition(conn, name, month, has_default)
+            created.append(name)
+        month = add_months(month, 1)
+    if created:
+        logger.info(f"Partições do histórico criadas: {', '.join(created)}")
+    return created
+
+def ensure_history_partitions(conn) -> List[str]:
+    """
+    Garante a partição padrão e as dos próximos meses, se a tabela for
+    particionada. Chamada pelo init_db e pela retenção agendada (antes do
+    descarte, numa transação própria); a inicialização da API e dos workers
+    não consulta o esquema. Um mês sem partição cai na partição padrão.
+    """
+    if not is_partitioned(conn):
+        return []
+    # init_db e a retenção podem rodar ao mesmo tempo; a criação é serializada
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITIONS_LOCK_KEY})
+    ensure_default_partition(conn)
+    return ensure_partitions(conn)
+
+def expired_partitions(conn, max_months: int = HISTORY_MAX_MONTHS) -> List[Tuple[str, date]]:
+    """Partições cujo mês inteiro é anterior à janela de `max_months` meses"""
+    if max_months <= 0:
+        return []
+    cutoff = add_months(month_start(datetime.utcnow()), -max_months)
+    return [(name, month) for name, month in list_partitions(conn) if add_months(month, 1) <= cutoff]
+
+def drop_expired_partitions(
+    conn,
+    max_months: int = HISTORY_MAX_MONTHS,
+    archive: Optional[Callable[[list], None]] = None,
+    chunk: int = 5000,
+) -> List[str]:
+    """
+    Remove as partições fora da janela de retenção.
+
+    A partição é desanexada antes do DROP, para que o lock na tabela principal
+    dure só o tempo do DETACH. Com `archive`, as linhas são entregues em lotes
+    antes da remoção.
+    """
+    dropped = []
+    for name, _ in expired_partitions(conn, max_months):
+        conn.execute(text(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {name}"))
+        if archive is not None:
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    text(f"SELECT * FROM {name} WHERE id > :last_id ORDER BY id LIMIT :chunk"),
+                    {"last_id": last_id, "chunk": chunk},
+                ).all()
+                if not rows:
+                    break
+                archive(rows)
+                last_id = rows[-1].id
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+        logger.info(f"Partição {name} removida pela retenção")
+    return dropped
+
+def prepare_partitioned_migration(conn) -> bool:
+    """
+    Renomeia a tabela de histórico não particionada, se existir, para que o
+    create_all crie a nova tabela particionada no lugar.
+
+    Retorna True quando a tabela foi renomeada; os dados são copiados depois
+    por migrate_legacy_history.
+    """
+    exists = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": HISTORY_TABLE}).scalar()
+    if not exists or is_partitioned(conn):
+        return False
+
+    logger.info("Convertendo character_history para tabela particionada por mês")
+    conn.execute(text(f"ALTER TABLE {HISTORY_TABLE} RENAME TO {LEGACY_TABLE}"))
+    # Índices, restrição e sequência mantêm o nome antigo e colidiriam com os da nova tabela
+    for index in ("ix_character_history_character_timestamp", "ix_character_history_id"):
+        conn.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_legacy"))
+    conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT character_history_pkey TO character_history_legacy_pkey"))
+    conn.execute(text("ALTER SEQUENCE IF EXISTS character_history_id_seq RENAME TO character_history_legacy_id_seq"))
+    return True
+
+def migrate_legacy_history(conn) -> int:
+    """Copia os registros da tabela antiga para a particionada e remove a antiga"""
+    if not conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": LEGACY_TABLE}).scalar():
+        return 0
+
+    timestamp = "COALESCE(h.timestamp, c.created_at, now())"
+    bounds = conn.execute(text(f"""
+        SELECT min({timestamp}), max({timestamp}), count(*)
+        FROM {LEGACY_TABLE} h LEFT JOIN characters c ON c.id = h.character_id
+    """)).one()
+    if bounds[0] is not None:
+        ensure_partitions(conn, since=bounds[0], until=bounds[1])
+
+    conn.execute(text(f"""
+        INSERT INTO {HISTORY_TABLE} (id, character_id, level, experience, daily_experience, deaths, timestamp)
+        SELECT h.id, h.character_id, h.level, h.experience, h.daily_experience, h.deaths, {timestamp}
+        FROM {LEGACY_TABLE} h LEFT JOIN characters c ON c.id = h.character_id
+    """))
+    # A nova sequência continua de onde a antiga parou
+    conn.execute(text(f"""
+        SELECT setval(pg_get_serial_sequence('{HISTORY_TABLE}', 'id'), COALESCE((SELECT max(id) FROM {HISTORY_TABLE}), 0) + 1, false)
+    """))
+    conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+    logger.info(f"{bounds[2]} registros de histórico migrados para a tabela particionada")
+    return bounds[2]
@@ -0,0 +1,186 @@
+from bs4 import BeautifulSoup
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Localiza a tabela do personagem sem montar a árvore do documento inteiro
+# A classe "table" precisa aparecer como palavra inteira: "table-striped" sozinha não conta,
+# assim como no find('table', {'class': 'table'}) do BeautifulSoup
+_CLASS_TABLE_RE = re.compile(r"<table\b[^>]*\bclass\s*=\s*[\"']?(?:[^\"'>]*\s)?table(?=[\s\"'>])", re.IGNORECASE)
+ANY_TABLE_RE = re.compile(r"<table\b", re.IGNORECASE)
+_NON_DIGITS_RE = re.compile(r"[^\d]")
+_LEVEL_RE = re.compile(r"[^\d.]")
+
+@dataclass
+class CharacterProfile:
+    """Dados extraídos da tabela do perfil do personagem"""
+    name: str
+    outfit: str = ""
+    level: int = 0
+    vocation: str = ""
+    residence: str = ""
+    experience: float = 0
+    daily_experience: float = 0
+    deaths: int = 0
+
+def profile_fingerprint(profile: CharacterProfile) -> str:
+    """Hash dos campos extraídos, usado para detectar perfis que não mudaram"""
+    raw = json.dumps(asdict(profile), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class _TableClosed(Exception):
+    pass
+
+class TableTokenizer(HTMLParser):
+    """
+    Tokenizador que percorre apenas a primeira tabela do trecho recebido.
+
+    Cada linha é guardada como uma lista de células; cada célula guarda os
+    fragmentos de texto e os atributos das imagens encontradas. A leitura é
+    interrompida assim que a tabela é fechada.
+    """
+
+    def __init__(self, cell_tags=("td",)):
+        super().__init__(convert_charrefs=True)
+        self.cell_tags = cell_tags
+        self.rows: List[List[dict]] = []
+        self._depth = 0
+        self._row: Optional[List[dict]] = None
+        self._cell: Optional[dict] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+        elif self._depth == 0:
+            return
+        elif tag == "tr":
+            self._row = []
+            self.rows.append(self._row)
+        elif tag in self.cell_tags and self._row is not None:
+            self._cell = {"text": [], "images": [], "links": []}
+            self._row.append(self._cell)
+        elif tag == "img" and self._cell is not None:
+            self._cell["images"].append(dict(attrs))
+        elif tag == "a" and self._cell is not None:
+            self._cell["links"].append(dict(attrs).get("href", ""))
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._depth:
+            self._depth -= 1
+            if self._depth == 0:
+                raise _TableClosed()
+        elif tag in self.cell_tags:
+            self._cell = None
+        elif tag == "tr":
+            self._row = None
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+    def parse(self, html_content: str, start: int = 0) -> List[List[dict]]:
+        try:
+            self.feed(html_content[start:])
+            self.close()
+        except _TableClosed:
+            pass
+        return self.rows
+
+def cell_text(cell: dict, strip_parts: bool = False) -> str:
+    """Texto da célula, equivalente a `.text.strip()` ou `get_text(strip=True)` do BeautifulSoup"""
+    if strip_parts:
+        return "".join(part.strip() for part in cell["text"])
+    return "".join(cell["text"]).strip()
+
+def _normalize_key(text: str) -> str:
+    return text.strip().lower().replace(":", "")
+
+def _build_profile(fields: Dict[str, str], fallback_name: str) -> CharacterProfile:
+    """Converte os campos textuais da tabela nos tipos do perfil"""
+    level_text = _LEVEL_RE.sub("", fields.get("level", "0")).replace(".", "")
+    exp_text = _NON_DIGITS_RE.sub("", fields.get("experience", ""))
+    daily_text = _NON_DIGITS_RE.sub("", fields.get("daily_experience", fields.get("daily experience", "")))
+    deaths_text = _NON_DIGITS_RE.sub("", fields.get("deaths", ""))
+    return CharacterProfile(
+        name=fields.get("name") or fallback_name,
+        outfit=fields.get("outfit", ""),
+        level=int(level_text) if level_text else 0,
+        vocation=fields.get("vocation", ""),
+        residence=fields.get("residence", ""),
+        experience=float(exp_text) if exp_text else 0,
+        daily_experience=float(daily_text) if daily_text else 0,
+        deaths=int(deaths_text) if deaths_text else 0,
+    )
+
+def _find_table_start(html_content: str) -> int:
+    match = _CLASS_TABLE_RE.search(html_content) or ANY_TABLE_RE.search(html_content)
+    return match.start() if match else -1
+
+def extract_fields_fast(html_content: str) -> Optional[Dict[str, str]]:
+    """Extrai os campos da tabela do personagem com o tokenizador dedicado"""
+    start = _find_table_start(html_content)
+    if start < 0:
+        return None
+
+    fields: Dict[str, str] = {}
+    for row in TableTokenizer().parse(html_content, start):
+        if len(row) < 2:
+            continue
+        key = _normalize_key(cell_text(row[0]))
+        if key == "name":
+            for image in row[1]["images"]:
+                if "outfitImgTable" in (image.get("class") or "").split():
+                    fields["outfit"] = image.get("src", "")
+                    break
+            fields[key] = cell_text(row[1], strip_parts=True)
+        else:
+            fields[key] = cell_text(row[1])
+    return fields or None
+
+def extract_fields_soup(html_content: str) -> Optional[Dict[str, str]]:
+    """Extração original com BeautifulSoup, usada como alternativa"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    character_table = soup.find('table', {'class': 'table'}) or soup.find('table')
+    if not character_table:
+        return None
+
+    fields: Dict[str, str] = {}
+    for row in character_table.find_all('tr'):
+        cols = row.find_all('td')
+        if len(cols) >= 2:
+            key = _normalize_key(cols[0].text)
+            if key == 'name':
+                outfit_img = cols[1].find('img', {'class': 'outfitImgTable'})
+                if outfit_img:
+                    fields['outfit'] = outfit_img.get('src', '')
+                fields[key] = cols[1].get_text(strip=True)
+            else:
+                fields[key] = cols[1].text.strip()
+    return fields
+
+def parse_profile(html_content: str, character_name: str = "") -> Optional[CharacterProfile]:
+    """
+    Extrai o perfil do personagem do HTML da página characterprofile.php.
+
+    Tenta primeiro o caminho rápido e recorre ao BeautifulSoup quando ele não
+    encontra a tabela ou falha. Retorna None se nenhuma tabela for encontrada.
+    """
+    fields = None
+    try:
+        fields = extract_fields_fast(html_content)
+    except Exception as e:
+        logger.warning("Falha no parser rápido para %s: %s", character_name, e)
+
+    if not fields:
+        fields = extract_fields_soup(html_content)
+        if fields is None:
+            return None
+
+    return _build_profile(fields, character_name)
@@ -0,0 +1,38 @@
+from redis import asyncio as aioredis
+from typing import Optional
+import os
+
+# Configurações do Redis
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = os.getenv("REDIS_PORT", "6379")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "")
+REDIS_URL = os.getenv("REDIS_URL") or (
+    f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}" if REDIS_PASSWORD else f"redis://{REDIS_HOST}:{REDIS_PORT}"
+)
+
+_redis: Optional[aioredis.Redis] = None
+
+def get_redis() -> aioredis.Redis:
+    """Cliente Redis compartilhado pelo processo (respostas decodificadas como str)"""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+    return _redis
+
+_binary_redis: Optional[aioredis.Redis] = None
+
+def get_binary_redis() -> aioredis.Redis:
+    """Cliente Redis para valores binários (ex.: conteúdo comprimido), sem decodificação"""
+    global _binary_redis
+    if _binary_redis is None:
+        _binary_redis = aioredis.from_url(REDIS_URL, decode_responses=False)
+    return _binary_redis
+
+async def close_redis():
+    global _redis, _binary_redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
+    if _binary_redis is not None:
+        await _binary_redis.close()
+        _binary_redis = None
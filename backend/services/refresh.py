@@ -0,0 +1,266 @@
+import aiohttp
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.ingest import NOT_FOUND, SAVED, UNCHANGED, Validators, load_validators, persist_profiles
+from services.metrics import PARSE_SECONDS, SCRAPES, timed
+from services.profile_parser import CharacterProfile, parse_profile
+from services.scraper import TALEON_BASE_URL, fetch_character_page
+
+logger = logging.getLogger(__name__)
+
+# Configurações do motor de atualização em lote
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "4"))
+REFRESH_RATE_PER_SECOND = float(os.getenv("REFRESH_RATE_PER_SECOND", "2"))
+REFRESH_BURST = int(os.getenv("REFRESH_BURST", "4"))
+REFRESH_MAX_RETRIES = int(os.getenv("REFRESH_MAX_RETRIES", "3"))
+REFRESH_BACKOFF_BASE = float(os.getenv("REFRESH_BACKOFF_BASE", "5"))  # segundos
+REFRESH_BACKOFF_MAX = float(os.getenv("REFRESH_BACKOFF_MAX", "300"))  # segundos
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "100"))
+
+# Status HTTP que indicam sobrecarga do servidor e justificam nova tentativa
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Limita a taxa de requisições a `rate` por segundo, com rajadas de até `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # O lock garante que os pedidos sejam atendidos em ordem de chegada
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class RedisRateLimiter:
+    """
+    Limite de requisições compartilhado entre processos, com janela fixa no Redis.
+
+    Usado pelos workers da fila para que o total de requisições ao Taleon
+    respeite `rate` por segundo independentemente de quantos processos rodam.
+    """
+
+    def __init__(self, redis, key: str, rate: float):
+        self.redis = redis
+        self.key = key
+        self.window = max(1.0, 1.0 / rate)
+        self.limit = max(1, int(rate * self.window))
+
+    async def acquire(self):
+        while True:
+            now = time.time()
+            slot = int(now / self.window)
+            key = f"{self.key}:{slot}"
+            count = await self.redis.incr(key)
+            if count == 1:
+                await self.redis.expire(key, int(self.window) + 1)
+            if count <= self.limit:
+                return
+            await asyncio.sleep((slot + 1) * self.window - now)
+
+class HostBackoff:
+    """Backoff exponencial por host após respostas 429/5xx"""
+
+    def __init__(self, base: float, maximum: float):
+        self.base = base
+        self.maximum = maximum
+        self._until: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+
+    async def wait(self, host: str):
+        while True:
+            delay = self._until.get(host, 0) - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def penalize(self, host: str, retry_after: Optional[float] = None) -> float:
+        failures = self._failures.get(host, 0) + 1
+        self._failures[host] = failures
+        if retry_after is None:
+            delay = min(self.maximum, self.base * 2 ** (failures - 1))
+        else:
+            delay = min(self.maximum, retry_after)
+        self._until[host] = max(self._until.get(host, 0), time.monotonic() + delay)
+        return delay
+
+    def reset(self, host: str):
+        self._failures.pop(host, None)
+
+@dataclass
+class RefreshSummary:
+    """Resultado de uma execução do motor de atualização"""
+    total: int = 0
+    succeeded: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    not_found: List[str] = field(default_factory=list)  # removidos do cadastro durante a coleta
+    wall_time: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "succeeded": len(self.succeeded),
+            "failed": len(self.failed),
+            "skipped": len(self.skipped),
+            "not_found": len(self.not_found),
+            "failed_names": self.failed,
+            "wall_time": round(self.wall_time, 3),
+        }
+
+def _retry_after(headers) -> Optional[float]:
+    """Lê o cabeçalho Retry-After (apenas o formato em segundos)"""
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+async def refresh_characters(
+    names: Iterable[str],
+    db: AsyncSession,
+    concurrency: int = REFRESH_CONCURRENCY,
+    rate: float = REFRESH_RATE_PER_SECOND,
+    burst: int = REFRESH_BURST,
+    max_retries: int = REFRESH_MAX_RETRIES,
+    max_duration: Optional[float] = None,
+    batch_size: int = REFRESH_BATCH_SIZE,
+    limiter=None,
+) -> RefreshSummary:
+    """
+    Atualiza os personagens informados com concorrência limitada.
+
+    Todas as requisições passam por um token bucket compartilhado, de modo que a
+    carga sobre o Taleon nunca ultrapassa `rate` requisições por segundo, e um
+    backoff por host é aplicado quando o servidor responde 429/5xx. Personagens
+    repetidos, sem alteração desde a última coleta (304 ou mesma impressão
+    digital), ou que não puderam começar antes de `max_duration` segundos, são
+    contabilizados como ignorados.
+
+    Os perfis extraídos são acumulados e gravados em lotes de `batch_size`,
+    com uma transação por lote. `limiter` substitui o token bucket local (por
+    exemplo, por um RedisRateLimiter compartilhado entre processos).
+    """
+    started = time.monotonic()
+    deadline = started + max_duration if max_duration else None
+    host = urlparse(TALEON_BASE_URL).netloc
+
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = limiter or TokenBucket(rate, burst)
+    backoff = HostBackoff(REFRESH_BACKOFF_BASE, REFRESH_BACKOFF_MAX)
+    summary = RefreshSummary()
+    pending: Dict[str, Optional[CharacterProfile]] = {}
+    received: Dict[str, Validators] = {}
+    db_lock = asyncio.Lock()
+
+    async def flush():
+        # A sessão não pode ser usada por duas tarefas ao mesmo tempo
+        async with db_lock:
+            batch = dict(pending)
+            pending.clear()
+            if not batch:
+                return
+            statuses = await persist_profiles(db, batch, {name: received.pop(name) for name in batch})
+            for name, status in statuses.items():
+                if status == SAVED:
+                    summary.succeeded.append(name)
+                elif status == UNCHANGED:
+                    summary.skipped.append(name)
+                elif status == NOT_FOUND:
+                    summary.not_found.append(name)
+                else:
+                    summary.failed.append(name)
+
+    async def refresh_one(name: str):
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                if deadline and time.monotonic() > deadline:
+                    summary.skipped.append(name)
+                    return
+
+                await backoff.wait(host)
+                await bucket.acquire()
+                try:
+                    etag, last_modified = stored.get(name, (None, None))
+                    page = await fetch_character_page(name, etag, last_modified)
+                except aiohttp.ClientResponseError as e:
+                    if e.status in RETRYABLE_STATUS and attempt < max_retries:
+                        delay = backoff.penalize(host, _retry_after(e.headers))
+                        logger.warning("Taleon respondeu %s para %s, aguardando %.1fs", e.status, name, delay)
+                        continue
+                    logger.error("Falha ao obter %s: HTTP %s", name, e.status)
+                    summary.failed.append(name)
+                    return
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt < max_retries:
+                        delay = backoff.penalize(host)
+                        logger.warning("Erro de conexão ao obter %s, aguardando %.1fs: %s", name, delay, e)
+                        continue
+                    logger.error("Falha ao obter %s: %s", name, e)
+                    summary.failed.append(name)
+                    return
+                except Exception as e:
+                    logger.error("Falha ao obter %s: %s", name, e)
+                    summary.failed.append(name)
+                    return
+
+                backoff.reset(host)
+                # 304: não há o que processar, apenas registrar a verificação
+                profile = None
+                if not page.not_modified:
+                    with timed(PARSE_SECONDS, page="characterprofile"):
+                        profile = parse_profile(page.html, name)
+                    if not profile:
+                        logger.error("Nenhuma tabela encontrada para: %s", name)
+                        summary.failed.append(name)
+                        return
+
+                pending[name] = profile
+                received[name] = (page.etag, page.last_modified)
+                if len(pending) >= batch_size:
+                    await flush()
+                return
+
+    unique_names = []
+    seen = set()
+    for name in names:
+        summary.total += 1
+        if name in seen:
+            summary.skipped.append(name)
+            continue
+        seen.add(name)
+        unique_names.append(name)
+
+    stored = await load_validators(db, unique_names) if unique_names else {}
+    await asyncio.gather(*(refresh_one(name) for name in unique_names))
+    await flush()
+
+    summary.wall_time = time.monotonic() - started
+    SCRAPES.labels(result="succeeded").inc(len(summary.succeeded))
+    SCRAPES.labels(result="failed").inc(len(summary.failed))
+    SCRAPES.labels(result="skipped").inc(len(summary.skipped))
+    SCRAPES.labels(result="not_found").inc(len(summary.not_found))
+    logger.info(
+        "Atualização concluída: %d ok, %d falhas, %d ignorados em %.1fs",
+        len(summary.succeeded), len(summary.failed), len(summary.skipped), summary.wall_time,
+    )
+    return summary
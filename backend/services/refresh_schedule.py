@@ -0,0 +1,133 @@
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import logging
+import os
+import random
+
+from models.character import Character
+from services.jobs import enqueue_refreshes
+from services.online_probe import skippable_offline
+
+logger = logging.getLogger(__name__)
+
+# Intervalos de coleta por nível de atividade, em segundos
+REFRESH_INTERVAL_ACTIVE = int(os.getenv("REFRESH_INTERVAL_ACTIVE", "3600"))  # mudou nas últimas 24h
+REFRESH_INTERVAL_RECENT = int(os.getenv("REFRESH_INTERVAL_RECENT", "21600"))  # mudou nos últimos 7 dias
+REFRESH_INTERVAL_IDLE = int(os.getenv("REFRESH_INTERVAL_IDLE", "86400"))  # mudou nos últimos 30 dias
+REFRESH_INTERVAL_DORMANT = int(os.getenv("REFRESH_INTERVAL_DORMANT", "604800"))  # parado há mais tempo
+REFRESH_JITTER = float(os.getenv("REFRESH_JITTER", "0.1"))  # variação aleatória do intervalo (fração)
+SCHEDULE_TICK_SECONDS = int(os.getenv("SCHEDULE_TICK_SECONDS", "60"))
+SCHEDULE_MAX_PER_TICK = int(os.getenv("SCHEDULE_MAX_PER_TICK", "500"))
+
+# Tempo desde a última mudança do perfil -> (nível, intervalo)
+ACTIVITY_TIERS = [
+    (timedelta(days=1), "active", REFRESH_INTERVAL_ACTIVE),
+    (timedelta(days=7), "recent", REFRESH_INTERVAL_RECENT),
+    (timedelta(days=30), "idle", REFRESH_INTERVAL_IDLE),
+]
+DORMANT = "dormant"
+
+def _classify(last_change: Optional[datetime], now: datetime) -> Tuple[str, int]:
+    if last_change is None:
+        return ACTIVITY_TIERS[0][1], ACTIVITY_TIERS[0][2]
+    idle = now - last_change
+    for limit, tier, interval in ACTIVITY_TIERS:
+        if idle < limit:
+            return tier, interval
+    return DORMANT, REFRESH_INTERVAL_DORMANT
+
+def activity_tier(last_change: Optional[datetime], now: datetime) -> str:
+    return _classify(last_change, now)[0]
+
+def refresh_interval_for(last_change: Optional[datetime], now: datetime) -> int:
+    """
+    Intervalo até a próxima coleta conforme a atividade do personagem.
+
+    `last_change` é a última vez em que o perfil mudou (level, experiência,
+    mortes...): quem está caçando é coletado de hora em hora, quem está
+    parado há semanas uma vez por semana.
+    """
+    return _classify(last_change, now)[1]
+
+def tier_for_interval(interval: Optional[int]) -> str:
+    """Nível de atividade correspondente a um intervalo já gravado"""
+    for _, tier, tier_interval in ACTIVITY_TIERS:
+        if interval == tier_interval:
+            return tier
+    return DORMANT if interval == REFRESH_INTERVAL_DORMANT else "unscheduled"
+
+def next_refresh_time(interval: int, now: datetime) -> datetime:
+    # A variação aleatória evita que personagens coletados juntos continuem sempre juntos
+    jitter = random.uniform(-REFRESH_JITTER, REFRESH_JITTER) * interval
+    return now + timedelta(seconds=interval + jitter)
+
+async def spread_unscheduled(db: AsyncSession, now: datetime) -> int:
+    """
+    Distribui ao longo do próprio intervalo os personagens ainda sem agendamento.
+
+    Evita que, na primeira execução, todos os personagens vençam ao mesmo tempo.
+    """
+    result = await db.execute(
+        select(Character.id, Character.updated_at, Character.content_hash)
+        .where(Character.next_refresh_at.is_(None))
+    )
+    updates = []
+    for row in result.all():
+        # Personagens nunca coletados vencem imediatamente
+        last_change = row.updated_at if row.content_hash else None
+        interval = refresh_interval_for(last_change, now)
+        offset = 0 if row.content_hash is None else random.uniform(0, interval)
+        updates.append({
+            "id": row.id,
+            "updated_at": row.updated_at,
+            "refresh_interval": interval,
+            "next_refresh_at": now + timedelta(seconds=offset),
+        })
+    if updates:
+        await db.execute(update(Character), updates)
+        await db.commit()
+    return len(updates)
+
+async def enqueue_due_characters(db: AsyncSession, limit: int = SCHEDULE_MAX_PER_TICK) -> int:
+    """
+    Enfileira a coleta dos personagens cuja próxima coleta já venceu.
+
+    A próxima coleta é adiada provisoriamente por um intervalo, para que o
+    personagem não seja enfileirado de novo no próximo ciclo; quando o
+    worker grava o resultado, o intervalo é recalculado (ver ingest).
+    Personagens que a sonda online não viu desde a última coleta não são
+    enfileirados, apenas adiados (ver services/online_probe.py).
+    """
+    now = datetime.utcnow()
+    await spread_unscheduled(db, now)
+
+    result = await db.execute(
+        select(Character.id, Character.name, Character.updated_at, Character.last_checked, Character.refresh_interval)
+        .where(or_(Character.next_refresh_at <= now, Character.next_refresh_at.is_(None)))
+        .order_by(Character.next_refresh_at)
+        .limit(limit)
+    )
+    due = result.all()
+    if not due:
+        return 0
+
+    await db.execute(update(Character), [
+        {
+            "id": row.id,
+            "updated_at": row.updated_at,
+            "next_refresh_at": next_refresh_time(row.refresh_interval or REFRESH_INTERVAL_ACTIVE, now),
+        }
+        for row in due
+    ])
+    await db.commit()
+
+    skipped = await skippable_offline(due, now)
+    names = [row.name for row in due if row.id not in skipped]
+    jobs = await enqueue_refreshes(names) if names else {}
+    created = sum(1 for _, is_new in jobs.values() if is_new)
+    logger.info(
+        f"Agendamento: {len(due)} personagens vencidos, {len(skipped)} sem atividade online, {created} jobs criados"
+    )
+    return created
@@ -0,0 +1,266 @@
+"""
+Retenção e compactação do histórico de personagens.
+
+Registros mais novos que HISTORY_RAW_DAYS ficam intactos. Entre esse limite e
+HISTORY_DAILY_DAYS, mantém-se apenas o último registro de cada personagem por
+dia; antes disso, o último de cada semana. O resumo diário
+(character_daily_stats) não é afetado, então rankings continuam com a
+granularidade de dia.
+
+Os personagens são percorridos em grupos de HISTORY_COMPACT_CHARACTERS (por
+character_id), e os ids redundantes de cada grupo são calculados uma única vez;
+a remoção é feita em lotes de HISTORY_DELETE_CHUNK ids, cada um na própria
+transação, para não segurar locks por muito tempo. Com a tabela particionada,
+meses anteriores a HISTORY_MAX_MONTHS são descartados inteiros (DROP da
+partição) e as partições dos próximos meses são criadas. Com
+HISTORY_ARCHIVE_DIR definido, as linhas removidas são gravadas antes em
+arquivos .jsonl.gz.
+
+Uso (a partir do diretório backend):
+    python -m services.retention [--dry-run]
+"""
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+
+from database import AsyncSessionLocal, async_engine
+from models.character_history import CharacterHistory
+from services.partitions import (
+    HISTORY_MAX_MONTHS, drop_expired_partitions, ensure_history_partitions, expired_partitions, is_partitioned,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configurações da retenção do histórico
+HISTORY_RAW_DAYS = int(os.getenv("HISTORY_RAW_DAYS", "30"))  # dias com todos os registros
+HISTORY_DAILY_DAYS = int(os.getenv("HISTORY_DAILY_DAYS", "180"))  # dias com um registro por dia
+HISTORY_DELETE_CHUNK = int(os.getenv("HISTORY_DELETE_CHUNK", "5000"))
+HISTORY_COMPACT_CHARACTERS = int(os.getenv("HISTORY_COMPACT_CHARACTERS", "200"))  # personagens por cálculo de ids
+HISTORY_CHUNK_PAUSE = float(os.getenv("HISTORY_CHUNK_PAUSE", "0.1"))  # segundos entre lotes
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")
+
+@dataclass
+class StageReport:
+    """Resultado de uma etapa da compactação (diária ou semanal)"""
+    unit: str
+    start: Optional[datetime]
+    end: datetime
+    rows: int = 0
+    removed: int = 0
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    started_at: datetime
+    stages: List[StageReport] = field(default_factory=list)
+    dropped_partitions: List[str] = field(default_factory=list)
+    archive: Optional[str] = None
+
+    @property
+    def removed(self) -> int:
+        return sum(stage.removed for stage in self.stages)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["removed"] = self.removed
+        return data
+
+def _range_conditions(start: Optional[datetime], end: datetime):
+    conditions = [CharacterHistory.timestamp < end]
+    if start is not None:
+        conditions.append(CharacterHistory.timestamp >= start)
+    return conditions
+
+def _redundant_ids(unit: str, start: Optional[datetime], end: datetime, *conditions):
+    """
+    Ids dos registros que não são o último do personagem no dia/semana.
+
+    O registro mantido em cada período é o de maior timestamp, então executar
+    a compactação de novo não altera o resultado. As condições extras devem
+    selecionar personagens inteiros (ex.: um intervalo de character_id), ou a
+    numeração das janelas deixa de valer.
+    """
+    ranked = (
+        select(
+            CharacterHistory.id,
+            func.row_number().over(
+                partition_by=(CharacterHistory.character_id, func.date_trunc(unit, CharacterHistory.timestamp)),
+                order_by=(CharacterHistory.timestamp.desc(), CharacterHistory.id.desc()),
+            ).label("position"),
+        )
+        .where(*_range_conditions(start, end), *conditions)
+        .subquery()
+    )
+    return select(ranked.c.id).where(ranked.c.position > 1)
+
+def _archive_rows(path: str, rows: List[CharacterHistory]):
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps({
+                "id": row.id,
+                "character_id": row.character_id,
+                "level": row.level,
+                "experience": row.experience,
+                "daily_experience": row.daily_experience,
+                "deaths": row.deaths,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+            }) + "\n")
+
+async def _next_character_range(db: AsyncSession, stage: StageReport, after: Optional[int], characters: int):
+    """Último character_id do próximo grupo de personagens com registros na etapa"""
+    conditions = _range_conditions(stage.start, stage.end)
+    if after is not None:
+        conditions.append(CharacterHistory.character_id > after)
+    group = (
+        select(CharacterHistory.character_id)
+        .where(*conditions)
+        .group_by(CharacterHistory.character_id)
+        .order_by(CharacterHistory.character_id)
+        .limit(characters)
+        .subquery()
+    )
+    return await db.scalar(select(func.max(group.c.character_id)))
+
+async def _compact_stage(
+    db: AsyncSession,
+    stage: StageReport,
+    dry_run: bool,
+    archive_path: Optional[str],
+    chunk: int,
+    characters: int,
+):
+    stage.rows = await db.scalar(
+        select(func.count()).select_from(CharacterHistory).where(*_range_conditions(stage.start, stage.end))
+    ) or 0
+
+    if dry_run:
+        redundant = _redundant_ids(stage.unit, stage.start, stage.end)
+        stage.removed = await db.scalar(select(func.count()).select_from(redundant.subquery())) or 0
+        return
+
+    # Percorre os personagens por faixas de character_id: a janela de cada faixa
+    # é calculada uma vez só, em vez de uma vez por lote removido
+    last = None
+    while True:
+        upper = await _next_character_range(db, stage, last, characters)
+        if upper is None:
+            break
+        in_range = [CharacterHistory.character_id <= upper]
+        if last is not None:
+            in_range.append(CharacterHistory.character_id > last)
+        ids = (await db.execute(
+            _redundant_ids(stage.unit, stage.start, stage.end, *in_range).order_by("id")
+        )).scalars().all()
+        last = upper
+
+        for offset in range(0, len(ids), chunk):
+            await _delete_chunk(db, stage, ids[offset:offset + chunk], archive_path)
+        # Libera o snapshot da leitura mesmo quando a faixa não tinha nada a remover
+        await db.commit()
+
+async def _delete_chunk(db: AsyncSession, stage: StageReport, ids: List[int], archive_path: Optional[str]):
+    if archive_path:
+        rows = (await db.execute(
+            select(CharacterHistory)
+            .where(CharacterHistory.id.in_(ids), *_range_conditions(stage.start, stage.end))
+        )).scalars().all()
+        await asyncio.to_thread(_archive_rows, archive_path, rows)
+    # O intervalo da etapa permite ao banco tocar só nas partições envolvidas
+    await db.execute(
+        delete(CharacterHistory)
+        .where(CharacterHistory.id.in_(ids), *_range_conditions(stage.start, stage.end))
+    )
+    await db.commit()
+    stage.removed += len(ids)
+    if HISTORY_CHUNK_PAUSE:
+        await asyncio.sleep(HISTORY_CHUNK_PAUSE)
+
+async def _apply_partition_retention(db: AsyncSession, report: RetentionReport, max_months: int, chunk: int):
+    """Cria as partições dos próximos meses e descarta meses inteiros fora da janela"""
+    if report.dry_run:
+        expired = await db.run_sync(lambda session: expired_partitions(session.connection(), max_months))
+        report.dropped_partitions = [name for name, _ in expired]
+        return
+
+    # Numa transação própria e antes do descarte, para que uma falha ao
+    # descartar não impeça a criação
+    await db.run_sync(lambda session: ensure_history_partitions(session.connection()))
+    await db.commit()
+
+    archive = None
+    if report.archive:
+        def archive(rows):
+            _archive_rows(report.archive, rows)
+
+    report.dropped_partitions = await db.run_sync(
+        lambda session: drop_expired_partitions(session.connection(), max_months, archive, chunk)
+    )
+    await db.commit()
+    if report.dropped_partitions:
+        logger.info(f"Retenção: partições removidas: {', '.join(report.dropped_partitions)}")
+
+async def compact_history(
+    db: AsyncSession,
+    dry_run: bool = False,
+    raw_days: int = HISTORY_RAW_DAYS,
+    daily_days: int = HISTORY_DAILY_DAYS,
+    archive_dir: str = HISTORY_ARCHIVE_DIR,
+    chunk: int = HISTORY_DELETE_CHUNK,
+    max_months: int = HISTORY_MAX_MONTHS,
+    characters: int = HISTORY_COMPACT_CHARACTERS,
+) -> RetentionReport:
+    """
+    Aplica a política de retenção ao histórico.
+
+    Com `dry_run`, apenas conta quantos registros seriam removidos em cada etapa.
+    """
+    now = datetime.utcnow()
+    raw_cutoff = now - timedelta(days=raw_days)
+    daily_cutoff = now - timedelta(days=max(daily_days, raw_days))
+    report = RetentionReport(dry_run=dry_run, started_at=now)
+
+    if archive_dir and not dry_run:
+        os.makedirs(archive_dir, exist_ok=True)
+        report.archive = os.path.join(archive_dir, f"character_history-{now:%Y%m%dT%H%M%S}.jsonl.gz")
+
+    if await db.run_sync(lambda session: is_partitioned(session.connection())):
+        await _apply_partition_retention(db, report, max_months, chunk)
+
+    report.stages = [
+        StageReport(unit="week", start=None, end=daily_cutoff),
+        StageReport(unit="day", start=daily_cutoff, end=raw_cutoff),
+    ]
+    for stage in report.stages:
+        await _compact_stage(db, stage, dry_run, report.archive, chunk, characters)
+        logger.info(
+            f"Retenção ({stage.unit}): {stage.removed} de {stage.rows} registros "
+            f"{'seriam removidos' if dry_run else 'removidos'}"
+        )
+    return report
+
+async def run_retention(dry_run: bool = False) -> Dict:
+    async with AsyncSessionLocal() as db:
+        report = await compact_history(db, dry_run=dry_run)
+    return report.as_dict()
+
+async def _main(dry_run: bool):
+    try:
+        report = await run_retention(dry_run)
+        print(json.dumps(report, default=str, indent=2))
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="apenas informa quantos registros seriam removidos")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run))
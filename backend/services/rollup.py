@@ -0,0 +1,101 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+import logging
+
+from models.character_daily_stats import CharacterDailyStats
+from models.character_history import CharacterHistory
+
+logger = logging.getLogger(__name__)
+
+async def _snapshots_of_day(db: AsyncSession, character_ids, day: date, last: bool):
+    """Primeiro ou último registro de histórico de cada personagem no dia"""
+    start = datetime.combine(day, datetime.min.time())
+    order = CharacterHistory.timestamp.desc() if last else CharacterHistory.timestamp.asc()
+    result = await db.execute(
+        select(CharacterHistory)
+        .where(
+            CharacterHistory.character_id.in_(character_ids),
+            CharacterHistory.timestamp >= start,
+            CharacterHistory.timestamp < start + timedelta(days=1),
+        )
+        .distinct(CharacterHistory.character_id)
+        .order_by(CharacterHistory.character_id, order)
+    )
+    return {h.character_id: h for h in result.scalars().all()}
+
+async def update_daily_rollup(db: AsyncSession, character_ids: Iterable[int], day: Optional[date] = None):
+    """
+    Recalcula o resumo do dia para os personagens informados.
+
+    A base de comparação é o resumo mais recente anterior ao dia (fim do dia
+    anterior com dados); sem ele, usa o primeiro registro do próprio dia.
+    Assim cada atualização lê apenas os registros do dia, nunca o histórico todo.
+    """
+    character_ids = list(set(character_ids))
+    if not character_ids:
+        return
+    day = day or datetime.utcnow().date()
+
+    last = await _snapshots_of_day(db, character_ids, day, last=True)
+    if not last:
+        return
+    first = await _snapshots_of_day(db, list(last), day, last=False)
+
+    result = await db.execute(
+        select(CharacterDailyStats)
+        .where(CharacterDailyStats.character_id.in_(list(last)), CharacterDailyStats.day < day)
+        .distinct(CharacterDailyStats.character_id)
+        .order_by(CharacterDailyStats.character_id, CharacterDailyStats.day.desc())
+    )
+    previous = {s.character_id: s for s in result.scalars().all()}
+
+    now = datetime.utcnow()
+    rows = []
+    for character_id, snapshot in last.items():
+        base = previous.get(character_id)
+        if base is not None:
+            base_level, base_experience, base_deaths = base.level, base.experience, base.deaths_total
+        else:
+            start = first[character_id]
+            base_level, base_experience, base_deaths = start.level, start.experience, start.deaths
+        rows.append({
+            "character_id": character_id,
+            "day": day,
+            "level": snapshot.level,
+            "experience": snapshot.experience,
+            "deaths_total": snapshot.deaths or 0,
+            "experience_gained": (snapshot.experience or 0) - (base_experience or 0),
+            "levels_gained": (snapshot.level or 0) - (base_level or 0),
+            # O contador do perfil pode diminuir quando mortes antigas expiram
+            "deaths": max((snapshot.deaths or 0) - (base_deaths or 0), 0),
+            "updated_at": now,
+        })
+
+    statement = insert(CharacterDailyStats).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CharacterDailyStats.character_id, CharacterDailyStats.day],
+        set_={
+            column: statement.excluded[column]
+            for column in ("level", "experience", "deaths_total", "experience_gained", "levels_gained", "deaths", "updated_at")
+        },
+    )
+    await db.execute(statement)
+    await db.commit()
+    logger.info("Resumo diário de %s atualizado para %d personagens", day, len(rows))
+
+async def rebuild_daily_rollup(db: AsyncSession, since: date, until: Optional[date] = None):
+    """Reconstrói os resumos dia a dia, em ordem, para todos os personagens com histórico"""
+    until = until or datetime.utcnow().date()
+    day = since
+    while day <= until:
+        start = datetime.combine(day, datetime.min.time())
+        result = await db.execute(
+            select(CharacterHistory.character_id)
+            .where(CharacterHistory.timestamp >= start, CharacterHistory.timestamp < start + timedelta(days=1))
+            .distinct()
+        )
+        await update_daily_rollup(db, result.scalars().all(), day)
+        day += timedelta(days=1)
@@ -1,28 +1,132 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import logging
 
-from services.scraper import update_all_characters
+from database import AsyncSessionLocal
+from services.highscores_refresh import HIGHSCORES_REFRESH_INTERVAL, refresh_from_highscores
+from services.online_probe import ONLINE_PROBE_INTERVAL, probe_online
+from services.refresh_schedule import SCHEDULE_TICK_SECONDS, enqueue_due_characters
+from services.retention import run_retention
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def schedule_daily_scrape(scheduler: BackgroundScheduler):
+async def enqueue_due_refreshes():
     """
-    Agenda a execução do scraping diariamente às 00h01.
+    Enfileira a atualização dos personagens cuja próxima coleta venceu.
+
+    O scraping é feito pelos workers (worker.py); o processo da API apenas
+    cria os jobs, sem duplicar os que já estão pendentes.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await enqueue_due_characters(db)
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar coletas agendadas: {str(e)}")
+
+def schedule_refreshes(scheduler: AsyncIOScheduler):
+    """
+    Agenda a verificação periódica das coletas vencidas.
+
+    Cada personagem tem o próprio intervalo, conforme a atividade, e as
+    coletas ficam espalhadas ao longo do dia em vez de concentradas à meia-noite.
+    """
+    try:
+        scheduler.add_job(
+            enqueue_due_refreshes,
+            'interval',
+            seconds=SCHEDULE_TICK_SECONDS,
+            id='refresh_tick',
+            name='Coleta adaptativa dos personagens',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"Agendamento adaptativo configurado (verificação a cada {SCHEDULE_TICK_SECONDS}s)")
+    except Exception as e:
+        logger.error(f"Erro ao configurar agendamento: {str(e)}")
+
+async def refresh_highscores():
+    try:
+        async with AsyncSessionLocal() as db:
+            await refresh_from_highscores(db)
+    except Exception as e:
+        logger.error(f"Erro na atualização pelo ranking: {str(e)}")
+
+def schedule_highscores_refresh(scheduler: AsyncIOScheduler):
+    """
+    Agenda a varredura periódica do ranking, que atualiza de uma vez level e
+    experiência dos personagens presentes nele.
+    """
+    if HIGHSCORES_REFRESH_INTERVAL <= 0:
+        logger.info("Atualização pelo ranking desativada")
+        return
+    try:
+        scheduler.add_job(
+            refresh_highscores,
+            'interval',
+            seconds=HIGHSCORES_REFRESH_INTERVAL,
+            id='highscores_refresh',
+            name='Atualização pelo ranking',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"Atualização pelo ranking agendada a cada {HIGHSCORES_REFRESH_INTERVAL}s")
+    except Exception as e:
+        logger.error(f"Erro ao configurar atualização pelo ranking: {str(e)}")
+
+async def run_online_probe():
+    try:
+        async with AsyncSessionLocal() as db:
+            await probe_online(db)
+    except Exception as e:
+        logger.error(f"Erro na sonda online: {str(e)}")
+
+def schedule_online_probe(scheduler: AsyncIOScheduler):
+    """
+    Agenda a leitura periódica da lista de online, que decide quais
+    personagens vencidos realmente precisam ter o perfil coletado.
+    """
+    if ONLINE_PROBE_INTERVAL <= 0:
+        logger.info("Sonda online desativada")
+        return
+    try:
+        scheduler.add_job(
+            run_online_probe,
+            'interval',
+            seconds=ONLINE_PROBE_INTERVAL,
+            id='online_probe',
+            name='Sonda de jogadores online',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"Sonda online agendada a cada {ONLINE_PROBE_INTERVAL}s")
+    except Exception as e:
+        logger.error(f"Erro ao configurar sonda online: {str(e)}")
+
+async def apply_history_retention():
+    try:
+        report = await run_retention()
+        logger.info(f"Retenção do histórico concluída: {report['removed']} registros removidos")
+    except Exception as e:
+        logger.error(f"Erro na retenção do histórico: {str(e)}")
+
+def schedule_retention(scheduler: AsyncIOScheduler):
+    """
+    Agenda a compactação do histórico diariamente às 03h30, fora do horário de pico.
     """
     try:
-        # Agenda a execução para 00h01 todos os dias
         scheduler.add_job(
-            update_all_characters,
+            apply_history_retention,
             'cron',
-            hour=0,
-            minute=1,
-            id='daily_scrape',
-            name='Atualização diária dos personagens',
+            hour=3,
+            minute=30,
+            id='history_retention',
+            name='Retenção do histórico',
             replace_existing=True,
-            timezone='America/Sao_Paulo'  # Definindo o timezone para Brasil
+            max_instances=1,
+            timezone='America/Sao_Paulo'
         )
-        logger.info("Agendamento diário configurado com sucesso para 00:01 (Brasília)")
+        logger.info("Retenção do histórico agendada para 03:30 (Brasília)")
     except Exception as e:
-        logger.error(f"Erro ao configurar agendamento: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Erro ao configurar retenção do histórico: {str(e)}")
@@ -1,197 +1,162 @@
-import aiohttp
-from bs4 import BeautifulSoup
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.character import Character
-from models.character_history import CharacterHistory
-from datetime import datetime
+from services.http_client import get_http_client
+from services.logging_config import payload_logging_enabled
+from services.ingest import SAVED, UNCHANGED, persist_profiles
+from services.profile_parser import parse_profile
+from services.cache import TwoTierCache
+from services.metrics import PARSE_SECONDS, SCRAPES, UPSTREAM_FETCH_SECONDS, timed
+from services.singleflight import SingleFlight
+from services.taleon_pages import ttl_for
+from dataclasses import dataclass
+from typing import Optional
 from urllib.parse import quote
-import re
 import logging
+import os
 import time
-from fastapi_cache import FastAPICache
-from fastapi_cache.decorator import cache
-import asyncio
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# URL base do Taleon
-TALEON_BASE_URL = "https://san.taleon.online"
+# URL base do Taleon (configurável para apontar para o servidor falso dos benchmarks)
+TALEON_BASE_URL = os.getenv("TALEON_BASE_URL", "https://san.taleon.online").rstrip("/")
 
-@cache(expire=300)  # Cache por 5 minutos
-async def get_character_html(character_name: str) -> str:
-    """Obtém o HTML do perfil do personagem com cache"""
+profile_flight = SingleFlight("characterprofile")
+# Sem cópia vencida: quem pede o perfil quer os dados atuais, não os da coleta anterior
+profile_cache = TwoTierCache("characterprofile", stale_ttl=0)
+
+@dataclass
+class ProfilePage:
+    """Resposta da página de perfil; `html` é None quando o servidor respondeu 304"""
+    html: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.html is None
+
+async def fetch_character_page(
+    character_name: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> ProfilePage:
+    """
+    Obtém a página de perfil do personagem, sem cache.
+
+    Quando `etag`/`last_modified` da coleta anterior são informados a
+    requisição é condicional, e um 304 dispensa baixar e processar a página.
+    """
     encoded_name = quote(character_name)
     url = f"{TALEON_BASE_URL}/characterprofile.php?name={encoded_name}"
     
     headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1'
     }
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
     
+    # Cabeçalhos e trechos do HTML só para uma amostra das requisições, em DEBUG
+    log_payload = payload_logging_enabled(logger)
+    started = time.perf_counter()
+    status = "error"
     try:
-        logger.info(f"Fazendo requisição para: {url}")
-        logger.info(f"Headers da requisição: {headers}")
+        logger.debug("Fazendo requisição para: %s", url)
+        if log_payload:
+            logger.debug("Headers da requisição: %s", headers)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, timeout=10) as response:
-                response.raise_for_status()
-                logger.info(f"Status da resposta: {response.status}")
-                logger.info(f"Headers da resposta: {response.headers}")
-                
-                html_content = await response.text()
-                logger.info(f"HTML recebido para {character_name} (tamanho: {len(html_content)})")
-                logger.info(f"Primeiros 1000 caracteres do HTML: {html_content[:1000]}")
-                
-                if len(html_content) < 100:
-                    logger.error(f"HTML muito curto, possivel erro na resposta: {html_content}")
-                    raise Exception("HTML muito curto, possivel erro na resposta")
-                
-                return html_content
+        session = get_http_client()
+        async with session.get(url, headers=headers) as response:
+            status = str(response.status)
+            response.raise_for_status()
+            if log_payload:
+                logger.debug("Headers da resposta (%s): %s", response.status, response.headers)
+            
+            if response.status == 304:
+                return ProfilePage(html=None, etag=etag, last_modified=last_modified)
+            
+            html_content = await response.text()
+            logger.debug("HTML recebido para %s (tamanho: %d)", character_name, len(html_content))
+            if log_payload:
+                logger.debug("Primeiros 1000 caracteres do HTML: %s", html_content[:1000])
+            
+            if len(html_content) < 100:
+                logger.error("HTML muito curto, possivel erro na resposta: %r", html_content)
+                raise Exception("HTML muito curto, possivel erro na resposta")
+            
+            return ProfilePage(
+                html=html_content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
     except Exception as e:
-        logger.error(f"Erro ao obter HTML para {character_name}: {str(e)}")
+        logger.error("Erro ao obter HTML para %s: %s", character_name, e)
         raise
+    finally:
+        UPSTREAM_FETCH_SECONDS.labels(page="characterprofile", status=status).observe(time.perf_counter() - started)
 
-async def scrape_character_data(character_name: str, db: Session) -> bool:
+async def get_character_html(character_name: str) -> str:
+    """Obtém o HTML do perfil do personagem com cache (memória + Redis)"""
+    async def fetch() -> str:
+        return (await fetch_character_page(character_name)).html
+
+    # Chamadas simultâneas (inclusive de outros processos) compartilham uma única busca
+    html_content, _ = await profile_cache.get_or_fetch(
+        character_name, ttl_for("characterprofile.php"), lambda: profile_flight.do(character_name, fetch)
+    )
+    return html_content
+
+async def scrape_character_data(character_name: str, db: AsyncSession) -> bool:
     try:
-        logger.info(f"Iniciando scraping do personagem: {character_name}")
+        logger.debug("Iniciando scraping do personagem: %s", character_name)
         
         # Obtém o HTML com cache
         html_content = await get_character_html(character_name)
-        logger.info(f"HTML obtido com sucesso para {character_name}")
-        logger.info(f"Primeiros 1000 caracteres do HTML: {html_content[:1000]}")
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        logger.info(f"HTML parseado para {character_name}")
-        
-        # Encontra a tabela com as informações do personagem
-        character_table = soup.find('table', {'class': 'table'})
-        if not character_table:
-            # Tenta encontrar a tabela sem especificar a classe
-            character_table = soup.find('table')
-            if not character_table:
-                logger.error(f"Nenhuma tabela encontrada para: {character_name}")
-                logger.error(f"HTML recebido: {html_content[:500]}...")  # Log dos primeiros 500 caracteres
-                return False
-        
-        # Log da estrutura da tabela
-        logger.info(f"Estrutura da tabela encontrada: {character_table.prettify()[:500]}")
-        
-        # Extrai as informações
-        rows = character_table.find_all('tr')
-        character_data = {}
-        
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) >= 2:
-                key = cols[0].text.strip().lower().replace(':', '')
-                # Se for a linha do nome, pega o nome formatado e o outfit
-                if key == 'name':
-                    outfit_img = cols[1].find('img', {'class': 'outfitImgTable'})
-                    if outfit_img:
-                        character_data['outfit'] = outfit_img.get('src', '')
-                    # Pega o nome formatado (sem o outfit)
-                    value = cols[1].get_text(strip=True)
-                else:
-                    value = cols[1].text.strip()
-                character_data[key] = value
-                logger.info(f"Encontrado: {key} = {value}")
+    except Exception as e:
+        logger.error("Error scraping character %s: %s", character_name, e)
+        SCRAPES.labels(result="failed").inc()
+        return False
+
+    return await process_character_html(character_name, html_content, db)
+
+async def process_character_html(character_name: str, html_content: str, db: AsyncSession) -> bool:
+    """Extrai os dados do HTML do perfil e grava no banco de dados"""
+    try:
+        with timed(PARSE_SECONDS, page="characterprofile"):
+            profile = parse_profile(html_content, character_name)
+        if not profile:
+            logger.error("Nenhuma tabela encontrada para: %s", character_name)
+            if payload_logging_enabled(logger):
+                logger.debug("HTML recebido: %s...", html_content[:500])
+            SCRAPES.labels(result="failed").inc()
+            return False
         
-        # Log dos dados encontrados
-        logger.info(f"Dados encontrados para {character_name}: {character_data}")
+        logger.debug("Dados encontrados para %s: %s", character_name, profile)
         
-        # Atualiza o personagem no banco de dados
-        character = db.query(Character).filter(Character.name == character_name).first()
-        if character:
-            try:
-                # Atualiza os dados básicos do personagem
-                level_text = character_data.get('level', '0')
-                # Remove caracteres não numéricos exceto ponto
-                level_text = re.sub(r'[^\d.]', '', level_text)
-                # Converte para float e depois para inteiro, removendo o ponto
-                level = int(level_text.replace('.', ''))
-                character.level = level
-                character.vocation = character_data.get('vocation', '')
-                character.world = character_data.get('residence', '')  # Usando residence como world
-                character.outfit = character_data.get('outfit', '')  # Salva o outfit
-                character.name = character_data.get('name', character_name)  # Atualiza o nome formatado
-                
-                # Extrai experiência e mortes
-                experience = 0
-                daily_experience = 0
-                deaths = 0
-                
-                # Tenta extrair experiência
-                exp_text = character_data.get('experience', '0')
-                if exp_text:
-                    # Remove caracteres não numéricos
-                    exp_text = re.sub(r'[^\d]', '', exp_text)
-                    experience = float(exp_text) if exp_text else 0
-                    logger.info(f"Experiência extraída de '{exp_text}' para {experience}")
-                
-                # Tenta extrair experiência diária
-                daily_exp_text = character_data.get('daily_experience', '0')
-                if daily_exp_text:
-                    # Remove caracteres não numéricos
-                    daily_exp_text = re.sub(r'[^\d]', '', daily_exp_text)
-                    daily_experience = float(daily_exp_text) if daily_exp_text else 0
-                    logger.info(f"Experiência diária extraída de '{daily_exp_text}' para {daily_experience}")
-                
-                # Tenta extrair mortes
-                deaths_text = character_data.get('deaths', '0')
-                if deaths_text:
-                    # Remove caracteres não numéricos
-                    deaths_text = re.sub(r'[^\d]', '', deaths_text)
-                    deaths = int(deaths_text) if deaths_text else 0
-                    logger.info(f"Mortes extraídas de '{deaths_text}' para {deaths}")
-                
-                # Cria um novo registro de histórico
-                try:
-                    history = CharacterHistory(
-                        character_id=character.id,
-                        level=level,  # Usando o mesmo nível já processado
-                        experience=experience,
-                        daily_experience=daily_experience,
-                        deaths=deaths,
-                        timestamp=datetime.utcnow()
-                    )
-                    db.add(history)
-                    logger.info(f"Registro de histórico criado para {character_name}")
-                except Exception as e:
-                    logger.error(f"Erro ao criar registro de histórico: {str(e)}")
-                    raise
-                
-                db.commit()
-                logger.info(f"Character {character_name} updated successfully")
-                return True
-            except Exception as e:
-                logger.error(f"Erro ao atualizar personagem {character_name}: {str(e)}")
-                db.rollback()
-                return False
-        else:
-            logger.error(f"Character {character_name} not found in database")
-            return False
-            
+        # Mesmo caminho de gravação usado pela atualização em lote
+        statuses = await persist_profiles(db, {character_name: profile})
+        status = statuses[character_name]
+        SCRAPES.labels(result={SAVED: "succeeded", UNCHANGED: "skipped"}.get(status, "failed")).inc()
+        return status in (SAVED, UNCHANGED)
     except Exception as e:
-        logger.error(f"Error scraping character {character_name}: {str(e)}")
+        logger.error("Error scraping character %s: %s", character_name, e)
+        SCRAPES.labels(result="failed").inc()
         return False
 
 async def update_all_characters():
     """
     Atualiza todos os personagens cadastrados.
     """
-    from database import SessionLocal
-    db = SessionLocal()
-    try:
-        characters = db.query(Character).all()
-        for character in characters:
-            logger.info(f"Atualizando personagem: {character.name}")
-            await scrape_character_data(character.name, db)
-            # Adiciona um delay entre as requisições
-            await asyncio.sleep(2)
-    finally:
-        db.close()
+    from database import AsyncSessionLocal
+    from services.refresh import refresh_characters
+
+    async with AsyncSessionLocal() as db:
+        names = (await db.execute(select(Character.name))).scalars().all()
+        logger.info(f"Iniciando atualização de {len(names)} personagens")
+        # Concorrência e limite de requisições são controlados pelo motor de atualização
+        return await refresh_characters(names, db)
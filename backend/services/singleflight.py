@@ -0,0 +1,169 @@
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+import asyncio
+import json
+import logging
+import os
+
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Configurações da deduplicação de requisições em andamento
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "30"))  # segundos
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", "5"))  # segundos
+
+# Remove o lock apenas se ele ainda pertence a quem o criou
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class CoalescedFetchError(Exception):
+    """Falha da busca feita por outro processo, repassada a quem aguardava por ela"""
+
+    def __init__(self, status: Optional[int], detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+class _LeaderCancelled(Exception):
+    """Quem fazia a busca foi cancelado; quem aguardava deve tentar de novo"""
+
+class SingleFlight:
+    """
+    Garante uma única busca em andamento por chave.
+
+    Chamadas concorrentes no mesmo processo aguardam o mesmo Future; entre
+    processos, quem obtém o lock no Redis faz a busca e publica o resultado
+    num canal pub/sub, que os demais aguardam em vez de irem ao Taleon.
+    Sem Redis disponível, a deduplicação fica restrita ao processo.
+
+    Se quem faz a busca for cancelado (cliente desconectou, shutdown), quem
+    aguardava não é cancelado junto: um deles assume a busca.
+    """
+
+    def __init__(self, namespace: str, lock_ttl: float = SINGLEFLIGHT_LOCK_TTL, result_ttl: int = SINGLEFLIGHT_RESULT_TTL):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        while key in self._inflight:
+            try:
+                return await asyncio.shield(self._inflight[key])
+            except _LeaderCancelled:
+                # O primeiro a acordar vira o novo líder; os demais aguardam por ele
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._do_shared(key, fetch)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não lida quando ninguém estava esperando
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _keys(self, key: str):
+        base = f"taleon:singleflight:{self.namespace}:{key}"
+        return f"{base}:lock", f"{base}:result", f"{base}:done"
+
+    async def _do_shared(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        redis = get_redis()
+        lock_key, result_key, channel = self._keys(key)
+        token = uuid4().hex
+        try:
+            is_leader = await redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning("Redis indisponível para deduplicação de %s: %s", key, e)
+            return await fetch()
+
+        if is_leader:
+            return await self._lead(fetch, lock_key, result_key, channel, token)
+        return await self._follow(fetch, result_key, channel)
+
+    async def _lead(self, fetch, lock_key, result_key, channel, token) -> str:
+        redis = get_redis()
+        try:
+            value = await fetch()
+            message = json.dumps({"ok": True, "value": value})
+            # O resultado também fica salvo por alguns segundos para quem assinar o canal atrasado
+            await redis.set(result_key, message, ex=self.result_ttl)
+            await redis.publish(channel, message)
+            return value
+        except asyncio.CancelledError:
+            # Os outros processos não devem esperar o fim do lock: buscam por conta própria
+            try:
+                message = json.dumps({"ok": False, "retry": True})
+                await redis.set(result_key, message, ex=self.result_ttl)
+                await redis.publish(channel, message)
+            except Exception:
+                pass
+            raise
+        except Exception as e:
+            status = getattr(e, "status_code", None) or getattr(e, "status", None)
+            detail = getattr(e, "detail", None) or str(e)
+            message = json.dumps({"ok": False, "status": status, "detail": str(detail)})
+            try:
+                await redis.set(result_key, message, ex=self.result_ttl)
+                await redis.publish(channel, message)
+            except Exception:
+                pass
+            raise
+        finally:
+            try:
+                await redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception:
+                pass
+
+    async def _follow(self, fetch, result_key, channel) -> str:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        message = None
+        try:
+            await pubsub.subscribe(channel)
+            # O resultado pode ter sido publicado antes da assinatura
+            message = await redis.get(result_key)
+            if message is None:
+                message = await self._wait_message(pubsub)
+        except Exception as e:
+            logger.warning("Erro aguardando busca em andamento: %s", e)
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+        if message is None:
+            # Quem tinha o lock não respondeu a tempo: busca diretamente
+            return await fetch()
+
+        payload = json.loads(message)
+        if payload["ok"]:
+            return payload["value"]
+        if payload.get("retry"):
+            return await fetch()
+        raise CoalescedFetchError(payload.get("status"), payload.get("detail", ""))
+
+    async def _wait_message(self, pubsub) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+        while loop.time() < deadline:
+            item = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(1.0, deadline - loop.time()))
+            if item and item.get("type") == "message":
+                return item["data"]
+        return None
@@ -0,0 +1,122 @@
+from dataclasses import asdict
+from typing import Callable, List, Tuple
+from urllib.parse import urlencode
+import json
+import logging
+import os
+import time
+
+from services.cache import TwoTierCache
+from services.http_client import get_http_client
+from services.metrics import PARSE_SECONDS, UPSTREAM_FETCH_SECONDS, page_label, timed
+from services.page_parsers import (
+    GuildMemberRow, HighscoreRow, OnlinePlayerRow, parse_guild_members, parse_highscores, parse_online,
+)
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+TALEON_BASE_URL = os.getenv("TALEON_BASE_URL", "https://san.taleon.online").rstrip("/")
+
+# Tempo de cache por página, em segundos: a lista de online muda a todo
+# momento, enquanto highscores e guildas mudam pouco ao longo do dia
+PATH_TTLS = {
+    "characterprofile.php": int(os.getenv("CACHE_TTL_CHARACTERPROFILE", "300")),
+    "guildprofile.php": int(os.getenv("CACHE_TTL_GUILDPROFILE", "900")),
+    "highscores.php": int(os.getenv("CACHE_TTL_HIGHSCORES", "900")),
+    "online.php": int(os.getenv("CACHE_TTL_ONLINE", "60")),
+}
+DEFAULT_TTL = 300
+
+class TaleonPageError(Exception):
+    """O Taleon respondeu com status diferente de 200"""
+
+    def __init__(self, status: int):
+        super().__init__(f"Taleon respondeu com status {status}")
+        self.status = status
+
+def _parsed_cache(namespace: str, item_type) -> TwoTierCache:
+    """Cache de páginas já convertidas em listas de registros"""
+    return TwoTierCache(
+        namespace,
+        dumps=lambda items: json.dumps([asdict(item) for item in items], ensure_ascii=False),
+        loads=lambda raw: [item_type(**item) for item in json.loads(raw)],
+    )
+
+page_flight = SingleFlight("proxy")
+page_cache = TwoTierCache("proxy")
+highscores_cache = _parsed_cache("highscores", HighscoreRow)
+online_cache = _parsed_cache("online", OnlinePlayerRow)
+guild_cache = _parsed_cache("guildprofile", GuildMemberRow)
+
+def ttl_for(path: str) -> int:
+    """Tempo de cache da página solicitada"""
+    for page, ttl in PATH_TTLS.items():
+        if page in path:
+            return ttl
+    return DEFAULT_TTL
+
+def page_key(path: str, query_params: dict) -> str:
+    return f"{path}?{urlencode(sorted(query_params.items()))}"
+
+async def fetch_taleon_page(path: str, query_params: dict) -> str:
+    """Busca a página no Taleon pelo cliente HTTP compartilhado"""
+    full_url = f"{TALEON_BASE_URL}/{path}"
+    session = get_http_client()
+    started = time.perf_counter()
+    status = "error"
+    try:
+        async with session.get(full_url, params=query_params) as response:
+            status = str(response.status)
+            logger.debug("Proxy response status: %s", response.status)
+
+            # Verifica o status da resposta
+            if response.status != 200:
+                raise TaleonPageError(response.status)
+
+            # Obtém o conteúdo HTML
+            html_content = await response.text()
+            logger.debug("Proxy response content length: %d", len(html_content))
+            return html_content
+    finally:
+        UPSTREAM_FETCH_SECONDS.labels(page=page_label(path), status=status).observe(time.perf_counter() - started)
+
+def _fetch_once(path: str, query_params: dict):
+    # Requisições simultâneas para a mesma página aguardam uma única busca
+    key = page_key(path, query_params)
+    return page_flight.do(key, lambda: fetch_taleon_page(path, query_params))
+
+async def get_page(path: str, query_params: dict) -> Tuple[str, str]:
+    """HTML da página e o estado do cache (HIT, STALE ou MISS)"""
+    return await page_cache.get_or_fetch(page_key(path, query_params), ttl_for(path), lambda: _fetch_once(path, query_params))
+
+async def get_parsed_page(parsed_cache: TwoTierCache, path: str, query_params: dict, parser: Callable[[str], list]) -> Tuple[list, str]:
+    """
+    Registros extraídos da página e o estado do cache.
+
+    O resultado da extração fica em cache, então a página é baixada e
+    processada uma única vez por período para todos os clientes.
+    """
+    async def fetch() -> list:
+        html_content = await _fetch_once(path, query_params)
+        with timed(PARSE_SECONDS, page=page_label(path)):
+            return parser(html_content)
+
+    return await parsed_cache.get_or_fetch(page_key(path, query_params), ttl_for(path), fetch)
+
+async def get_highscores(type: str = "experience", page: int = 1) -> Tuple[List[HighscoreRow], str]:
+    # A primeira página usa a mesma chave de cache de antes da paginação
+    params = {"type": type} if page == 1 else {"type": type, "page": page}
+    return await get_parsed_page(highscores_cache, "highscores.php", params, parse_highscores)
+
+async def get_online_players() -> Tuple[List[OnlinePlayerRow], str]:
+    return await get_parsed_page(online_cache, "online.php", {}, parse_online)
+
+async def get_guild_members(name: str) -> Tuple[List[GuildMemberRow], str]:
+    return await get_parsed_page(guild_cache, "guildprofile.php", {"name": name}, parse_guild_members)
+
+def cache_stats() -> dict:
+    return {
+        cache.namespace: cache.stats()
+        for cache in (page_cache, highscores_cache, online_cache, guild_cache)
+    }
@@ -0,0 +1,144 @@
+"""
+Notificações em tempo real das coletas gravadas.
+
+Quem grava um lote (API ou worker) publica as mudanças num canal do Redis;
+cada processo da API mantém uma única assinatura desse canal e repassa as
+mensagens aos seus clientes conectados, conforme os personagens ou mundos que
+cada um acompanha.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional, Set
+import asyncio
+import json
+import logging
+import os
+
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+UPDATES_CHANNEL = "taleon:updates"
+UPDATES_QUEUE_SIZE = int(os.getenv("UPDATES_QUEUE_SIZE", "256"))  # mensagens pendentes por cliente
+UPDATES_RECONNECT_DELAY = float(os.getenv("UPDATES_RECONNECT_DELAY", "5"))  # segundos
+
+@dataclass
+class CharacterUpdate:
+    """Mudança de um personagem numa coleta, apenas com os campos que mudam"""
+    character_id: int
+    name: str
+    world: str
+    level: int
+    experience: float
+    deaths: int
+    timestamp: str
+
+async def publish_updates(updates: List[CharacterUpdate]):
+    """Publica um lote de mudanças numa única mensagem; falhas não afetam a gravação"""
+    if not updates:
+        return
+    try:
+        await get_redis().publish(UPDATES_CHANNEL, json.dumps([asdict(update) for update in updates]))
+    except Exception as e:
+        logger.error("Erro ao publicar %d atualizações: %s", len(updates), e)
+
+@dataclass(eq=False)
+class Subscription:
+    """Cliente conectado e o filtro do que ele acompanha; sem filtro recebe tudo"""
+    character_ids: Set[int] = field(default_factory=set)
+    worlds: Set[str] = field(default_factory=set)
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(UPDATES_QUEUE_SIZE))
+    dropped: int = 0
+
+    def matches(self, update: dict) -> bool:
+        if not self.character_ids and not self.worlds:
+            return True
+        return update["character_id"] in self.character_ids or update["world"] in self.worlds
+
+    def push(self, updates: List[dict]):
+        # Cliente lento não pode segurar os demais: descarta a mensagem mais antiga
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(updates)
+
+class UpdateBroadcaster:
+    """Assinatura única do canal por processo, repassada aos clientes locais"""
+
+    def __init__(self, channel: str = UPDATES_CHANNEL):
+        self.channel = channel
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, character_ids=None, worlds=None) -> Subscription:
+        subscription = Subscription(set(character_ids or []), set(worlds or []))
+        self._subscriptions.add(subscription)
+        # A assinatura do Redis só é aberta quando há algum cliente
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        # Sem clientes, a assinatura do Redis é encerrada; o próximo subscribe a reabre
+        if not self._subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscriptions)
+
+    def dispatch(self, updates: List[dict]):
+        for subscription in list(self._subscriptions):
+            matching = [update for update in updates if subscription.matches(update)]
+            if matching:
+                subscription.push(matching)
+
+    async def _listen(self):
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info("Assinando o canal %s", self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        self.dispatch(json.loads(message["data"]))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.error("Mensagem inválida no canal %s: %s", self.channel, e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Erro na assinatura do canal %s: %s", self.channel, e)
+                await asyncio.sleep(UPDATES_RECONNECT_DELAY)
+            finally:
+                try:
+                    await pubsub.unsubscribe(self.channel)
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._subscriptions.clear()
+
+broadcaster = UpdateBroadcaster()
+
+def character_update(character_id: int, profile, timestamp: datetime) -> CharacterUpdate:
+    return CharacterUpdate(
+        character_id=character_id,
+        name=profile.name,
+        world=profile.residence,
+        level=profile.level,
+        experience=profile.experience,
+        deaths=profile.deaths,
+        timestamp=timestamp.isoformat(),
+    )
@@ -0,0 +1,143 @@
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from datetime import datetime, timedelta
+import asyncio
+import os
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from database import Base
+import models.character  # noqa: F401 (registra as tabelas no metadata)
+import models.character_daily_stats  # noqa: F401
+import models.character_event  # noqa: F401
+import models.character_history  # noqa: F401
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "samples")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Banco PostgreSQL descartável para os testes que dependem dele (o esquema public é apagado)
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+# O SQLite só gera ids automaticamente para chaves primárias simples de tipo
+# INTEGER; no PostgreSQL essas tabelas são criadas pelas migrações
+SQLITE_TABLES = {
+    "character_history": """
+        CREATE TABLE character_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            character_id INTEGER REFERENCES characters (id),
+            level INTEGER,
+            experience FLOAT,
+            daily_experience FLOAT,
+            deaths INTEGER,
+            timestamp DATETIME
+        )
+    """,
+    "character_events": """
+        CREATE TABLE character_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+            world VARCHAR,
+            type VARCHAR NOT NULL,
+            old_value BIGINT,
+            new_value BIGINT,
+            timestamp DATETIME NOT NULL
+        )
+    """,
+}
+
+def read_page(directory: str, name: str) -> str:
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        return f.read()
+
+@pytest.fixture
+def sample_page():
+    """Páginas de perfil salvas em benchmarks/samples"""
+    return lambda name: read_page(SAMPLES_DIR, name)
+
+@pytest.fixture
+def fixture_page():
+    """Páginas salvas em tests/fixtures"""
+    return lambda name: read_page(FIXTURES_DIR, name)
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Substitui os clientes Redis compartilhados por um Redis em memória"""
+    import services.redis_client as redis_client
+
+    server = fakeredis.FakeServer()
+    client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(redis_client, "_redis", client)
+    monkeypatch.setattr(redis_client, "_binary_redis", fakeredis.aioredis.FakeRedis(server=server))
+    return client
+
+def _date_trunc(unit: str, value: str) -> str:
+    # Equivalente do date_trunc do PostgreSQL, para os valores gravados pelo SQLite
+    moment = datetime.fromisoformat(value)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        day -= timedelta(days=day.weekday())
+    return day.isoformat(sep=" ")
+
+async def create_sqlite_engine():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    event.listen(
+        engine.sync_engine, "connect",
+        lambda dbapi_connection, _: dbapi_connection.create_function("date_trunc", 2, _date_trunc),
+    )
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in SQLITE_TABLES]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+        for ddl in SQLITE_TABLES.values():
+            await conn.execute(text(ddl))
+    return engine
+
+@pytest.fixture
+def run_with_db():
+    """
+    Executa `scenario(sessionmaker)` num loop novo, com um banco SQLite em
+    memória criado a partir dos modelos.
+    """
+    def run(scenario):
+        async def main():
+            engine = await create_sqlite_engine()
+            try:
+                return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+@pytest.fixture
+def postgres_engine():
+    """Engine síncrona de um PostgreSQL vazio; pula o teste sem TEST_DATABASE_URL"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL não definido")
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def run_with_postgres(postgres_engine):
+    """
+    Como run_with_db, mas no PostgreSQL de TEST_DATABASE_URL, com o esquema
+    criado pelas migrações. Para consultas que o SQLite não reproduz (DISTINCT ON...).
+    """
+    from migrations import run_migrations
+
+    run_migrations(postgres_engine)
+    url = make_url(TEST_DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+    def run(scenario):
+        async def main():
+            engine = create_async_engine(url)
+            try:
+                return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
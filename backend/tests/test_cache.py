@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+
+from services import cache
+from services.cache import HIT, MISS, STALE, CacheEntry, TwoTierCache, _HEADER, _decode, _encode
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+class Fetch:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.values.pop(0)
+
+async def settle(tiered: TwoTierCache):
+    """Aguarda as revalidações em segundo plano"""
+    while tiered._tasks:
+        await asyncio.gather(*list(tiered._tasks))
+
+def test_miss_hit_stale_and_expiry(fake_redis, clock):
+    async def scenario():
+        tiered = TwoTierCache("test", stale_ttl=100)
+        fetch = Fetch("v1", "v2", "v3")
+        states = [await tiered.get_or_fetch("key", 10, fetch)]
+        states.append(await tiered.get_or_fetch("key", 10, fetch))
+
+        # Expirada, mas dentro do stale_ttl: serve a cópia antiga e revalida
+        clock.now += 11
+        states.append(await tiered.get_or_fetch("key", 10, fetch))
+        await settle(tiered)
+        states.append(await tiered.get_or_fetch("key", 10, fetch))
+
+        # Além do stale_ttl a cópia não pode mais ser servida
+        clock.now += 200
+        states.append(await tiered.get_or_fetch("key", 10, fetch))
+        return states, fetch.calls, tiered.stats()
+
+    states, calls, stats = asyncio.run(scenario())
+    assert states == [("v1", MISS), ("v1", HIT), ("v1", STALE), ("v2", HIT), ("v3", MISS)]
+    assert calls == 3
+    assert stats["stale_hits"] == 1
+    assert stats["refreshes"] == 1
+    assert stats["misses"] == 2
+
+def test_redis_tier_is_shared_between_processes(fake_redis, clock):
+    async def scenario():
+        first, second = TwoTierCache("test"), TwoTierCache("test")
+        first_fetch, second_fetch = Fetch("from first"), Fetch()
+        return (
+            await first.get_or_fetch("key", 10, first_fetch),
+            await second.get_or_fetch("key", 10, second_fetch),
+            second_fetch.calls,
+            second.stats()["redis_hits"],
+        )
+
+    first_state, second_state, calls, redis_hits = asyncio.run(scenario())
+    assert first_state == ("from first", MISS)
+    assert second_state == ("from first", HIT)
+    assert calls == 0
+    assert redis_hits == 1
+
+def test_stale_memory_copy_prefers_fresher_redis_copy(fake_redis, clock):
+    async def scenario():
+        first, second = TwoTierCache("test"), TwoTierCache("test")
+        first_fetch, second_fetch = Fetch("v1", "unused"), Fetch("v2")
+        await first.get_or_fetch("key", 10, first_fetch)
+        await second.get_or_fetch("key", 10, second_fetch)
+
+        # Os dois expiram; o segundo processo revalida e grava no Redis
+        clock.now += 11
+        await second.get_or_fetch("key", 10, second_fetch)
+        await settle(second)
+
+        result = await first.get_or_fetch("key", 10, first_fetch)
+        await settle(first)
+        return result, first_fetch.calls, first.stats()["stale_hits"]
+
+    result, calls, stale_hits = asyncio.run(scenario())
+    assert result == ("v2", HIT)
+    # Só a primeira busca: a cópia renovada pelo outro processo dispensou a revalidação
+    assert calls == 1
+    assert stale_hits == 0
+
+def test_memory_only_without_redis(monkeypatch, clock):
+    def unavailable():
+        raise ConnectionError("Redis fora do ar")
+    monkeypatch.setattr(cache, "get_binary_redis", unavailable)
+
+    async def scenario():
+        tiered = TwoTierCache("test")
+        fetch = Fetch("v1")
+        return [await tiered.get_or_fetch("key", 10, fetch) for _ in range(2)], tiered.stats()["redis_errors"]
+
+    states, errors = asyncio.run(scenario())
+    assert states == [("v1", MISS), ("v1", HIT)]
+    assert errors > 0
+
+@pytest.mark.parametrize("value, compressed", [("<html>curta</html>", False), ("<td>linha</td>" * 500, True)])
+def test_encode_decode_round_trip(value, compressed):
+    raw = _encode(CacheEntry(value, 1234.5, 0), str)
+    fresh_until, flag = _HEADER.unpack_from(raw)
+    assert (fresh_until, flag) == (1234.5, compressed)
+    if compressed:
+        assert len(raw) < len(value)
+
+    entry = _decode(raw, 60, str)
+    assert entry.value == value
+    assert (entry.fresh_until, entry.stale_until) == (1234.5, 1294.5)
+
+def test_structured_values_round_trip(fake_redis, clock):
+    async def scenario():
+        dumps, loads = json.dumps, json.loads
+        writer = TwoTierCache("parsed", dumps=dumps, loads=loads)
+        reader = TwoTierCache("parsed", dumps=dumps, loads=loads)
+        await writer.get_or_fetch("key", 10, Fetch([{"name": "Alpha", "level": 10}] * 200))
+        return await reader.get_or_fetch("key", 10, Fetch())
+
+    value, state = asyncio.run(scenario())
+    assert state == HIT
+    assert value == [{"name": "Alpha", "level": 10}] * 200
@@ -0,0 +1,141 @@
+from sqlalchemy import text
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+
+import httpx
+import pytest
+
+from database import get_async_db
+from models.character import Character
+from routers import characters
+from routers.characters import encode_cursor
+
+def api_client(sessionmaker) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(characters.router, prefix="/api/characters")
+
+    async def session():
+        async with sessionmaker() as db:
+            yield db
+    app.dependency_overrides[get_async_db] = session
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+async def walk_pages(client: httpx.AsyncClient, **params) -> list:
+    names = []
+    cursor = None
+    while True:
+        response = await client.get("/api/characters/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        names.extend(item["name"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return names
+
+@pytest.mark.parametrize("sort", ["name", "level", "updated_at"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pagination_returns_every_character(run_with_db, sort, order):
+    base = datetime(2026, 1, 1)
+
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            # Valores repetidos forçam o desempate pelo id entre as páginas
+            db.add_all(
+                Character(name=f"Char {i:02d}", level=i % 3, updated_at=base + timedelta(hours=i % 4))
+                for i in range(11)
+            )
+            await db.commit()
+        async with api_client(sessionmaker) as client:
+            return await walk_pages(client, sort=sort, order=order, limit=3)
+
+    names = run_with_db(scenario)
+    assert sorted(names) == [f"Char {i:02d}" for i in range(11)]
+    assert len(names) == len(set(names))
+
+def test_level_and_updated_at_are_never_null(run_with_db):
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            character = Character(name="Fresh")
+            db.add(character)
+            await db.commit()
+            return character.level, character.updated_at
+
+    level, updated_at = run_with_db(scenario)
+    assert level == 0
+    assert updated_at is not None
+
+def test_null_cursor_value_is_rejected(run_with_db):
+    async def scenario(sessionmaker):
+        async with api_client(sessionmaker) as client:
+            response = await client.get("/api/characters/", params={"sort": "level", "cursor": encode_cursor(None, 5)})
+            return response.status_code
+
+    assert run_with_db(scenario) == 400
+
+def test_history_with_legacy_null_values(run_with_db):
+    from models.character_history import CharacterHistory
+
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            character = Character(name="Legacy")
+            db.add(character)
+            await db.flush()
+            db.add_all([
+                CharacterHistory(character_id=character.id, level=None, experience=None, timestamp=datetime(2025, 1, 1)),
+                CharacterHistory(character_id=character.id, level=50, experience=1000.0, timestamp=datetime(2025, 1, 2)),
+            ])
+            await db.commit()
+            character_id = character.id
+        async with api_client(sessionmaker) as client:
+            return await client.get(f"/api/characters/{character_id}/history")
+
+    response = run_with_db(scenario)
+    assert response.status_code == 200, response.text
+    points = response.json()["points"]
+    assert [(point["level"], point["experience"]) for point in points] == [(None, None), (50, 1000.0)]
+
+def test_listing_and_detail_with_legacy_null_snapshot(run_with_db):
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            character = Character(name="Legacy")
+            db.add(character)
+            await db.flush()
+            # Registro antigo, anterior às colunas de mortes e experiência diária (SQL
+            # direto: o modelo preencheria os valores padrão)
+            await db.execute(
+                text("INSERT INTO character_history (character_id, timestamp) VALUES (:id, :timestamp)"),
+                {"id": character.id, "timestamp": datetime(2025, 1, 1)},
+            )
+            await db.commit()
+            character_id = character.id
+        async with api_client(sessionmaker) as client:
+            return await client.get("/api/characters/"), await client.get(f"/api/characters/{character_id}")
+
+    listing, detail = run_with_db(scenario)
+    assert listing.status_code == 200, listing.text
+    latest = listing.json()["items"][0]["latest"]
+    assert (latest["level"], latest["experience"], latest["deaths"]) == (None, None, None)
+    assert detail.status_code == 200, detail.text
+    assert detail.json()["history"][0]["level"] is None
+
+def test_listing_returns_latest_snapshot_per_character(run_with_postgres):
+    # DISTINCT ON só existe no PostgreSQL: o SQLite o ignora e devolveria todas as linhas
+    from models.character_history import CharacterHistory
+
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            characters = [Character(name="Alpha"), Character(name="Beta")]
+            db.add_all(characters)
+            await db.flush()
+            for character in characters:
+                db.add_all(
+                    CharacterHistory(character_id=character.id, level=level, experience=level * 1000.0, timestamp=datetime.utcnow() - timedelta(days=3 - level))
+                    for level in (1, 3, 2)
+                )
+            await db.commit()
+        async with api_client(sessionmaker) as client:
+            return await client.get("/api/characters/")
+
+    response = run_with_postgres(scenario)
+    assert response.status_code == 200, response.text
+    assert {item["name"]: item["latest"]["level"] for item in response.json()["items"]} == {"Alpha": 3, "Beta": 3}
@@ -0,0 +1,55 @@
+from sqlalchemy import select
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.character import Character
+from services import highscores_refresh
+from services.highscores_refresh import refresh_from_highscores
+from services.jobs import JOB_KEY, QUEUE_KEY
+from services.page_parsers import HighscoreRow
+
+RANKING = [
+    HighscoreRow(position=1, name="Ranked", vocation="Elite Knight", level=500, value=2_000_000),
+    HighscoreRow(position=2, name="Stranger", vocation="Druid", level=400, value=1_000_000),
+]
+
+@pytest.fixture(autouse=True)
+def fake_taleon(monkeypatch, fake_redis):
+    async def get_highscores(category, page):
+        return (RANKING if page == 1 else []), None
+
+    # O resumo diário usa upsert do PostgreSQL
+    async def noop(*args, **kwargs):
+        pass
+    monkeypatch.setattr(highscores_refresh, "get_highscores", get_highscores)
+    monkeypatch.setattr(highscores_refresh, "update_daily_rollup", noop)
+
+async def queued_names(redis):
+    ids = await redis.lrange(QUEUE_KEY, 0, -1)
+    return sorted([await redis.hget(JOB_KEY.format(job_id), "character") for job_id in ids])
+
+def test_unranked_characters_are_enqueued_when_due(run_with_db, fake_redis):
+    now = datetime.utcnow()
+
+    async def scenario(sessionmaker):
+        async with sessionmaker() as db:
+            db.add_all([
+                Character(name="Ranked", level=499, experience=1_900_000, last_checked=now, next_refresh_at=now + timedelta(hours=1)),
+                # Fora do ranking: só os que já têm coleta vencida (ou nunca agendada) entram na fila
+                Character(name="Due", level=20, last_checked=now, next_refresh_at=now - timedelta(minutes=1)),
+                Character(name="Unscheduled", level=20),
+                Character(name="Later", level=20, last_checked=now, next_refresh_at=now + timedelta(hours=1)),
+            ])
+            await db.commit()
+        async with sessionmaker() as db:
+            report = await refresh_from_highscores(db, max_pages=3)
+            ranked = (await db.execute(select(Character).where(Character.name == "Ranked"))).scalar_one()
+        return report, ranked, await queued_names(fake_redis)
+
+    report, ranked, queued = run_with_db(scenario)
+    assert report.matched == 1
+    assert report.updated == 1
+    assert (ranked.level, ranked.experience) == (500, 2_000_000)
+    assert queued == ["Due", "Unscheduled"]
+    assert report.profile_refreshes == 2
@@ -0,0 +1,69 @@
+from sqlalchemy import func, select
+
+import pytest
+
+from models.character import Character
+from models.character_history import CharacterHistory
+from services import ingest
+from services.ingest import ERROR, NOT_FOUND, SAVED, UNCHANGED, persist_profiles
+from services.profile_parser import CharacterProfile, profile_fingerprint
+
+@pytest.fixture(autouse=True)
+def no_rollup(monkeypatch, fake_redis):
+    # O resumo diário usa upsert do PostgreSQL
+    async def noop(*args, **kwargs):
+        pass
+    monkeypatch.setattr(ingest, "update_daily_rollup", noop)
+
+def profile(name: str, level: int = 100, **values) -> CharacterProfile:
+    return CharacterProfile(name=name, level=level, vocation="Knight", residence="Thais", experience=1000.0, **values)
+
+async def add_characters(sessionmaker, *characters):
+    async with sessionmaker() as db:
+        db.add_all(characters)
+        await db.commit()
+
+def test_persist_profiles_saves_and_skips_unchanged(run_with_db):
+    unchanged = profile("Beta")
+
+    async def scenario(sessionmaker):
+        await add_characters(
+            sessionmaker,
+            Character(name="Alpha", level=90),
+            Character(name="Beta", level=100, content_hash=profile_fingerprint(unchanged)),
+        )
+        async with sessionmaker() as db:
+            statuses = await persist_profiles(db, {"Alpha": profile("Alpha"), "Beta": unchanged, "Ghost": profile("Ghost")})
+            history = (await db.execute(select(func.count()).select_from(CharacterHistory))).scalar()
+            alpha = (await db.execute(select(Character).where(Character.name == "Alpha"))).scalar_one()
+        return statuses, history, alpha
+
+    statuses, history, alpha = run_with_db(scenario)
+    assert statuses == {"Alpha": SAVED, "Beta": UNCHANGED, "Ghost": NOT_FOUND}
+    assert history == 1
+    assert alpha.level == 100
+    assert alpha.last_checked is not None
+
+def test_colliding_row_fails_alone(run_with_db):
+    async def scenario(sessionmaker):
+        await add_characters(
+            sessionmaker,
+            Character(name="Alpha", level=90),
+            Character(name="Beta", level=90),
+            Character(name="Gamma", level=90),
+        )
+        async with sessionmaker() as db:
+            statuses = await persist_profiles(db, {
+                "Alpha": profile("Alpha"),
+                # O site devolveu outro nome, que já pertence a outro personagem
+                "Beta": profile("Alpha", level=120),
+                "Gamma": profile("Gamma"),
+            })
+            levels = dict((await db.execute(select(Character.name, Character.level))).all())
+            history = (await db.execute(select(func.count()).select_from(CharacterHistory))).scalar()
+        return statuses, levels, history
+
+    statuses, levels, history = run_with_db(scenario)
+    assert statuses == {"Alpha": SAVED, "Beta": ERROR, "Gamma": SAVED}
+    assert levels == {"Alpha": 100, "Beta": 90, "Gamma": 100}
+    assert history == 2
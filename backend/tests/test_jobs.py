@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from services import jobs
+from services.jobs import (
+    DEDUPE_KEY, DELAYED_KEY, FAILED, JOB_KEY, PROCESSING_KEY, QUEUE_KEY, QUEUED, RETRYING, RUNNING, SUCCEEDED,
+    claim_jobs, enqueue_refresh, enqueue_refreshes, finish_job, get_job, promote_delayed, queue_depth,
+    requeue_stale_jobs, retry_job,
+)
+
+@pytest.fixture
+def redis(fake_redis):
+    return fake_redis
+
+def test_enqueue_deduplicates_pending_jobs(redis):
+    async def scenario():
+        first = await enqueue_refreshes(["Alpha", "Beta", "Alpha"])
+        second = await enqueue_refreshes(["Alpha", "Gamma"])
+        return first, second, await redis.llen(QUEUE_KEY)
+
+    first, second, queued = asyncio.run(scenario())
+    assert set(first) == {"Alpha", "Beta"}
+    assert all(created for _, created in first.values())
+    assert second["Alpha"] == (first["Alpha"][0], False)
+    assert second["Gamma"][1] is True
+    assert queued == 3
+
+def test_finished_job_releases_deduplication(redis):
+    async def scenario():
+        job_id, _ = await enqueue_refresh("Alpha")
+        [job] = await claim_jobs(10, timeout=1)
+        await finish_job(job, SUCCEEDED, result="updated")
+        again = await enqueue_refresh("Alpha")
+        return job_id, again, await get_job(job_id), await redis.ttl(JOB_KEY.format(job_id))
+
+    job_id, again, finished, ttl = asyncio.run(scenario())
+    assert again[1] is True and again[0] != job_id
+    assert finished["status"] == SUCCEEDED
+    assert ttl > 0
+
+def test_orphan_dedupe_key_is_taken_over(redis):
+    async def scenario():
+        await redis.set(DEDUPE_KEY.format("Alpha"), "expired-job")
+        return await enqueue_refresh("Alpha"), await redis.get(DEDUPE_KEY.format("Alpha"))
+
+    (job_id, created), dedupe = asyncio.run(scenario())
+    assert created is True
+    assert dedupe == job_id
+
+def test_claim_marks_jobs_running(redis):
+    async def scenario():
+        await enqueue_refreshes(["Alpha", "Beta", "Gamma"])
+        claimed = await claim_jobs(2, timeout=1)
+        return claimed, await redis.llen(QUEUE_KEY), await redis.llen(PROCESSING_KEY)
+
+    claimed, queued, processing = asyncio.run(scenario())
+    assert [job["character"] for job in claimed] == ["Alpha", "Beta"]
+    assert all(job["status"] == RUNNING and job["attempts"] == "1" for job in claimed)
+    assert all(job["claimed_at"] for job in claimed)
+    assert (queued, processing) == (1, 2)
+
+def test_claim_skips_expired_jobs_without_recreating_them(redis):
+    async def scenario():
+        expired_id, _ = await enqueue_refresh("Expired")
+        await enqueue_refresh("Alive")
+        await redis.delete(JOB_KEY.format(expired_id))
+        claimed = await claim_jobs(10, timeout=1)
+        return (
+            claimed,
+            await redis.exists(JOB_KEY.format(expired_id)),
+            await redis.lrange(PROCESSING_KEY, 0, -1),
+        )
+
+    claimed, expired_exists, processing = asyncio.run(scenario())
+    assert [job["character"] for job in claimed] == ["Alive"]
+    assert expired_exists == 0
+    assert processing == [claimed[0]["id"]]
+
+def test_retry_is_delayed_then_promoted(redis):
+    async def scenario():
+        await enqueue_refresh("Alpha")
+        [job] = await claim_jobs(1, timeout=1)
+        await retry_job(job, "HTTP 503")
+        waiting = (await get_job(job["id"]), await redis.llen(QUEUE_KEY), await queue_depth())
+
+        # Antes do fim da espera o job não volta para a fila
+        promoted_early = await promote_delayed()
+        await redis.zadd(DELAYED_KEY, {job["id"]: 0})
+        promoted = await promote_delayed()
+        [again] = await claim_jobs(1, timeout=1)
+        return waiting, promoted_early, promoted, again
+
+    (job, queued, depth), promoted_early, promoted, again = asyncio.run(scenario())
+    assert job["status"] == RETRYING
+    assert job["error"] == "HTTP 503"
+    assert (queued, depth) == (0, 1)
+    assert (promoted_early, promoted) == (0, 1)
+    assert again["attempts"] == "2"
+
+def test_retry_gives_up_after_max_attempts(redis, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 1)
+
+    async def scenario():
+        await enqueue_refresh("Alpha")
+        [job] = await claim_jobs(1, timeout=1)
+        await retry_job(job, "boom")
+        return await get_job(job["id"]), await redis.zcard(DELAYED_KEY), await redis.exists(DEDUPE_KEY.format("Alpha"))
+
+    job, delayed, dedupe = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert delayed == 0
+    assert dedupe == 0
+
+def test_requeue_stale_jobs(redis, monkeypatch):
+    async def scenario():
+        await enqueue_refreshes(["Alpha", "Beta"])
+        claimed = await claim_jobs(2, timeout=1)
+        fresh = await requeue_stale_jobs()
+
+        monkeypatch.setattr(jobs, "JOB_VISIBILITY_TIMEOUT", 0)
+        await redis.delete(JOB_KEY.format(claimed[1]["id"]))
+        stale = await requeue_stale_jobs()
+        return claimed, fresh, stale, await redis.lrange(QUEUE_KEY, 0, -1), await redis.llen(PROCESSING_KEY)
+
+    claimed, fresh, stale, queue, processing = asyncio.run(scenario())
+    assert fresh == 0
+    # O job cujo registro expirou só sai da lista de processamento
+    assert stale == 1
+    assert queue == [claimed[0]["id"]]
+    assert processing == 0
+
+def test_requeued_job_is_queued_again(redis, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_VISIBILITY_TIMEOUT", 0)
+
+    async def scenario():
+        job_id, _ = await enqueue_refresh("Alpha")
+        await claim_jobs(1, timeout=1)
+        await requeue_stale_jobs()
+        return await get_job(job_id)
+
+    assert asyncio.run(scenario())["status"] == QUEUED
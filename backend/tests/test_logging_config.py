@@ -0,0 +1,45 @@
+import json
+import logging
+
+import pytest
+
+from services.logging_config import bind_correlation_id, configure_logging, stop_logging
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def log_failure():
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.getLogger("test").exception("Falha ao processar %s", "Alpha")
+
+def test_json_records_keep_the_exception_apart(tmp_path, restore_root_logger):
+    log_file = tmp_path / "app.log"
+    configure_logging(level="INFO", fmt="json", log_file=str(log_file))
+    bind_correlation_id("abc123")
+
+    log_failure()
+    stop_logging()
+
+    entry = json.loads(log_file.read_text(encoding="utf-8").strip())
+    assert entry["message"] == "Falha ao processar Alpha"
+    assert entry["request_id"] == "abc123"
+    assert "ZeroDivisionError" in entry["exception"]
+
+def test_text_records_still_include_the_traceback(tmp_path, restore_root_logger):
+    log_file = tmp_path / "app.log"
+    configure_logging(level="INFO", fmt="text", log_file=str(log_file))
+
+    log_failure()
+    stop_logging()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "Falha ao processar Alpha" in content
+    assert "Traceback" in content and "ZeroDivisionError" in content
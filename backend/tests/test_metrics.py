@@ -0,0 +1,19 @@
+import pytest
+
+from services import metrics
+from services.metrics import worker_metrics_port
+
+@pytest.mark.parametrize("base, instance, expected", [
+    (0, "3", 0),
+    (9100, "", 9100),
+    (9100, "1", 9101),
+    (9100, "3", 9103),
+])
+def test_worker_metrics_port_per_instance(monkeypatch, base, instance, expected):
+    monkeypatch.setattr(metrics, "METRICS_PORT", base)
+    assert worker_metrics_port(instance) == expected
+
+def test_worker_metrics_port_rejects_named_instance(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_PORT", 9100)
+    with pytest.raises(ValueError):
+        worker_metrics_port("blue")
@@ -0,0 +1,63 @@
+from schemas import taleon
+from services.page_parsers import (
+    GuildMemberRow, HighscoreRow, OnlinePlayerRow, filter_by_level, filter_by_vocation,
+    parse_guild_members, parse_highscores, parse_online, parse_records,
+)
+
+def test_parse_highscores(fixture_page):
+    # A tabela de filtros do formulário vem antes e não tem coluna de nome;
+    # a linha de paginação (colspan) não tem o número de colunas do cabeçalho
+    assert parse_highscores(fixture_page("highscores.html")) == [
+        HighscoreRow(position=1, name="Sir Galahad", vocation="Elite Knight", level=1254, value=32781466200),
+        HighscoreRow(position=2, name="Mystic Mage", vocation="Master Sorcerer", level=1198, value=28544120990),
+        HighscoreRow(position=3, name="Ana d'Arc", vocation="Elder Druid", level=1031, value=18205003412),
+        # Só a bandeira no texto da célula: o nome vem do link
+        HighscoreRow(position=4, name="Hawk Eye", vocation="Royal Paladin", level=987, value=15960118004),
+    ]
+
+def test_parse_highscores_position_fallback():
+    html_content = (
+        "<table class=\"table\"><tr><th>Name</th><th>Level</th></tr>"
+        "<tr><td>First</td><td>300</td></tr><tr><td>Second</td><td>200</td></tr></table>"
+    )
+    assert parse_highscores(html_content) == [
+        HighscoreRow(position=1, name="First", level=300, value=300),
+        HighscoreRow(position=2, name="Second", level=200, value=200),
+    ]
+
+def test_parse_online(fixture_page):
+    assert parse_online(fixture_page("online.html")) == [
+        OnlinePlayerRow(name="Sir Galahad", level=1254, vocation="Elite Knight", guild="Knights of Thais"),
+        OnlinePlayerRow(name="Little Druid", level=8, vocation="Druid", guild=""),
+        OnlinePlayerRow(name="Mystic Mage", level=1198, vocation="Master Sorcerer", guild="Arcane"),
+    ]
+
+def test_parse_guild_members(fixture_page):
+    assert parse_guild_members(fixture_page("guildprofile.html")) == [
+        # O apelido "(Boss)" fica fora do nome
+        GuildMemberRow(name="Sir Galahad", rank="Leader", level=1254, vocation="Elite Knight", online=True),
+        GuildMemberRow(name="Lady Morgana", rank="Vice-Leader", level=870, vocation="Elder Druid", online=False),
+        # Rank em branco: herda o da linha anterior
+        GuildMemberRow(name="Percival", rank="Vice-Leader", level=655, vocation="Royal Paladin", online=True),
+        GuildMemberRow(name="Squire Tom", rank="Member", level=45, vocation="Knight", online=False),
+    ]
+
+def test_parse_records_without_name_column():
+    html_content = "<table class=\"table\"><tr><td>Founded:</td><td>2024</td></tr></table>"
+    assert parse_records(html_content) == []
+    assert parse_online("<html><body><p>No players online.</p></body></html>") == []
+
+def test_filters(fixture_page):
+    players = parse_online(fixture_page("online.html"))
+
+    assert [p.name for p in filter_by_level(players, min_level=100)] == ["Sir Galahad", "Mystic Mage"]
+    assert [p.name for p in filter_by_level(players, max_level=1200)] == ["Little Druid", "Mystic Mage"]
+    # Promoções contam como a vocação base
+    assert [p.name for p in filter_by_vocation(players, "druid")] == ["Little Druid"]
+    assert [p.name for p in filter_by_vocation(players, "Sorcerer")] == ["Mystic Mage"]
+    assert filter_by_vocation(players, None) == players
+
+def test_rows_are_not_the_api_models():
+    assert HighscoreRow is not taleon.HighscoreEntry
+    assert OnlinePlayerRow is not taleon.OnlinePlayer
+    assert GuildMemberRow is not taleon.GuildMember
@@ -0,0 +1,86 @@
+import pytest
+
+from services.profile_parser import (
+    CharacterProfile, extract_fields_fast, extract_fields_soup, parse_profile, profile_fingerprint,
+)
+
+ACTIVE_OUTFIT = (
+    "https://outfit-images.ots.me/animatedOutfits1099/animoutfit.php"
+    "?id=131&addons=3&head=78&body=69&legs=58&feet=76&mount=0&direction=3"
+)
+INACTIVE_OUTFIT = (
+    "https://outfit-images.ots.me/animatedOutfits1099/animoutfit.php"
+    "?id=136&addons=0&head=0&body=0&legs=0&feet=0&mount=0&direction=3"
+)
+
+def profile_page(rows: str, table_class: str = "table table-striped") -> str:
+    return f"<html><body><table class=\"{table_class}\">{rows}</table></body></html>"
+
+@pytest.mark.parametrize("page, expected", [
+    ("characterprofile_active.html", CharacterProfile(
+        name="Sir Galahad", outfit=ACTIVE_OUTFIT, level=1254, vocation="Elite Knight",
+        residence="Thais", experience=32781466200.0, daily_experience=0, deaths=3,
+    )),
+    ("characterprofile_inactive.html", CharacterProfile(
+        name="Ana d'Arc", outfit=INACTIVE_OUTFIT, level=87, vocation="Druid",
+        residence="Carlin", experience=9912300.0, daily_experience=0, deaths=0,
+    )),
+])
+def test_parse_profile_samples(sample_page, page, expected):
+    profile = parse_profile(sample_page(page), "ignored")
+
+    assert profile.name == expected.name
+    assert profile.outfit == expected.outfit
+    assert profile.level == expected.level
+    assert profile.vocation == expected.vocation
+    assert profile.residence == expected.residence
+    assert profile.experience == expected.experience
+    assert profile.daily_experience == expected.daily_experience
+    assert profile.deaths == expected.deaths
+    assert profile_fingerprint(profile) == profile_fingerprint(expected)
+
+@pytest.mark.parametrize("page", ["characterprofile_active.html", "characterprofile_inactive.html"])
+def test_fast_and_soup_paths_agree(sample_page, page):
+    html_content = sample_page(page)
+    assert extract_fields_fast(html_content) == extract_fields_soup(html_content)
+
+def test_empty_level_is_zero():
+    html_content = profile_page(
+        "<tr><td>Name:</td><td>Nobody</td></tr>"
+        "<tr><td>Level:</td><td></td></tr>"
+        "<tr><td>Experience:</td><td></td></tr>"
+    )
+    assert extract_fields_fast(html_content) == extract_fields_soup(html_content)
+
+    profile = parse_profile(html_content)
+    assert profile.name == "Nobody"
+    assert profile.level == 0
+    assert profile.experience == 0
+
+def test_table_striped_alone_is_not_the_profile_table():
+    # A primeira tabela só tem "table-striped"; a do perfil é a que tem a classe "table"
+    html_content = (
+        "<html><body>"
+        "<table class=\"table-striped\"><tr><td>Name:</td><td>Menu</td></tr></table>"
+        "<table class=\"table\"><tr><td>Name:</td><td>Real Name</td></tr>"
+        "<tr><td>Level:</td><td>10</td></tr></table>"
+        "</body></html>"
+    )
+    assert extract_fields_fast(html_content) == extract_fields_soup(html_content)
+    assert parse_profile(html_content).name == "Real Name"
+
+@pytest.mark.parametrize("table_class", ["table", "table table-hover", "striped table"])
+def test_table_class_as_whole_word(table_class):
+    html_content = profile_page("<tr><td>Name:</td><td>Knight</td></tr>", table_class)
+    assert extract_fields_fast(html_content) == {"name": "Knight"}
+
+def test_missing_table():
+    html_content = "<html><body><p>Character does not exist.</p></body></html>"
+    assert extract_fields_fast(html_content) is None
+    assert extract_fields_soup(html_content) is None
+    assert parse_profile(html_content, "Ghost") is None
+
+def test_fallback_name_when_table_has_no_name():
+    profile = parse_profile(profile_page("<tr><td>Level:</td><td>1.000</td></tr>"), "Fallback")
+    assert profile.name == "Fallback"
+    assert profile.level == 1000
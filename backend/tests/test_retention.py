@@ -0,0 +1,64 @@
+from sqlalchemy import select
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.retention as retention
+from models.character import Character
+from models.character_history import CharacterHistory
+
+@pytest.fixture(autouse=True)
+def no_pause(monkeypatch):
+    monkeypatch.setattr(retention, "HISTORY_CHUNK_PAUSE", 0)
+
+def history_rows(character_id: int, days_ago: int, count: int, now: datetime):
+    moment = (now - timedelta(days=days_ago)).replace(hour=8, minute=0, second=0, microsecond=0)
+    return [
+        CharacterHistory(character_id=character_id, level=10, experience=float(i), timestamp=moment + timedelta(hours=i))
+        for i in range(count)
+    ]
+
+async def compact(sessionmaker, characters: int, chunk: int, dry_run: bool = False):
+    now = datetime.utcnow()
+    async with sessionmaker() as db:
+        db.add_all([Character(name=name, level=10) for name in ("Alpha", "Beta", "Gamma")])
+        await db.flush()
+        for character_id in (1, 2, 3):
+            # Trecho bruto (intacto), trecho diário e trecho semanal
+            db.add_all(history_rows(character_id, 5, 3, now))
+            db.add_all(history_rows(character_id, 40, 4, now))
+            db.add_all(history_rows(character_id, 41, 2, now))
+        db.add_all(history_rows(2, 400, 3, now))
+        await db.commit()
+
+    async with sessionmaker() as db:
+        report = await retention.compact_history(
+            db, dry_run=dry_run, raw_days=30, daily_days=180, archive_dir="", chunk=chunk, characters=characters,
+        )
+    async with sessionmaker() as db:
+        kept = (await db.execute(
+            select(CharacterHistory.character_id, CharacterHistory.experience)
+            .order_by(CharacterHistory.character_id, CharacterHistory.timestamp)
+        )).all()
+    return report, kept
+
+@pytest.mark.parametrize("characters, chunk", [(1, 1), (2, 2), (200, 5000)])
+def test_compaction_keeps_last_row_per_period(run_with_db, characters, chunk):
+    report, kept = run_with_db(lambda sessionmaker: compact(sessionmaker, characters, chunk))
+
+    # Por personagem: 3 brutos + o último de cada um dos dois dias; Beta ainda
+    # tem o último registro da semana antiga
+    expected = []
+    for character_id in (1, 2, 3):
+        if character_id == 2:
+            expected.append((2, 2.0))
+        expected += [(character_id, 1.0), (character_id, 3.0), (character_id, 0.0), (character_id, 1.0), (character_id, 2.0)]
+    assert kept == expected
+    assert report.removed == 3 * (3 + 1) + 2
+    assert [(stage.unit, stage.removed) for stage in report.stages] == [("week", 2), ("day", 12)]
+
+def test_dry_run_only_counts(run_with_db):
+    report, kept = run_with_db(lambda sessionmaker: compact(sessionmaker, 1, 1, dry_run=True))
+
+    assert report.removed == 14
+    assert len(kept) == 3 * 9 + 3
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import CoalescedFetchError, SingleFlight
+
+class SlowFetch:
+    """Busca que só termina quando liberada, contando as chamadas"""
+
+    def __init__(self, value: str = "html"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+def test_concurrent_calls_share_one_fetch(fake_redis):
+    async def scenario():
+        flight = SingleFlight("test")
+        fetch = SlowFetch()
+        tasks = [asyncio.create_task(flight.do("key", fetch)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        fetch.release.set()
+        return await asyncio.gather(*tasks), fetch.calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == ["html"] * 5
+    assert calls == 1
+
+def test_leader_cancellation_hands_over_to_a_follower(fake_redis):
+    async def scenario():
+        flight = SingleFlight("test")
+        fetch = SlowFetch()
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.05)
+        followers = [asyncio.create_task(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        leader.cancel()
+        await asyncio.sleep(0.05)
+        fetch.release.set()
+        results = await asyncio.gather(*followers, return_exceptions=True)
+        return leader, results, fetch.calls
+
+    leader, results, calls = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert results == ["html"] * 3
+    # A busca cancelada e a do novo líder
+    assert calls == 2
+
+def test_leader_cancellation_releases_followers_in_other_processes(fake_redis):
+    async def scenario():
+        # Duas instâncias simulam dois processos compartilhando o Redis
+        leader_process, follower_process = SingleFlight("test"), SingleFlight("test")
+        leader_fetch, follower_fetch = SlowFetch("leader"), SlowFetch("follower")
+        follower_fetch.release.set()
+
+        leader = asyncio.create_task(leader_process.do("key", leader_fetch))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(follower_process.do("key", follower_fetch))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        # Sem o aviso, o seguidor esperaria até o fim do lock (30s)
+        return await asyncio.wait_for(follower, timeout=5), follower_fetch.calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == "follower"
+    assert calls == 1
+
+def test_leader_failure_is_shared(fake_redis):
+    async def scenario():
+        leader_process, follower_process = SingleFlight("test"), SingleFlight("test")
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise CoalescedFetchError(503, "indisponível")
+
+        async def unused():
+            raise AssertionError("o seguidor não deveria buscar")
+
+        leader = asyncio.create_task(leader_process.do("key", failing))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(follower_process.do("key", unused))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader_error, follower_error = asyncio.run(scenario())
+    assert isinstance(leader_error, CoalescedFetchError)
+    assert isinstance(follower_error, CoalescedFetchError)
+    assert follower_error.status == 503
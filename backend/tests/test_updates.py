@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+from services.updates import UpdateBroadcaster
+
+CHANNEL = "test:updates"
+UPDATE = {"character_id": 1, "world": "Taleon", "level": 10}
+
+async def wait_for_subscribers(redis, expected: int, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while dict(await redis.pubsub_numsub(CHANNEL))[CHANNEL] != expected:
+        assert asyncio.get_running_loop().time() < deadline, f"o canal não chegou a {expected} assinaturas"
+        await asyncio.sleep(0.01)
+
+def test_redis_subscription_follows_the_clients(fake_redis):
+    async def scenario():
+        broadcaster = UpdateBroadcaster(CHANNEL)
+        first = broadcaster.subscribe()
+        await wait_for_subscribers(fake_redis, 1)
+        await fake_redis.publish(CHANNEL, json.dumps([UPDATE]))
+        received = await asyncio.wait_for(first.queue.get(), 2)
+
+        # Último cliente saiu: a assinatura e a tarefa de escuta são encerradas
+        task = broadcaster._task
+        broadcaster.unsubscribe(first)
+        await wait_for_subscribers(fake_redis, 0)
+        closed = task.done() and broadcaster._task is None
+
+        # O próximo cliente reabre a assinatura
+        second = broadcaster.subscribe(worlds=["Taleon"])
+        await wait_for_subscribers(fake_redis, 1)
+        await fake_redis.publish(CHANNEL, json.dumps([UPDATE]))
+        again = await asyncio.wait_for(second.queue.get(), 2)
+        await broadcaster.close()
+        return received, closed, again
+
+    received, closed, again = asyncio.run(scenario())
+    assert received == [UPDATE]
+    assert closed
+    assert again == [UPDATE]
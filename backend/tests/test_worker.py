@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+import worker
+from services.jobs import (
+    DEDUPE_KEY, FAILED, PROCESSING_KEY, RETRYING, SUCCEEDED, claim_jobs, enqueue_refreshes, get_job,
+)
+from services.refresh import RefreshSummary
+
+class FakeSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *args):
+        return False
+
+@pytest.fixture
+def refreshed(monkeypatch, fake_redis):
+    calls = []
+
+    async def refresh_characters(names, db, limiter=None):
+        calls.append(names)
+        return RefreshSummary(total=len(names), succeeded=["Alpha"], not_found=["Ghost"], failed=["Broken"])
+
+    monkeypatch.setattr(worker, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(worker, "refresh_characters", refresh_characters)
+    return calls
+
+def test_process_batch_finishes_every_job(refreshed, fake_redis):
+    async def scenario():
+        first = await enqueue_refreshes(["Alpha", "Ghost", "Broken"])
+        # Segundo job do mesmo personagem (ex.: deduplicação expirada antes da coleta)
+        await fake_redis.delete(DEDUPE_KEY.format("Alpha"))
+        second = await enqueue_refreshes(["Alpha"])
+        jobs = await claim_jobs(10, timeout=1)
+        await worker.process_batch(jobs, limiter=None)
+        ids = {
+            "alpha": [first["Alpha"][0], second["Alpha"][0]],
+            "ghost": [first["Ghost"][0]],
+            "broken": [first["Broken"][0]],
+        }
+        statuses = {name: [await get_job(job_id) for job_id in job_ids] for name, job_ids in ids.items()}
+        return len(jobs), statuses, await fake_redis.lrange(PROCESSING_KEY, 0, -1)
+
+    claimed, statuses, processing = asyncio.run(scenario())
+    assert claimed == 4
+    assert refreshed == [["Alpha", "Ghost", "Broken"]]
+    assert [job["status"] for job in statuses["alpha"]] == [SUCCEEDED, SUCCEEDED]
+    # Personagem removido: resultado final, sem novas tentativas
+    assert statuses["ghost"][0]["status"] == FAILED
+    assert statuses["ghost"][0]["result"] == "not_found"
+    assert statuses["broken"][0]["status"] == RETRYING
+    assert processing == []
@@ -0,0 +1,111 @@
+"""
+Worker da fila de coleta.
+
+Retira jobs de atualização de personagens do Redis e os executa em lotes
+pelo motor de atualização. Pode rodar em vários processos ao mesmo tempo; o
+limite de requisições ao Taleon é compartilhado entre eles via Redis.
+
+Uso (a partir do diretório backend):
+    python worker.py [--batch-size 20] [--poll-timeout 5]
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from prometheus_client import start_http_server
+
+from database import AsyncSessionLocal, async_engine
+from services.http_client import close_http_client, start_http_client
+from services.jobs import FAILED, SUCCEEDED, claim_jobs, finish_job, requeue_stale_jobs, retry_job
+from services.logging_config import bind_correlation_id, configure_logging
+from services.metrics import worker_metrics_port
+from services.redis_client import close_redis, get_redis
+from services.refresh import REFRESH_RATE_PER_SECOND, RedisRateLimiter, refresh_characters
+from services.scraper import TALEON_BASE_URL
+
+configure_logging()
+logger = logging.getLogger("worker")
+
+# Intervalo entre verificações de jobs abandonados por outros workers
+REQUEUE_INTERVAL = 60  # segundos
+
+async def process_batch(jobs, limiter):
+    # Os registros de todo o lote compartilham um id de correlação
+    bind_correlation_id()
+    # O mesmo personagem pode ter mais de um job no lote: todos são concluídos juntos
+    jobs_by_name = defaultdict(list)
+    for job in jobs:
+        jobs_by_name[job["character"]].append(job)
+    try:
+        async with AsyncSessionLocal() as db:
+            summary = await refresh_characters(list(jobs_by_name), db, limiter=limiter)
+    except Exception as e:
+        logger.error(f"Erro ao processar lote de {len(jobs)} jobs: {str(e)}")
+        for job in jobs:
+            await retry_job(job, str(e))
+        return
+
+    for name in summary.succeeded:
+        for job in jobs_by_name[name]:
+            await finish_job(job, SUCCEEDED, result="updated")
+    for name in summary.skipped:
+        for job in jobs_by_name[name]:
+            await finish_job(job, SUCCEEDED, result="unchanged")
+    # Personagem removido entre o enfileiramento e a coleta: não adianta tentar de novo
+    for name in summary.not_found:
+        for job in jobs_by_name[name]:
+            await finish_job(job, FAILED, result="not_found", error="Personagem não cadastrado")
+    for name in summary.failed:
+        for job in jobs_by_name[name]:
+            await retry_job(job, "Falha ao atualizar o personagem")
+
+def start_metrics_server():
+    # Cada worker é um processo: as métricas são expostas por ele mesmo, numa
+    # porta própria por instância. Sem métricas o worker continua coletando.
+    try:
+        port = worker_metrics_port()
+        if port:
+            start_http_server(port)
+            logger.info(f"Métricas do worker em :{port}/metrics")
+    except (OSError, ValueError) as e:
+        logger.error(f"Erro ao iniciar o servidor de métricas do worker: {str(e)}")
+
+async def run_worker(batch_size: int, poll_timeout: int):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await start_http_client()
+    start_metrics_server()
+    limiter = RedisRateLimiter(get_redis(), f"taleon:ratelimit:{urlparse(TALEON_BASE_URL).netloc}", REFRESH_RATE_PER_SECOND)
+    last_requeue = 0.0
+    logger.info(f"Worker iniciado (lote de até {batch_size} jobs)")
+    try:
+        while not stop.is_set():
+            if time.monotonic() - last_requeue > REQUEUE_INTERVAL:
+                await requeue_stale_jobs()
+                last_requeue = time.monotonic()
+
+            jobs = await claim_jobs(batch_size, poll_timeout)
+            if jobs:
+                await process_batch(jobs, limiter)
+    finally:
+        await close_http_client()
+        await close_redis()
+        await async_engine.dispose()
+        logger.info("Worker encerrado")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--poll-timeout", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.batch_size, args.poll_timeout))
+
+if __name__ == "__main__":
+    main()